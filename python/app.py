@@ -3,12 +3,17 @@ Calenda Schedule - Python Scheduler API
 Flask API dla generowania grafików z użyciem CP-SAT Optimizer
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+import json
+import math
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 import traceback
-from scheduler_optimizer import generate_schedule_optimized
+from scheduler_optimizer import generate_schedule_optimized, JobIdConflict, SOLVER_GOVERNOR, SOLVE_JOBS
 
 app = Flask(__name__)
 
@@ -25,6 +30,9 @@ CORS(app, resources={
     }
 })
 
+# Maks. czas obsługi żądania (gunicorn --timeout / Cloud Run) [s]
+REQUEST_TIMEOUT_SECONDS = float(os.getenv('REQUEST_TIMEOUT_SECONDS', 300))
+
 # API Key validation
 API_KEY = os.getenv('API_KEY', 'schedule-saas-local-dev-2026')
 
@@ -45,7 +53,9 @@ def health_check():
         'status': 'healthy',
         'service': 'calenda-schedule-python-scheduler',
         'timestamp': datetime.now().isoformat(),
-        'version': '3.0.0-cpsat-pro'
+        'version': '3.0.0-cpsat-pro',
+        'solver_allocation': SOLVER_GOVERNOR.snapshot(),
+        'active_jobs': SOLVE_JOBS.active_count()
     })
 
 
@@ -244,6 +254,9 @@ def transform_nextjs_input(data: dict) -> dict:
     # Solver time limit from config
     solver_time_limit = config.get('timeout_ms', 300000) // 1000  # Convert ms to seconds
     
+    # Opcje solvera (np. objective_mode: 'weighted' | 'lexicographic')
+    solver_options = config.get('solver_options', {})
+    
     print(f"\n🔍 TRANSFORMED DATA - Total absences: {len(employee_absences)}")
     for abs in employee_absences:
         print(f"   → Employee: {abs.get('employee_id', 'N/A')[:12]} | {abs.get('start_date')} to {abs.get('end_date')} | Type: {abs.get('absence_type')}")
@@ -265,6 +278,8 @@ def transform_nextjs_input(data: dict) -> dict:
     return {
         'year': year,
         'month': month,
+        'organization_id': input_data.get('organization_id') or settings.get('organization_id'),
+        'draft_schedule': input_data.get('draft_schedule', []),  # Szkic grafiku jako hint dla solvera
         'monthly_hours_norm': monthly_hours_norm,  # KRYTYCZNE DLA CP-SAT
         'organization_settings': organization_settings,
         'shift_templates': shift_templates,
@@ -273,10 +288,249 @@ def transform_nextjs_input(data: dict) -> dict:
         'employee_absences': employee_absences,
         'scheduling_rules': scheduling_rules,
         'trading_sundays': trading_sundays,
-        'solver_time_limit': solver_time_limit
+        'solver_time_limit': solver_time_limit,
+        'solver_options': solver_options
     }
 
 
+def request_deadline(data: dict, started: float):
+    """
+    Bezwzględny deadline żądania (time.time()).
+    
+    Budżet klienta: nagłówek X-Request-Timeout-Ms, pole request_timeout_ms
+    lub config.timeout_ms (format Next.js); zawsze nie dłużej niż timeout serwera.
+    
+    Returns:
+        (deadline, None) lub (None, komunikat błędu) dla budżetu, który nie jest
+        skończoną liczbą dodatnią
+    """
+    budget_ms = (
+        request.headers.get('X-Request-Timeout-Ms')
+        or data.get('request_timeout_ms')
+        or (data.get('config') or {}).get('timeout_ms')
+    )
+    budget = REQUEST_TIMEOUT_SECONDS
+    if budget_ms:
+        try:
+            client_budget = float(budget_ms) / 1000
+        except (TypeError, ValueError):
+            client_budget = float('nan')
+        if not math.isfinite(client_budget) or client_budget <= 0:
+            return None, f'Invalid request timeout: {budget_ms!r} (expected a positive number of milliseconds)'
+        budget = min(budget, client_budget)
+    return started + budget, None
+
+
+def request_job_id(data: dict):
+    """Id zadania od klienta (nagłówek X-Job-Id lub pole job_id) - do anulowania."""
+    return request.headers.get('X-Job-Id') or data.get('job_id')
+
+
+def job_conflict_response(job_id: str):
+    """409 dla id zadania, które należy już do trwającego generowania."""
+    return jsonify({
+        'success': False,
+        'status': 'CONFLICT',
+        'error': f'Job {job_id} is already running',
+        'job_id': job_id
+    }), 409
+
+
+def prepare_generate_input(data: dict):
+    """
+    Wspólne przygotowanie danych /api/generate i /api/generate/stream:
+    transformacja formatu Next.js, walidacja wymaganych pól, logowanie wejścia.
+    
+    Returns:
+        (dane w formacie CP-SAT, None) lub (None, komunikat błędu)
+    """
+    # Detect format: Next.js wrapper or direct CP-SAT
+    if 'input' in data:
+        # Next.js format - needs transformation
+        print("📦 Detected Next.js format - transforming...")
+        
+        # LOGUJ SUROWE DANE Z NEXT.JS
+        input_raw = data.get('input', {})
+        print("\n🔍 RAW DATA FROM NEXT.JS:")
+        print(f"   • monthly_hours_norm: {input_raw.get('monthly_hours_norm', 'MISSING')}h")
+        print(f"   • workDays count: {len(input_raw.get('workDays', []))}")
+        print(f"   • saturdayDays count: {len(input_raw.get('saturdayDays', []))}")
+        print(f"   • tradingSundays count: {len(input_raw.get('tradingSundays', []))}")
+        print(f"   • holidays count: {len(input_raw.get('holidays', []))}")
+        
+        # Pokaż przykładowe workDays (pierwsze 5)
+        work_days = input_raw.get('workDays', [])
+        if work_days:
+            print(f"   • workDays sample (first 5): {work_days[:5]}")
+        
+        data = transform_nextjs_input(data)
+    
+    # Validate required fields
+    required_fields = ['year', 'month', 'employees', 'shift_templates', 'organization_settings']
+    missing_fields = [field for field in required_fields if field not in data]
+    
+    if missing_fields:
+        return None, f'Missing required fields: {", ".join(missing_fields)}'
+    
+    print(f"\n{'='*80}")
+    print(f"📅 Generating schedule for: {data['year']}-{data['month']:02d}")
+    print(f"👥 Employees: {len(data.get('employees', []))}")
+    print(f"📋 Shift templates: {len(data.get('shift_templates', []))}")
+    
+    # SZCZEGÓŁOWE LOGOWANIE DANYCH
+    print(f"\n{'='*60}")
+    print("📊 SZCZEGÓŁOWE DANE WEJŚCIOWE:")
+    print(f"{'='*60}")
+    
+    # 1. Pracownicy
+    print(f"\n👥 PRACOWNICY ({len(data.get('employees', []))}):")
+    for i, emp in enumerate(data.get('employees', []), 1):
+        name = f"{emp.get('first_name', '')} {emp.get('last_name', '')}"
+        emp_type = emp.get('employment_type', 'full')
+        custom_h = emp.get('custom_hours')
+        print(f"  {i}. {name[:30]:30s} | Typ: {emp_type:12s} | Custom: {custom_h}")
+    
+    # 2. Szablony zmian
+    print(f"\n📋 SZABLONY ZMIAN ({len(data.get('shift_templates', []))}):")
+    for i, tmpl in enumerate(data.get('shift_templates', []), 1):
+        name = tmpl.get('name', 'Unknown')
+        start = tmpl.get('start_time', '??:??')
+        end = tmpl.get('end_time', '??:??')
+        min_emp = tmpl.get('min_employees', 1)
+        max_emp = tmpl.get('max_employees', 'NULL')
+        print(f"  {i}. {name[:20]:20s} | {start}-{end} | Min: {min_emp} | Max: {max_emp}")
+    
+    # 3. Ustawienia organizacji
+    org_set = data.get('organization_settings', {})
+    print("\n⚙️  USTAWIENIA ORGANIZACJI:")
+    print(f"  • Niedziele handlowe: {org_set.get('enable_trading_sundays', False)}")
+    print(f"  • Min pracowników/zmianę: {org_set.get('min_employees_per_shift', 'N/A')}")
+    
+    # 4. Reguły planowania
+    rules = data.get('scheduling_rules', {})
+    print("\n📏 REGUŁY PLANOWANIA:")
+    print(f"  • Max godzin/tydzień: {rules.get('max_weekly_work_hours', 48)}h")
+    print(f"  • Min odpoczynek: {rules.get('min_daily_rest_hours', 11)}h")
+    print(f"  • Max dni z rzędu: {rules.get('max_consecutive_days', 6)}")
+    
+    # 5. Norma miesięczna
+    monthly_norm = data.get('monthly_hours_norm')
+    print(f"\n⏰ NORMA MIESIĘCZNA: {monthly_norm}h")
+    
+    # 6. Nieobecności
+    absences = data.get('employee_absences', [])
+    print(f"\n🚫 NIEOBECNOŚCI: {len(absences)}")
+    for i, abs in enumerate(absences[:5], 1):  # Pokaż max 5
+        print(f"  {i}. Employee: {abs.get('employee_id', 'N/A')[:12]} | {abs.get('start_date')} → {abs.get('end_date')}")
+    if len(absences) > 5:
+        print(f"  ... i {len(absences) - 5} więcej")
+    
+    # 7. Niedziele handlowe
+    trading_sun = data.get('trading_sundays', [])
+    print(f"\n📅 NIEDZIELE HANDLOWE: {len(trading_sun)}")
+    for ts in trading_sun:
+        print(f"  • {ts.get('date')} - aktywna: {ts.get('is_active', True)}")
+    
+    print(f"\n{'='*60}\n")
+    print(f"{'='*80}\n")
+    
+    return data, None
+
+
+def build_generate_response(result: dict, data: dict):
+    """
+    Transformuje wynik optymalizatora do odpowiedzi zgodnej z Next.js.
+    
+    Returns:
+        (treść odpowiedzi, kod HTTP)
+    """
+    if result['status'] == 'SUCCESS':
+        # Pobierz quality_percent z CP-SAT lub oblicz fallback
+        stats = result.get('statistics', {})
+        quality_percent = stats.get('quality_percent', 75.0)
+        shifts = result.get('shifts', [])
+        
+        # Konwertuj flat list shifts na format {emp_id: {date: [shifts]}} dla validatora
+        schedule = {}
+        for shift in shifts:
+            emp_id = shift.get('employee_id')
+            shift_date = shift.get('date')
+            if emp_id and shift_date:
+                if emp_id not in schedule:
+                    schedule[emp_id] = {}
+                if shift_date not in schedule[emp_id]:
+                    schedule[emp_id][shift_date] = []
+                schedule[emp_id][shift_date].append(shift)
+        
+        return {
+            'success': True,
+            'schedule': schedule,  # Format dla validatora: {emp_id: {date: [shifts]}}
+            'data': {
+                'shifts': shifts,
+                'metrics': {
+                    'fitness': quality_percent,  # Teraz to procent 0-100%, nie raw objective
+                    'quality_percent': quality_percent,
+                    'total_shifts': len(shifts),
+                    'employees_count': len(data.get('employees', [])),
+                    'hours_balance': 0.8,
+                    'shift_balance': 0.9,
+                    'weekend_balance': 0.8,
+                    'preferences_score': 0.7,
+                    'shift_type_balance': 0.9,
+                    'labor_code_score': 1.0,
+                    'objective_value': stats.get('objective_value', 0)
+                },
+                'improvement': {
+                    'initial': {'fitness': 0},
+                    'final': {'fitness': quality_percent},
+                    'improvementPercent': quality_percent
+                }
+            },
+            'status': 'SUCCESS',
+            'job_id': result.get('job_id'),
+            # Dodaj stats w formacie kompatybilnym z testem
+            'statistics': {
+                'status': stats.get('status', 'SUCCESS'),
+                'solver_status': stats.get('status', 'OPTIMAL'),  # Dla kompatybilności z testem
+                'total_shifts': len(shifts),
+                'total_shifts_assigned': stats.get('total_shifts_assigned', len(shifts)),
+                'solve_time_seconds': stats.get('solve_time_seconds', 0),
+                'quality_percent': quality_percent,
+                'objective_value': stats.get('objective_value', 0),
+                'total_variables': stats.get('total_variables', 0),
+                'hard_constraints': stats.get('hard_constraints', 0),
+                'soft_constraints': stats.get('soft_constraints', 0),
+                'conflicts': stats.get('conflicts', 0),
+                'branches': stats.get('branches', 0),
+                'objective_mode': stats.get('objective_mode', 'weighted'),
+                'lexicographic_stages': stats.get('lexicographic_stages', []),
+                'engine': stats.get('engine', 'monolithic'),
+                'rolling_horizon': stats.get('rolling_horizon'),
+                'decomposition': stats.get('decomposition'),
+                'aggregation': stats.get('aggregation'),
+                'phase_times_seconds': stats.get('phase_times_seconds', {}),
+                'model_compaction': stats.get('model_compaction'),
+                'adjusted_targets': stats.get('adjusted_targets', []),
+                'time_scaling': stats.get('time_scaling'),
+                'solver_allocation': stats.get('solver_allocation'),
+                'stop_reason': stats.get('stop_reason'),
+                'solver_time_budget_seconds': stats.get('solver_time_budget_seconds'),
+                'time_to_first_solution_seconds': stats.get('time_to_first_solution_seconds'),
+                'time_to_best_solution_seconds': stats.get('time_to_best_solution_seconds'),
+                'warm_start': stats.get('warm_start', {})
+            }
+        }, 200
+    else:
+        return {
+            'success': False,
+            'error': result.get('error', 'Generation failed'),
+            'reasons': result.get('reasons', []),
+            'suggestions': result.get('suggestions', []),
+            'status': result['status'],
+            'job_id': result.get('job_id')
+        }, {'CANCELLED': 409, 'TIMEOUT': 504}.get(result['status'], 400)
+
+
 @app.route('/api/generate', methods=['POST', 'OPTIONS'])
 def generate_schedule():
     """
@@ -318,6 +572,7 @@ def generate_schedule():
             'error': error_message
         }), 401
     
+    started = time.time()
     try:
         # Parse request data
         data = request.get_json()
@@ -328,101 +583,27 @@ def generate_schedule():
                 'error': 'No JSON data provided'
             }), 400
         
-        # Detect format: Next.js wrapper or direct CP-SAT
-        if 'input' in data:
-            # Next.js format - needs transformation
-            print("📦 Detected Next.js format - transforming...")
-            
-            # LOGUJ SUROWE DANE Z NEXT.JS
-            input_raw = data.get('input', {})
-            print(f"\n🔍 RAW DATA FROM NEXT.JS:")
-            print(f"   • monthly_hours_norm: {input_raw.get('monthly_hours_norm', 'MISSING')}h")
-            print(f"   • workDays count: {len(input_raw.get('workDays', []))}")
-            print(f"   • saturdayDays count: {len(input_raw.get('saturdayDays', []))}")
-            print(f"   • tradingSundays count: {len(input_raw.get('tradingSundays', []))}")
-            print(f"   • holidays count: {len(input_raw.get('holidays', []))}")
-            
-            # Pokaż przykładowe workDays (pierwsze 5)
-            work_days = input_raw.get('workDays', [])
-            if work_days:
-                print(f"   • workDays sample (first 5): {work_days[:5]}")
-            
-            data = transform_nextjs_input(data)
-        
-        # Validate required fields
-        required_fields = ['year', 'month', 'employees', 'shift_templates', 'organization_settings']
-        missing_fields = [field for field in required_fields if field not in data]
-        
-        if missing_fields:
+        job_id = request_job_id(data)
+        deadline, error = request_deadline(data, started)
+        if error:
             return jsonify({
                 'status': 'ERROR',
-                'error': f'Missing required fields: {", ".join(missing_fields)}'
+                'error': error
+            }), 400
+        data, error = prepare_generate_input(data)
+        if error:
+            return jsonify({
+                'status': 'ERROR',
+                'error': error
             }), 400
         
-        print(f"\n{'='*80}")
-        print(f"📅 Generating schedule for: {data['year']}-{data['month']:02d}")
-        print(f"👥 Employees: {len(data.get('employees', []))}")
-        print(f"📋 Shift templates: {len(data.get('shift_templates', []))}")
-        
-        # SZCZEGÓŁOWE LOGOWANIE DANYCH
-        print(f"\n{'='*60}")
-        print("📊 SZCZEGÓŁOWE DANE WEJŚCIOWE:")
-        print(f"{'='*60}")
-        
-        # 1. Pracownicy
-        print(f"\n👥 PRACOWNICY ({len(data.get('employees', []))}):")
-        for i, emp in enumerate(data.get('employees', []), 1):
-            name = f"{emp.get('first_name', '')} {emp.get('last_name', '')}"
-            emp_type = emp.get('employment_type', 'full')
-            custom_h = emp.get('custom_hours')
-            print(f"  {i}. {name[:30]:30s} | Typ: {emp_type:12s} | Custom: {custom_h}")
-        
-        # 2. Szablony zmian
-        print(f"\n📋 SZABLONY ZMIAN ({len(data.get('shift_templates', []))}):")
-        for i, tmpl in enumerate(data.get('shift_templates', []), 1):
-            name = tmpl.get('name', 'Unknown')
-            start = tmpl.get('start_time', '??:??')
-            end = tmpl.get('end_time', '??:??')
-            min_emp = tmpl.get('min_employees', 1)
-            max_emp = tmpl.get('max_employees', 'NULL')
-            print(f"  {i}. {name[:20]:20s} | {start}-{end} | Min: {min_emp} | Max: {max_emp}")
-        
-        # 3. Ustawienia organizacji
-        org_set = data.get('organization_settings', {})
-        print(f"\n⚙️  USTAWIENIA ORGANIZACJI:")
-        print(f"  • Niedziele handlowe: {org_set.get('enable_trading_sundays', False)}")
-        print(f"  • Min pracowników/zmianę: {org_set.get('min_employees_per_shift', 'N/A')}")
-        
-        # 4. Reguły planowania
-        rules = data.get('scheduling_rules', {})
-        print(f"\n📏 REGUŁY PLANOWANIA:")
-        print(f"  • Max godzin/tydzień: {rules.get('max_weekly_work_hours', 48)}h")
-        print(f"  • Min odpoczynek: {rules.get('min_daily_rest_hours', 11)}h")
-        print(f"  • Max dni z rzędu: {rules.get('max_consecutive_days', 6)}")
-        
-        # 5. Norma miesięczna
-        monthly_norm = data.get('monthly_hours_norm')
-        print(f"\n⏰ NORMA MIESIĘCZNA: {monthly_norm}h")
-        
-        # 6. Nieobecności
-        absences = data.get('employee_absences', [])
-        print(f"\n🚫 NIEOBECNOŚCI: {len(absences)}")
-        for i, abs in enumerate(absences[:5], 1):  # Pokaż max 5
-            print(f"  {i}. Employee: {abs.get('employee_id', 'N/A')[:12]} | {abs.get('start_date')} → {abs.get('end_date')}")
-        if len(absences) > 5:
-            print(f"  ... i {len(absences) - 5} więcej")
-        
-        # 7. Niedziele handlowe
-        trading_sun = data.get('trading_sundays', [])
-        print(f"\n📅 NIEDZIELE HANDLOWE: {len(trading_sun)}")
-        for ts in trading_sun:
-            print(f"  • {ts.get('date')} - aktywna: {ts.get('is_active', True)}")
-        
-        print(f"\n{'='*60}\n")
-        print(f"{'='*80}\n")
+        try:
+            job = SOLVE_JOBS.start(job_id)
+        except JobIdConflict:
+            return job_conflict_response(job_id)
         
-        # Call optimizer
-        result = generate_schedule_optimized(data)
+        # Call optimizer (anulowanie: POST /api/jobs/<X-Job-Id>/cancel)
+        result = generate_schedule_optimized(data, deadline=deadline, job=job)
         
         # Log result
         print(f"\n{'='*80}")
@@ -433,77 +614,12 @@ def generate_schedule():
         print(f"{'='*80}\n")
         
         # Transform response for Next.js compatibility
-        if result['status'] == 'SUCCESS':
-            # Pobierz quality_percent z CP-SAT lub oblicz fallback
-            stats = result.get('statistics', {})
-            quality_percent = stats.get('quality_percent', 75.0)
-            shifts = result.get('shifts', [])
-            
-            # Konwertuj flat list shifts na format {emp_id: {date: [shifts]}} dla validatora
-            schedule = {}
-            for shift in shifts:
-                emp_id = shift.get('employee_id')
-                shift_date = shift.get('date')
-                if emp_id and shift_date:
-                    if emp_id not in schedule:
-                        schedule[emp_id] = {}
-                    if shift_date not in schedule[emp_id]:
-                        schedule[emp_id][shift_date] = []
-                    schedule[emp_id][shift_date].append(shift)
-            
-            return jsonify({
-                'success': True,
-                'schedule': schedule,  # Format dla validatora: {emp_id: {date: [shifts]}}
-                'data': {
-                    'shifts': shifts,
-                    'metrics': {
-                        'fitness': quality_percent,  # Teraz to procent 0-100%, nie raw objective
-                        'quality_percent': quality_percent,
-                        'total_shifts': len(shifts),
-                        'employees_count': len(data.get('employees', [])),
-                        'hours_balance': 0.8,
-                        'shift_balance': 0.9,
-                        'weekend_balance': 0.8,
-                        'preferences_score': 0.7,
-                        'shift_type_balance': 0.9,
-                        'labor_code_score': 1.0,
-                        'objective_value': stats.get('objective_value', 0)
-                    },
-                    'improvement': {
-                        'initial': {'fitness': 0},
-                        'final': {'fitness': quality_percent},
-                        'improvementPercent': quality_percent
-                    }
-                },
-                'status': 'SUCCESS',
-                # Dodaj stats w formacie kompatybilnym z testem
-                'statistics': {
-                    'status': stats.get('status', 'SUCCESS'),
-                    'solver_status': stats.get('status', 'OPTIMAL'),  # Dla kompatybilności z testem
-                    'total_shifts': len(shifts),
-                    'total_shifts_assigned': stats.get('total_shifts_assigned', len(shifts)),
-                    'solve_time_seconds': stats.get('solve_time_seconds', 0),
-                    'quality_percent': quality_percent,
-                    'objective_value': stats.get('objective_value', 0),
-                    'total_variables': stats.get('total_variables', 0),
-                    'hard_constraints': stats.get('hard_constraints', 0),
-                    'soft_constraints': stats.get('soft_constraints', 0),
-                    'conflicts': stats.get('conflicts', 0),
-                    'branches': stats.get('branches', 0)
-                }
-            }), 200
-        else:
-            return jsonify({
-                'success': False,
-                'error': result.get('error', 'Generation failed'),
-                'reasons': result.get('reasons', []),
-                'suggestions': result.get('suggestions', []),
-                'status': result['status']
-            }), 400
+        response, status_code = build_generate_response(result, data)
+        return jsonify(response), status_code
         
     except Exception as e:
         error_trace = traceback.format_exc()
-        print(f"\n❌ ERROR in /api/generate:")
+        print("\n❌ ERROR in /api/generate:")
         print(error_trace)
         
         return jsonify({
@@ -514,6 +630,148 @@ def generate_schedule():
         }), 500
 
 
+# Odstęp komentarzy keep-alive SSE (proxy Cloud Run zamyka bezczynne połączenia)
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def format_sse(event: str, payload: dict) -> str:
+    """Serializuje zdarzenie Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+@app.route('/api/generate/stream', methods=['POST', 'OPTIONS'])
+def generate_schedule_stream():
+    """
+    Generowanie grafiku ze streamingiem rozwiązań pośrednich (Server-Sent Events).
+    
+    Wejście jak /api/generate. Zdarzenia:
+    - solution: każde lepsze rozwiązanie (objective_value, objective_breakdown
+      per poziom, shifts_assigned; lista zmian przy ?shifts=1)
+    - result: końcowa odpowiedź w formacie /api/generate (+ http_status)
+    - error: wyjątek podczas generowania
+    
+    - job: pierwsze zdarzenie z id zadania (do /api/jobs/<id>/cancel)
+    
+    Zamknięcie połączenia przez klienta ("wystarczająco dobre") anuluje
+    zadanie - StopSearch na solverze zwalnia wątki od razu.
+    EventSource obsługuje tylko GET - klient czyta strumień przez fetch().
+    """
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    started = time.time()
+    is_valid, error_message = validate_api_key()
+    if not is_valid:
+        return jsonify({
+            'status': 'ERROR',
+            'error': error_message
+        }), 401
+    
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({
+            'status': 'ERROR',
+            'error': 'No JSON data provided'
+        }), 400
+    
+    job_id = request_job_id(data)
+    deadline, error = request_deadline(data, started)
+    if error:
+        return jsonify({
+            'status': 'ERROR',
+            'error': error
+        }), 400
+    data, error = prepare_generate_input(data)
+    if error:
+        return jsonify({
+            'status': 'ERROR',
+            'error': error
+        }), 400
+    
+    # Rejestracja przed zdarzeniem 'job' - klient dostaje id, które faktycznie anuluje
+    try:
+        job = SOLVE_JOBS.start(job_id)
+    except JobIdConflict:
+        return job_conflict_response(job_id)
+    
+    stream_shifts = request.args.get('shifts', '').lower() in ('1', 'true', 'yes')
+    events: queue.Queue = queue.Queue()
+    events.put(('job', {'job_id': job.id}))
+    
+    def on_solution(event: dict) -> bool:
+        events.put(('solution', event))
+        return False
+    
+    def run_generation():
+        try:
+            result = generate_schedule_optimized(
+                data, on_solution, stream_shifts, deadline=deadline, job=job
+            )
+            response, status_code = build_generate_response(result, data)
+            response['http_status'] = status_code
+            events.put(('result', response))
+        except Exception as e:
+            print("\n❌ ERROR in /api/generate/stream:")
+            print(traceback.format_exc())
+            events.put(('error', {'success': False, 'status': 'ERROR', 'error': str(e)}))
+        finally:
+            events.put(None)
+    
+    threading.Thread(target=run_generation, daemon=True).start()
+    
+    def stream():
+        try:
+            while True:
+                try:
+                    item = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+                yield format_sse(*item)
+        finally:
+            # Klient rozłączony - anuluj własne zadanie (no-op, gdy już zakończone)
+            job.cancel('client_disconnected')
+    
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST', 'OPTIONS'])
+def cancel_job(job_id):
+    """
+    Anuluje trwające generowanie (np. użytkownik opuścił stronę, timeout trasy Next.js).
+    
+    Solver przerywa wyszukiwanie, a wątki wracają do budżetu SOLVER_GOVERNOR.
+    """
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    is_valid, error_message = validate_api_key()
+    if not is_valid:
+        return jsonify({
+            'status': 'ERROR',
+            'error': error_message
+        }), 401
+    
+    if not SOLVE_JOBS.cancel(job_id, 'cancelled_by_client'):
+        return jsonify({
+            'success': False,
+            'status': 'NOT_FOUND',
+            'error': f'No running job {job_id}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'status': 'CANCELLING',
+        'job_id': job_id
+    }), 202
+
+
 @app.route('/api/validate', methods=['POST', 'OPTIONS'])
 def validate_constraints():
     """
@@ -652,7 +910,7 @@ if __name__ == '__main__':
     debug = os.getenv('DEBUG', 'False').lower() == 'true'
     
     print(f"\n{'='*80}")
-    print(f"🚀 Starting Calenda Schedule Python Scheduler")
+    print("🚀 Starting Calenda Schedule Python Scheduler")
     print(f"{'='*80}")
     print(f"Port: {port}")
     print(f"Debug: {debug}")
@@ -30,17 +30,31 @@ KLUCZOWE CECHY:
 - ZAWSZE zwraca FEASIBLE (nigdy INFEASIBLE)
 - Obsługa mieszanych długości zmian (6h, 8h, 12h)
 - Hierarchiczna funkcja celu gwarantuje prawidłowe priorytety
+- Opcjonalny tryb leksykograficzny (solver_options.objective_mode)
+- Silnik rolling horizon tydzień po tygodniu (solver_options.engine)
+- Dekompozycja na niezależne pule pracowników/szablonów (równoległe procesy)
+- Łamanie symetrii między identycznymi pracownikami (solver_options.symmetry_breaking)
+- Model zagregowany (liczności klas pracowników) z dezagregacją do osób
+- Tensor dostępności E×D×T (NumPy) zamiast wyszukiwań per komórka
 ================================================================================
 """
 
 from ortools.sat.python import cp_model
-from typing import Dict, List, Tuple, Optional, Set, Any
-from dataclasses import dataclass, field
-from datetime import datetime, date, timedelta
+import numpy as np
+from typing import Callable, Dict, List, Tuple, Optional, Set, Any
+from dataclasses import dataclass, field, astuple
+from datetime import datetime, date
 from calendar import monthrange
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+import contextlib
+import copy
+import hashlib
+import multiprocessing
+import os
+import threading
 import time
 import traceback
+import uuid
 
 
 # =============================================================================
@@ -101,24 +115,63 @@ LABOR_CODE = {
     'FREE_SUNDAY_INTERVAL': 4,            # Art. 151^10 KP
 }
 
+# Tryby funkcji celu:
+# - 'weighted': jedna ważona suma wszystkich poziomów (domyślny)
+# - 'lexicographic': poziomy rozwiązywane kolejno, optimum etapu ogranicza kolejne
+OBJECTIVE_MODES = ('weighted', 'lexicographic')
 
-# =============================================================================
-# COVERAGE CALCULATION - Obliczanie pokrycia godzin otwarcia
-# =============================================================================
+# Silniki rozwiązywania:
+# - 'monolithic': jeden model na cały miesiąc (domyślny)
+# - 'rolling_horizon': model tydzień po tygodniu ze stanem brzegowym
+# - 'auto': rolling_horizon dla bardzo dużych sklepów (E×D×T > próg)
+# - 'aggregated': liczności per (klasa identycznych pracowników, dzień, szablon)
+ENGINES = ('monolithic', 'rolling_horizon', 'auto', 'aggregated')
+ROLLING_HORIZON_AUTO_CELLS = 60_000   # np. 200 pracowników × 31 dni × 10 szablonów
+ROLLING_HORIZON_OVERLAP_DAYS = 2      # Dni "podglądu" za końcem tygodnia
+# Limit modelu dezagregacji jednej klasy (engine='aggregated'): pierwsze rozwiązanie
+# spełnia już reguły twarde, reszta czasu tylko wyrównuje godziny członków
+DISAGGREGATION_TIME_LIMIT_SECONDS = 2.0
 
-TIME_SLOT_MINUTES = 15
+# Domyślna liczba wątków wyszukiwania CP-SAT (na cały model) - górny limit,
+# faktyczny przydział wyznacza SOLVER_GOVERNOR wg limitu CPU kontenera
+DEFAULT_SEARCH_WORKERS = 16
+# Maks. czas oczekiwania w kolejce na wolne wątki [s] - potem start z 1 wątkiem
+SOLVER_QUEUE_TIMEOUT_SECONDS = float(os.getenv('SOLVER_QUEUE_TIMEOUT', 30))
+# Okres sprawdzania reguły stagnacji przez watchdog [s]
+EARLY_STOP_POLL_SECONDS = 0.25
+# Zapas przed deadline żądania na ekstrakcję wyniku i serializację odpowiedzi [s]
+DEADLINE_SAFETY_MARGIN_SECONDS = float(os.getenv('DEADLINE_SAFETY_MARGIN', 2.0))
+# Długość slotu dla HC5 (minimalne pokrycie godzin otwarcia)
+COVERAGE_SLOT_MINUTES = 30
 
-@dataclass
-class TimeSlot:
-    """Reprezentacja slotu czasowego do analizy pokrycia."""
-    start_minutes: int
-    end_minutes: int
-    min_employees: int = 1
-    
-    @property
-    def duration_minutes(self) -> int:
-        return self.end_minutes - self.start_minutes
+# Kodowanie konfliktów par zmian w kolejnych dniach:
+# - 'clause': kliki at-most-one (HC3) i klauzule Boolowskie (11h) - propagacja w rdzeniu SAT
+# - 'linear': jedno ograniczenie liniowe na parę (poprzednie kodowanie)
+CONFLICT_ENCODINGS = ('clause', 'linear')
+
+# Kodowanie sekwencji dni pracy (max dni z rzędu, 1 dzień wolny/tydzień):
+# - 'window': zmienna nadmiaru per okno 7 dni / tydzień (domyślne)
+# - 'automaton': jedno ograniczenie AddAutomaton per pracownik
+SEQUENCE_ENCODINGS = ('window', 'automaton')
 
+# Zgodność par szablonów (a w dniu D, b w dniu D+1)
+PAIR_OK = 0           # Odpoczynek >= min_daily_rest
+PAIR_SHORT_REST = 1   # 0 <= odpoczynek < min_daily_rest (miękkie)
+PAIR_OVERLAP = 2      # Zmiany się nakładają (twarde)
+
+# Etapy trybu leksykograficznego: (klucz poziomu, nazwa, domyślny udział w budżecie czasu)
+LEXICOGRAPHIC_STAGES: List[Tuple[str, str, float]] = [
+    ('level1', 'Godziny', 0.40),
+    ('level2', 'Coverage', 0.25),
+    ('level2_5', 'Balance obsady', 0.10),
+    ('level3', 'Kodeks Pracy', 0.15),
+    ('level4', 'Preferencje', 0.10),
+]
+
+
+# =============================================================================
+# COVERAGE CALCULATION - Obliczanie pokrycia godzin otwarcia
+# =============================================================================
 
 def parse_time_to_minutes(time_str: str, is_end_time: bool = False) -> int:
     """
@@ -158,41 +211,139 @@ def get_day_name_from_weekday(weekday: int) -> str:
 
 
 def calculate_coverage_slots(
-    open_time: str,
-    close_time: str,
-    min_employees: int = 1,
-    slot_duration: int = TIME_SLOT_MINUTES
-) -> List[TimeSlot]:
-    """Dzieli godziny otwarcia na sloty czasowe."""
-    open_minutes = parse_time_to_minutes(open_time)
-    close_minutes = parse_time_to_minutes(close_time)
-    
-    if close_minutes <= open_minutes:
-        close_minutes += 24 * 60
-    
-    slots = []
-    current = open_minutes
-    while current < close_minutes:
-        slot_end = min(current + slot_duration, close_minutes)
-        slots.append(TimeSlot(
-            start_minutes=current,
-            end_minutes=slot_end,
-            min_employees=min_employees
-        ))
-        current = slot_end
+    open_minutes: int,
+    close_minutes: int,
+    slot_duration: int = COVERAGE_SLOT_MINUTES
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Dzieli godziny otwarcia na sloty czasowe: (starty, końce) w minutach."""
+    starts = np.arange(open_minutes, close_minutes, slot_duration, dtype=np.int32)
+    ends = np.minimum(starts + slot_duration, close_minutes)
+    return starts, ends
+
+
+def template_slot_coverage(table, slot_starts: np.ndarray, slot_ends: np.ndarray) -> np.ndarray:
+    """
+    Macierz (T, S): szablon t pokrywa cały slot s.
+    
+    Kolumny zmieniają się tylko w slotach zawierających początek/koniec
+    któregoś szablonu - między tymi punktami kolejne sloty są identyczne.
+    """
+    return (table.start[:, None] <= slot_starts[None, :]) & (table.end[:, None] >= slot_ends[None, :])
+
+
+def minimal_covering_sets(cover: np.ndarray) -> List[Tuple[int, ...]]:
+    """
+    Redukuje kolumny macierzy pokrycia (T, S) do minimalnych zbiorów szablonów.
+    
+    - identyczne kolumny (sloty między tymi samymi punktami przełamania) -> jeden zbiór
+    - zbiór będący nadzbiorem innego jest zdominowany: sum(A) >= 1 wynika z sum(B) >= 1 dla B ⊆ A
+    - puste kolumny (slot nie do pokrycia) są pomijane
+    """
+    if cover.size == 0:
+        return []
+    columns = np.unique(cover.T, axis=0)
+    candidates = sorted(
+        (tuple(int(t) for t in np.flatnonzero(column)) for column in columns if column.any()),
+        key=lambda tmpl_set: (len(tmpl_set), tmpl_set),
+    )
+    kept: List[Tuple[int, ...]] = []
+    kept_sets: List[Set[int]] = []
+    for tmpl_set in candidates:
+        members = set(tmpl_set)
+        if any(smaller <= members for smaller in kept_sets):
+            continue
+        kept.append(tmpl_set)
+        kept_sets.append(members)
+    return kept
+
+
+# =============================================================================
+# WZORCE SEKWENCJI DNI - automat dla dni z rzędu i odpoczynku tygodniowego
+# =============================================================================
+
+def build_work_pattern_automaton(max_consecutive: int):
+    """
+    Buduje automat deterministyczny nad etykietami dnia: works + 2·consec + 4·no_rest.
+    
+    Stan = (pozycja w tygodniu 0-6, długość serii pracy 0..max_consecutive,
+    czy wszystkie dotychczasowe dni tygodnia były pracujące).
+    - consec = 1 gdy dzień pracy następuje po max_consecutive dniach pracy
+    - no_rest = 1 gdy ostatni (7.) dzień tygodnia kończy tydzień bez dnia wolnego
     
-    return slots
+    Returns:
+        (przejścia [(stan, etykieta, stan)], funkcja stan -> id, liczba stanów)
+    """
+    run_states = max_consecutive + 1
+    
+    def state_id(pos: int, run: int, full: bool) -> int:
+        return (pos * run_states + run) * 2 + int(full)
+    
+    transitions = []
+    for pos in range(7):
+        for run in range(run_states):
+            for full in (False, True):
+                for works in (0, 1):
+                    consec = 1 if works and run == max_consecutive else 0
+                    next_run = min(run + 1, max_consecutive) if works else 0
+                    week_full = bool(works) and (full or pos == 0)
+                    no_rest = 1 if pos == 6 and week_full else 0
+                    transitions.append((
+                        state_id(pos, run, full),
+                        works + 2 * consec + 4 * no_rest,
+                        state_id((pos + 1) % 7, next_run, week_full and pos < 6),
+                    ))
+    
+    return transitions, state_id, 7 * run_states * 2
 
 
-def does_template_cover_slot(template, slot: TimeSlot) -> bool:
-    """Sprawdza czy dany szablon zmiany pokrywa slot czasowy."""
-    tmpl_start = parse_time_to_minutes(template.start_time)
-    tmpl_end = parse_time_to_minutes(template.end_time)
+# =============================================================================
+# OSIĄGALNE GODZINY - subset-sum po dniach i długościach szablonów
+# =============================================================================
+
+def reachable_minute_totals(day_options: List[np.ndarray]) -> Tuple[np.ndarray, int]:
+    """
+    Programowanie dynamiczne: osiągalne sumy minut przy max 1 zmianie dziennie.
+    
+    Args:
+        day_options: Per dzień tablica możliwych długości zmian (0 = dzień wolny)
     
-    if tmpl_end <= tmpl_start:
-        tmpl_end += 24 * 60
+    Returns:
+        (maska osiągalności indeksowana sumą / step, step = NWD długości)
+    """
+    durations = np.concatenate(day_options) if day_options else np.zeros(1, dtype=np.int64)
+    positive = durations[durations > 0]
+    step = int(np.gcd.reduce(positive)) if positive.size else 1
+    
+    units_per_day = [np.unique(np.asarray(options, dtype=np.int64) // step) for options in day_options]
+    reachable = np.zeros(sum(int(units.max()) for units in units_per_day) + 1, dtype=bool)
+    reachable[0] = True
+    high = 0
+    for units in units_per_day:
+        shifted = np.zeros_like(reachable)
+        for unit in units:
+            shifted[unit:unit + high + 1] |= reachable[:high + 1]
+        reachable = shifted
+        high += int(units.max())
+    return reachable, step
+
+
+def nearest_reachable_target(reachable: np.ndarray, step: int, target: int, buffer: int) -> int:
+    """
+    Najbliższa osiągalna suma minut dla okna [target, target + buffer].
     
-    return tmpl_start <= slot.start_minutes and tmpl_end >= slot.end_minutes
+    Gdy okno zawiera osiągalną sumę - target bez zmian. W przeciwnym razie
+    bliższa z sum poniżej/powyżej okna (remis: powyżej, żeby wyrobić normę).
+    """
+    totals = np.flatnonzero(reachable) * step
+    if np.any((totals >= target) & (totals <= target + buffer)):
+        return target
+    below = totals[totals < target]
+    above = totals[totals > target + buffer]
+    gap_below = target - int(below.max()) if below.size else None
+    gap_above = int(above.min()) - (target + buffer) if above.size else None
+    if gap_above is None or (gap_below is not None and gap_below < gap_above):
+        return int(below.max())
+    return int(above.min())
 
 
 # =============================================================================
@@ -329,6 +480,96 @@ class ShiftTemplate:
         return end <= start
 
 
+@dataclass(frozen=True, slots=True)
+class CompiledTemplate:
+    """
+    Skompilowany szablon zmiany - wartości minutowe policzone raz.
+
+    weekday_mask: bit w = szablon dozwolony w dzień tygodnia w (0=pon..6=nd).
+    """
+    index: int
+    id: str
+    start: int
+    end: int
+    duration: int
+    is_night: bool
+    weekday_mask: int
+
+
+class TemplateTable:
+    """
+    Niemutowalna tabela szablonów (T rekordów + kolumny NumPy tylko do odczytu).
+
+    Zastępuje wielokrotne parsowanie start_time/end_time w pętlach ograniczeń:
+    - table[t].start / .end / .duration - szybki odczyt pojedynczego szablonu
+    - table.start / .end / .duration / .is_night - kolumny (T,) do operacji wektorowych
+    - table.weekday_mask - macierz (T, 7) dozwolonych dni tygodnia
+    """
+    __slots__ = ('records', 'start', 'end', 'duration', 'is_night', 'weekday_mask')
+
+    def __init__(self, templates: List[ShiftTemplate]):
+        day_names = [get_day_name_from_weekday(w) for w in range(7)]
+        records = []
+        for index, t in enumerate(templates):
+            bits = 0
+            for w, name in enumerate(day_names):
+                if not t.applicable_days or name in t.applicable_days:
+                    bits |= 1 << w
+            records.append(CompiledTemplate(
+                index=index,
+                id=t.id,
+                start=t.get_start_minutes(),
+                end=t.get_end_minutes(),
+                duration=t.get_duration_minutes(),
+                is_night=t.is_night_shift(),
+                weekday_mask=bits,
+            ))
+        self.records: Tuple[CompiledTemplate, ...] = tuple(records)
+
+        self.start = self._column([r.start for r in records], np.int32)
+        self.end = self._column([r.end for r in records], np.int32)
+        self.duration = self._column([r.duration for r in records], np.int32)
+        self.is_night = self._column([r.is_night for r in records], bool)
+        bits = np.array([r.weekday_mask for r in records], dtype=np.int32)
+        self.weekday_mask = self._column(
+            ((bits[:, None] >> np.arange(7)[None, :]) & 1).astype(bool), bool
+        ).reshape(len(records), 7)
+
+    @staticmethod
+    def _column(values, dtype) -> np.ndarray:
+        array = np.array(values, dtype=dtype)
+        array.flags.writeable = False
+        return array
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index: int) -> CompiledTemplate:
+        return self.records[index]
+
+    def __iter__(self):
+        return iter(self.records)
+
+
+@dataclass(frozen=True, slots=True)
+class LinearRow:
+    """
+    Wyrażenie sum(coeffs · x[indices]) + offset na indeksach zmiennych proto.
+    
+    Wiersze z gęstego indeksu emitowane są wprost do proto, bez budowania
+    drzew LinearExpr (kosztownych przy setkach pracowników).
+    """
+    indices: np.ndarray
+    coeffs: np.ndarray
+    offset: int = 0
+    
+    def __add__(self, constant: int) -> 'LinearRow':
+        return LinearRow(self.indices, self.coeffs, self.offset + constant)
+    
+    def __sub__(self, constant: int) -> 'LinearRow':
+        return self + (-constant)
+
+
 @dataclass
 class Absence:
     """Reprezentacja nieobecności pracownika."""
@@ -461,9 +702,18 @@ class DataModel:
             print(f"   • {t.name}: {t.start_time}-{t.end_time} ({t.get_duration_minutes()}min) | Dni: {days_info}")
     
     def _parse_absences(self):
-        """Parsuje nieobecności pracowników."""
+        """
+        Parsuje nieobecności pracowników.
+        
+        Nieobecności trzymane są jako bitset dni miesiąca per pracownik
+        (bit day-1), zakres dat przycinany jest do miesiąca bez iteracji
+        dzień po dniu.
+        """
         self.absences: List[Absence] = []
-        self.absence_map: Dict[str, Set[str]] = defaultdict(set)
+        self.absence_bits: Dict[str, int] = defaultdict(int)
+        
+        month_start = date(self.year, self.month, 1)
+        month_end = date(self.year, self.month, self.days_in_month)
         
         for abs_data in self.raw_data.get('employee_absences', []):
             absence = Absence(
@@ -475,27 +725,17 @@ class DataModel:
             self.absences.append(absence)
             
             try:
-                start = datetime.strptime(absence.start_date, '%Y-%m-%d').date()
-                end = datetime.strptime(absence.end_date, '%Y-%m-%d').date()
-                current = start
-                while current <= end:
-                    if current.year == self.year and current.month == self.month:
-                        date_str = current.strftime('%Y-%m-%d')
-                        self.absence_map[absence.employee_id].add(date_str)
-                    current += timedelta(days=1)
+                start = max(date.fromisoformat(absence.start_date[:10]), month_start)
+                end = min(date.fromisoformat(absence.end_date[:10]), month_end)
             except ValueError:
-                pass
+                continue
+            if start <= end:
+                span = end.day - start.day + 1
+                self.absence_bits[absence.employee_id] |= ((1 << span) - 1) << (start.day - 1)
         
+        weekday_bits = sum(1 << (day - 1) for day in self.weekdays)
         for emp in self.employees:
-            absence_dates = self.absence_map.get(emp.id, set())
-            work_day_absences = 0
-            for date_str in absence_dates:
-                try:
-                    d = datetime.strptime(date_str, '%Y-%m-%d').date()
-                    if d.weekday() < 5:
-                        work_day_absences += 1
-                except ValueError:
-                    pass
+            work_day_absences = bin(self.absence_bits.get(emp.id, 0) & weekday_bits).count('1')
             emp.absence_days_count = work_day_absences
             if work_day_absences > 0:
                 print(f"   📋 {emp.full_name}: {work_day_absences} dni roboczych nieobecności")
@@ -597,14 +837,93 @@ class DataModel:
         self.max_weekly_hours = rules.get('max_weekly_work_hours', LABOR_CODE['MAX_WEEKLY_HOURS'])
         
         self.solver_time_limit = self.raw_data.get('solver_time_limit', 300)
-        
-        print(f"\n🕐 Godziny otwarcia:")
+        # Deadline żądania (time.time()); ustawiany przez generate_schedule_optimized
+        self.deadline: Optional[float] = None
+
+        # Opcje solvera (tryb funkcji celu itd.)
+        options = self.raw_data.get('solver_options') or {}
+        self.objective_mode = options.get('objective_mode', 'weighted')
+        if self.objective_mode not in OBJECTIVE_MODES:
+            print(f"   ⚠️ Nieznany tryb funkcji celu '{self.objective_mode}' - używam 'weighted'")
+            self.objective_mode = 'weighted'
+
+        # Udział poszczególnych etapów w budżecie czasu (tryb leksykograficzny)
+        shares_raw = options.get('lexicographic_time_shares') or {}
+        self.lexicographic_time_shares: Dict[str, float] = {
+            key: float(shares_raw.get(key, default_share))
+            for key, _, default_share in LEXICOGRAPHIC_STAGES
+        }
+
+        # Silnik rozwiązywania (monolityczny / tydzień po tygodniu)
+        self.engine = options.get('engine', 'monolithic')
+        if self.engine not in ENGINES:
+            print(f"   ⚠️ Nieznany silnik '{self.engine}' - używam 'monolithic'")
+            self.engine = 'monolithic'
+        self.rolling_overlap_days = int(options.get('rolling_overlap_days', ROLLING_HORIZON_OVERLAP_DAYS))
+        # Dekompozycja na rozłączne pule (template_assignments) rozwiązywane równolegle
+        self.decomposition = bool(options.get('decomposition', True))
+        self.num_search_workers = int(options.get('num_search_workers', DEFAULT_SEARCH_WORKERS))
+        # Łamanie symetrii między wymiennymi pracownikami
+        self.symmetry_breaking = bool(options.get('symmetry_breaking', True))
+        # Kompakcja modelu: relacje liniowe z jednostronnym slackiem zamiast AddMaxEquality
+        self.model_compaction = bool(options.get('model_compaction', True))
+        # Nazwy zmiennych CP-SAT tylko do debugowania (mniej pamięci i szybsza budowa bez nich)
+        self.variable_names = bool(options.get('variable_names', False))
+        # Okno godzin wg osiągalnych sum minut (subset-sum po dniach i długościach)
+        self.reachable_hours = bool(options.get('reachable_hours', True))
+        # Skalowanie czasu: minuty w jednostkach NWD (długości, cele, limit 48h)
+        # i normalizacja wag celu przez ich NWD
+        self.time_scaling = bool(options.get('time_scaling', True))
+        # Kodowanie konfliktów par zmian (HC3, odpoczynek 11h): klauzule/kliki lub liniowe
+        self.conflict_encoding = options.get('conflict_encoding', 'clause')
+        if self.conflict_encoding not in CONFLICT_ENCODINGS:
+            print(f"   ⚠️ Nieznane kodowanie konfliktów '{self.conflict_encoding}' - używam 'clause'")
+            self.conflict_encoding = 'clause'
+        self.sequence_encoding = options.get('sequence_encoding', 'window')
+        if self.sequence_encoding not in SEQUENCE_ENCODINGS:
+            print(f"   ⚠️ Nieznane kodowanie sekwencji '{self.sequence_encoding}' - używam 'window'")
+            self.sequence_encoding = 'window'
+        
+        # Reguły wczesnego zatrzymania (None / False = wyłączone):
+        # brak poprawy przez N s, względna luka do ograniczenia <= X, zerowe kary L1 i L2
+        stagnation = options.get('stop_after_stagnation_seconds')
+        self.stop_stagnation_seconds = float(stagnation) if stagnation is not None else None
+        relative_gap = options.get('stop_at_relative_gap')
+        self.stop_relative_gap = float(relative_gap) if relative_gap is not None else None
+        self.stop_when_priorities_met = bool(options.get('stop_when_priorities_met', False))
+        
+        # Warm start: hinty z poprzedniego rozwiązania lub szkicu od klienta
+        self.warm_start_enabled = bool(options.get('warm_start', True))
+        # Heurystyka zachłanna: hint (gdy brak innego) i awaryjne rozwiązanie
+        self.greedy_hint = bool(options.get('greedy_hint', True))
+        self.greedy_fallback = bool(options.get('greedy_fallback', True))
+        self.draft_schedule: List[Dict] = self.raw_data.get('draft_schedule') or []
+        # Zadanie w rejestrze SOLVE_JOBS (anulowanie) - ustawiane przez generate_schedule_optimized
+        self.job: Optional['SolveJob'] = None
+        self.organization_key = self._resolve_organization_key(org)
+
+        print("\n🕐 Godziny otwarcia:")
         for day_name, hours in self.opening_hours.items():
             if hours['open'] and hours['close']:
                 print(f"   {day_name}: {hours['open']} - {hours['close']}")
             else:
                 print(f"   {day_name}: ZAMKNIĘTE")
     
+    def _resolve_organization_key(self, org: Dict) -> str:
+        """
+        Zwraca klucz organizacji dla magazynu rozwiązań.
+        
+        Jeśli payload nie zawiera organization_id, klucz jest odciskiem
+        zbioru pracowników i szablonów (ta sama obsada = ta sama organizacja).
+        """
+        org_id = self.raw_data.get('organization_id') or org.get('organization_id')
+        if org_id:
+            return str(org_id)
+        
+        fingerprint = '|'.join(sorted(e.id for e in self.employees)) + '#' + \
+            '|'.join(sorted(t.id for t in self.templates))
+        return 'fp_' + hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+    
     def _build_indices(self):
         """Buduje mapowania indeksów dla szybkiego dostępu."""
         self.emp_idx: Dict[str, int] = {e.id: i for i, e in enumerate(self.employees)}
@@ -614,6 +933,105 @@ class DataModel:
         for day in self.all_days:
             d = date(self.year, self.month, day)
             self.day_to_weekday[day] = d.weekday()
+        
+        # Stan okna (rolling horizon) - dla pełnego miesiąca puste
+        self.fixed_days: Set[int] = set()
+        self.fixed_assignments: Dict[Tuple[int, int], int] = {}
+        self.target_minutes_override: Dict[int, int] = {}
+        # Sloty HC5 (dzień, start) pilnowane przez inną pulę (dekompozycja)
+        self.delegated_coverage_slots: Set[Tuple[int, int]] = set()
+        
+        self._build_template_compatibility()
+        self._build_availability()
+    
+    def _build_availability(self):
+        """
+        Kompiluje tensor dostępności E×D×T (NumPy, indeks dnia = day - 1).
+        
+        availability[e, d, t] = dzień pracy ∧ brak nieobecności ∧
+        szablon przypisany pracownikowi ∧ szablon dozwolony w dany dzień tygodnia.
+        Wszystkie dalsze sprawdzenia indeksują te maski zamiast parsować daty.
+        """
+        day_numbers = np.arange(1, self.days_in_month + 1)
+        weekday_of_day = np.array([self.day_to_weekday[d] for d in day_numbers], dtype=np.int8)
+        
+        # (D,) dzień pracy: nie-niedziela albo niedziela handlowa
+        self.workable_mask = (weekday_of_day != 6) | np.isin(day_numbers, sorted(self.trading_sundays))
+        
+        # (E, D) nieobecności z bitsetów
+        bits = np.array([self.absence_bits.get(e.id, 0) for e in self.employees], dtype=np.int64)
+        self.absence_mask = ((bits[:, None] >> (day_numbers[None, :] - 1)) & 1).astype(bool)
+        
+        # (T, D) szablon dozwolony w dzień tygodnia
+        self.template_day_mask = self.template_table.weekday_mask[:, weekday_of_day]
+        
+        # (E, T) przypisania szablonów (puste template_assignments = wszystkie)
+        self.employee_template_mask = np.array(
+            [
+                [not e.template_assignments or t.id in e.template_assignments for t in self.templates]
+                for e in self.employees
+            ],
+            dtype=bool,
+        ).reshape(len(self.employees), len(self.templates))
+        
+        # (E, D) dzień dostępny i (E, D, T) pełny tensor dostępności
+        self.available_mask = self.workable_mask[None, :] & ~self.absence_mask
+        self.availability = (
+            self.available_mask[:, :, None]
+            & self.employee_template_mask[:, None, :]
+            & self.template_day_mask.T[None, :, :]
+        )
+    
+    def _build_template_compatibility(self):
+        """
+        Macierz T×T zgodności szablonów w kolejnych dniach (liczona raz).
+        
+        rest = start_b + 24h - end_a (end_a > 1440 dla zmian nocnych):
+        - rest < 0: nakładanie (HC3, twarde)
+        - rest < min_daily_rest: krótki odpoczynek (11h, miękkie)
+        Ograniczenia iterują tylko po niezerowych parach konfliktów.
+        """
+        self.template_table = TemplateTable(self.templates)
+        self._coverage_cache: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = {}
+        
+        min_rest = self.min_daily_rest_hours * 60
+        num_templates = len(self.templates)
+        rest_matrix = (
+            self.template_table.start[None, :].astype(np.int64) + 24 * 60
+            - self.template_table.end[:, None]
+        )
+        self.template_rest_minutes: List[List[int]] = rest_matrix.tolist()
+        self.template_pair_conflict: List[List[int]] = [[PAIR_OK] * num_templates for _ in range(num_templates)]
+        self.overlap_successors: Dict[int, List[int]] = defaultdict(list)
+        self.short_rest_successors: Dict[int, List[int]] = defaultdict(list)
+        
+        for a in range(num_templates):
+            for b in range(num_templates):
+                rest = self.template_rest_minutes[a][b]
+                if rest < 0:
+                    self.template_pair_conflict[a][b] = PAIR_OVERLAP
+                    self.overlap_successors[a].append(b)
+                elif rest < min_rest:
+                    self.template_pair_conflict[a][b] = PAIR_SHORT_REST
+                    self.short_rest_successors[a].append(b)
+        
+        self.overlap_bicliques = self._group_bicliques(self.overlap_successors)
+        self.short_rest_bicliques = self._group_bicliques(self.short_rest_successors)
+    
+    @staticmethod
+    def _group_bicliques(successors: Dict[int, List[int]]) -> List[Tuple[Tuple[int, ...], Tuple[int, ...]]]:
+        """
+        Grupuje pary konfliktów (a w dniu D, b w dniu D+1) w bikliki A × B.
+        
+        Szablony dnia D o identycznym zbiorze następców tworzą jedną grupę.
+        Ponieważ HC1 pozwala na max 1 zmianę dziennie, A ∪ B jest kliką
+        (at-most-one) - jedno ograniczenie zamiast |A|·|B| par.
+        """
+        groups: Dict[Tuple[int, ...], List[int]] = defaultdict(list)
+        for a, next_templates in sorted(successors.items()):
+            if next_templates:
+                groups[tuple(next_templates)].append(a)
+        return [(tuple(firsts), seconds) for seconds, firsts in groups.items()]
     
     def _log_summary(self):
         """Loguje podsumowanie danych."""
@@ -626,30 +1044,195 @@ class DataModel:
         print(f"  Niedziele handlowe: {len(self.trading_sundays)}")
         print(f"  Norma miesięczna:  {self.monthly_norm_hours}h")
         print(f"  Limit czasowy:     {self.solver_time_limit}s")
+        print(f"  Tryb celu:         {self.objective_mode}")
+        print(f"  Silnik:            {self.engine}")
         print(f"{'='*60}\n")
     
     def is_workable_day(self, day: int) -> bool:
         """Sprawdza czy dany dzień jest dniem pracy."""
-        weekday = self.day_to_weekday[day]
-        if weekday == 6:
-            return day in self.trading_sundays
-        return True
+        return bool(self.workable_mask[day - 1])
     
     def is_employee_absent(self, emp_id: str, day: int) -> bool:
         """Sprawdza czy pracownik ma nieobecność w danym dniu."""
-        date_str = f"{self.year}-{self.month:02d}-{day:02d}"
-        return date_str in self.absence_map.get(emp_id, set())
+        return bool((self.absence_bits.get(emp_id, 0) >> (day - 1)) & 1)
     
     def can_template_be_used_on_day(self, template: ShiftTemplate, day: int) -> bool:
         """Sprawdza czy szablon może być użyty w danym dniu."""
-        if not template.applicable_days:
-            return True
+        return bool(self.template_day_mask[self.tmpl_idx[template.id], day - 1])
+    
+    def solve_budget(self, limit: float) -> float:
+        """
+        Czas dla CP-SAT: min(limit, czas do deadline żądania - zapas na ekstrakcję).
         
-        weekday = self.day_to_weekday[day]
-        day_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        day_name = day_names[weekday]
+        Budowa modelu i kolejka są już odliczone, bo deadline jest bezwzględny.
+        """
+        if self.deadline is None:
+            return limit
+        return min(limit, self.deadline - time.time() - DEADLINE_SAFETY_MARGIN_SECONDS)
+    
+    def check_deadline(self):
+        """DeadlineExceeded, gdy na rozwiązywanie nie zostało już czasu."""
+        if self.deadline is not None and self.solve_budget(float('inf')) <= 0:
+            raise DeadlineExceeded('deadline')
+    
+    def get_target_minutes(self, emp_idx: int) -> int:
+        """Docelowa liczba minut pracownika (z uwzględnieniem okna rolling horizon)."""
+        if emp_idx in self.target_minutes_override:
+            return self.target_minutes_override[emp_idx]
+        return self.employees[emp_idx].get_target_minutes(self.monthly_norm_minutes, len(self.weekdays))
+    
+    def restrict_to_days(
+        self,
+        days: List[int],
+        fixed_assignments: Dict[Tuple[int, int], int],
+        fixed_days: Set[int],
+        target_overrides: Dict[int, int],
+    ) -> 'DataModel':
+        """
+        Zwraca widok modelu danych ograniczony do podzbioru dni (okno).
+        
+        Args:
+            days: Kolejne dni okna (look-back + tydzień + podgląd)
+            fixed_assignments: Zatwierdzone przypisania (emp_idx, day) -> tmpl_idx
+            fixed_days: Dni look-back - bez zmiennych decyzyjnych, tylko stałe
+            target_overrides: Cel minut per pracownik dla okna
+        """
+        view = copy.copy(self)
+        day_set = set(days)
+        view.all_days = sorted(day_set)
+        view.weekdays = [d for d in self.weekdays if d in day_set]
+        view.saturdays = [d for d in self.saturdays if d in day_set]
+        view.sundays = [d for d in self.sundays if d in day_set]
+        view.trading_sundays = {d for d in self.trading_sundays if d in day_set}
+        view.fixed_days = set(fixed_days)
+        view.fixed_assignments = {
+            key: tmpl_idx for key, tmpl_idx in fixed_assignments.items() if key[1] in view.fixed_days
+        }
+        view.target_minutes_override = dict(target_overrides)
+        return view
+    
+    def allowed_template_indices(self, emp_idx: int) -> Set[int]:
+        """Szablony, które pracownik może obsadzić (puste template_assignments = wszystkie)."""
+        return set(np.flatnonzero(self.employee_template_mask[emp_idx]).tolist())
+    
+    def find_components(self) -> List[Tuple[List[int], List[int]]]:
+        """
+        Spójne składowe grafu dwudzielnego pracownik-szablon (union-find).
+        
+        Pracownicy i szablony bez krawędzi (brak zmiennych) dołączane są do
+        pierwszej składowej - nie wpływają na rozwiązanie.
+        
+        Returns:
+            Lista (indeksy pracowników, indeksy szablonów) per składowa
+        """
+        num_employees = len(self.employees)
+        parent = list(range(num_employees + len(self.templates)))
+        
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+        
+        linked: Set[int] = set()
+        for emp_idx in range(num_employees):
+            for tmpl_idx in self.allowed_template_indices(emp_idx):
+                node = num_employees + tmpl_idx
+                parent[find(emp_idx)] = find(node)
+                linked.update((emp_idx, node))
+        
+        groups: Dict[int, Tuple[List[int], List[int]]] = {}
+        for node in sorted(linked):
+            emps, tmpls = groups.setdefault(find(node), ([], []))
+            if node < num_employees:
+                emps.append(node)
+            else:
+                tmpls.append(node - num_employees)
+        
+        components = list(groups.values())
+        if not components:
+            return [(list(range(num_employees)), list(range(len(self.templates))))]
+        
+        components[0][0].extend(e for e in range(num_employees) if e not in linked)
+        components[0][1].extend(t for t in range(len(self.templates)) if num_employees + t not in linked)
+        return components
+    
+    def restrict_to_component(
+        self,
+        emp_indices: List[int],
+        tmpl_indices: List[int],
+        delegated_slots: Set[Tuple[int, int]],
+        search_workers: int,
+    ) -> 'DataModel':
+        """Zwraca widok modelu danych z podzbiorem pracowników i szablonów (jedna pula)."""
+        view = copy.copy(self)
+        view.employees = [self.employees[e] for e in sorted(emp_indices)]
+        view.templates = [self.templates[t] for t in sorted(tmpl_indices)]
+        view.emp_idx = {e.id: i for i, e in enumerate(view.employees)}
+        view.tmpl_idx = {t.id: i for i, t in enumerate(view.templates)}
+        view.delegated_coverage_slots = set(delegated_slots)
+        view._build_template_compatibility()
+        view._build_availability()
+        view.num_search_workers = search_workers
+        # Pula dziedziczy normy całego miesiąca - override z indeksami rodzica nie ma sensu
+        view.target_minutes_override = {}
+        return view
+    
+    def employee_equivalence_classes(self, include_singletons: bool = False) -> List[List[int]]:
+        """
+        Grupuje wymiennych pracowników (domyślnie klasy o co najmniej 2 członkach).
+        
+        Pracownicy są wymienni, gdy model traktuje ich identycznie: ten sam
+        etat i norma, te same szablony, rola kierownika, preferencje,
+        nieobecności i zatwierdzone zmiany (rolling horizon).
+        """
+        classes: Dict[Tuple, List[int]] = defaultdict(list)
+        for emp_idx, emp in enumerate(self.employees):
+            pref = self.preferences.get(emp.id)
+            signature = (
+                emp.employment_type,
+                emp.custom_hours,
+                emp.max_hours,
+                emp.is_supervisor,
+                self.get_target_minutes(emp_idx),
+                tuple(sorted(self.allowed_template_indices(emp_idx))),
+                self.absence_bits.get(emp.id, 0),
+                repr(astuple(pref)[1:]) if pref else None,
+                tuple(sorted(
+                    (day, tmpl_idx) for (e, day), tmpl_idx in self.fixed_assignments.items() if e == emp_idx
+                )),
+            )
+            classes[signature].append(emp_idx)
+        min_size = 1 if include_singletons else 2
+        return [members for members in classes.values() if len(members) >= min_size]
+    
+    def get_opening_minutes(self, day: int) -> Optional[Tuple[int, int]]:
+        """Godziny otwarcia w danym dniu jako (open, close) w minutach lub None."""
+        day_hours = self.opening_hours.get(get_day_name_from_weekday(self.day_to_weekday[day]), {})
+        open_time = day_hours.get('open')
+        close_time = day_hours.get('close')
+        if not open_time or not close_time:
+            return None
+        return parse_time_to_minutes(open_time), parse_time_to_minutes(close_time, is_end_time=True)
+    
+    def coverage_matrix(self, open_minutes: int, close_minutes: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sloty HC5 i macierz (T, S) pokrycia szablon × slot dla godzin otwarcia.
         
-        return day_name in template.applicable_days
+        Liczone raz na parę (open, close) - dni o tych samych godzinach
+        współdzielą macierz. Zwraca (starty slotów, macierz pokrycia).
+        """
+        key = (open_minutes, close_minutes)
+        cached = self._coverage_cache.get(key)
+        if cached is None:
+            slot_starts, slot_ends = calculate_coverage_slots(open_minutes, close_minutes)
+            cached = (slot_starts, template_slot_coverage(self.template_table, slot_starts, slot_ends))
+            self._coverage_cache[key] = cached
+        return cached
+    
+    def is_available(self, emp_idx: int, day: int) -> bool:
+        """Czy pracownik może pracować w danym dniu (dzień pracy i brak nieobecności)."""
+        return bool(self.available_mask[emp_idx, day - 1])
     
     def get_date_string(self, day: int) -> str:
         """Zwraca datę w formacie YYYY-MM-DD."""
@@ -658,158 +1241,955 @@ class DataModel:
     def get_week_number(self, day: int) -> int:
         """Zwraca numer tygodnia w miesiącu (0-4)."""
         return (day - 1) // 7
+    
+    def build_shift(self, emp_idx: int, day: int, tmpl_idx: int) -> Dict:
+        """Buduje słownik zmiany w formacie odpowiedzi API."""
+        emp = self.employees[emp_idx]
+        tmpl = self.templates[tmpl_idx]
+        
+        return {
+            'employee_id': emp.id,
+            'employee_name': emp.full_name,
+            'date': self.get_date_string(day),
+            'day': day,
+            'template_id': tmpl.id,
+            'template_name': tmpl.name,
+            'start_time': tmpl.start_time,
+            'end_time': tmpl.end_time,
+            'duration_minutes': self.template_table[tmpl_idx].duration,
+            'color': tmpl.color or emp.color,
+        }
+
+
+def hours_quality_percent(data: DataModel, shifts: List[Dict]) -> float:
+    """Jakość: odsetek normy godzinowej trafionej łącznie przez wszystkich pracowników."""
+    minutes_by_employee: Dict[str, int] = defaultdict(int)
+    for shift in shifts:
+        minutes_by_employee[shift['employee_id']] += shift['duration_minutes']
+    
+    total_target = 0
+    total_deviation = 0
+    for emp_idx, emp in enumerate(data.employees):
+        target = data.get_target_minutes(emp_idx)
+        total_target += target
+        total_deviation += abs(minutes_by_employee.get(emp.id, 0) - target)
+    
+    quality_percent = 100.0 * (1 - total_deviation / total_target) if total_target else 0.0
+    return max(0.0, min(100.0, quality_percent))
 
 
 # =============================================================================
-# CP-SAT SCHEDULER v4.0 - HIERARCHICZNA OPTYMALIZACJA
+# MAGAZYN ROZWIĄZAŃ - Warm start z poprzednich generacji
 # =============================================================================
 
-class CPSATScheduler:
+class SolutionStore:
     """
-    Główna klasa optymalizatora CP-SAT v4.0.
+    Pamięć ostatnich zaakceptowanych grafików per (organizacja, rok, miesiąc).
     
-    Implementuje hierarchiczną funkcję celu z gwarancją FEASIBLE:
-    - TWARDE: max 1 zmiana/dzień, zakaz pracy w urlop
-    - P1: Godziny w oknie [Norma, Norma+8h]
-    - P2: Coverage ze slack
-    - P3: Kodeks Pracy jako soft
-    - P4: Preferencje
+    Menedżerowie wielokrotnie generują ten sam miesiąc po drobnych zmianach -
+    ostatnie rozwiązanie jest dobrym punktem startowym (hintem) dla CP-SAT.
+    Magazyn jest procesowy (LRU) i bezpieczny wątkowo (gunicorn --threads).
     """
     
-    def __init__(self, data: DataModel):
-        self.data = data
-        self.model = cp_model.CpModel()
-        
-        # Zmienne decyzyjne
-        self.shifts: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
-        self.works_day: Dict[Tuple[int, int], cp_model.IntVar] = {}
-        
-        # Zmienne pomocnicze dla godzin
-        self.total_minutes_vars: Dict[int, cp_model.IntVar] = {}
-        
-        # Zmienne slack dla coverage
-        self.coverage_slack: Dict[Tuple[int, int], cp_model.IntVar] = {}
-        
-        # Funkcja celu - różne poziomy
-        self.objective_level1: List[Tuple[cp_model.IntVar, int, str]] = []  # Godziny
-        self.objective_level2: List[Tuple[cp_model.IntVar, int, str]] = []  # Coverage
-        self.objective_level2_5: List[Tuple[cp_model.IntVar, int, str]] = []  # Balance obsady
-        self.objective_level3: List[Tuple[cp_model.IntVar, int, str]] = []  # Kodeks Pracy
-        self.objective_level4: List[Tuple[cp_model.IntVar, int, str]] = []  # Preferencje
-        
-        self.stats = {
-            'total_variables': 0,
-            'hard_constraints': 0,
-            'soft_constraints': 0,
-        }
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[str, int, int], List[Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
     
-    # =========================================================================
-    # KROK 1: Tworzenie zmiennych decyzyjnych
-    # =========================================================================
+    def get(self, org_key: str, year: int, month: int) -> Optional[List[Dict]]:
+        """Zwraca ostatnie zaakceptowane przypisania lub None."""
+        key = (org_key, year, month)
+        with self._lock:
+            assignments = self._entries.get(key)
+            if assignments is not None:
+                self._entries.move_to_end(key)
+            return assignments
     
-    def create_decision_variables(self):
-        """Tworzy zmienne decyzyjne dla każdej możliwej kombinacji."""
-        print("\n🔧 Tworzenie zmiennych decyzyjnych...")
-        
-        skipped_day_mismatch = 0
-        skipped_no_assignment = 0
-        skipped_absence = 0
-        
-        for emp_idx, emp in enumerate(self.data.employees):
-            for day in self.data.all_days:
-                # Niedziela niehandlowa - brak zmiennych
-                if not self.data.is_workable_day(day):
-                    continue
-                
-                # TWARDE: Absolutny zakaz pracy w dni nieobecności
-                # Nie tworzymy zmiennych dla dni urlopowych
-                if self.data.is_employee_absent(emp.id, day):
-                    skipped_absence += 1
-                    continue
-                
-                for tmpl_idx, tmpl in enumerate(self.data.templates):
-                    if emp.template_assignments:
-                        if tmpl.id not in emp.template_assignments:
-                            skipped_no_assignment += 1
-                            continue
-                    
-                    if not self.data.can_template_be_used_on_day(tmpl, day):
-                        skipped_day_mismatch += 1
-                        continue
-                    
-                    var_name = f"s_{emp_idx}_{day}_{tmpl_idx}"
-                    self.shifts[(emp_idx, day, tmpl_idx)] = self.model.NewBoolVar(var_name)
-                    self.stats['total_variables'] += 1
-        
-        print(f"   ⏩ Pominięto (nieobecność - TWARDE): {skipped_absence}")
-        print(f"   ⏩ Pominięto (brak przypisania): {skipped_no_assignment}")
-        print(f"   ⏩ Pominięto (zły dzień tygodnia): {skipped_day_mismatch}")
-        
-        # Utwórz zmienne works_day
-        for emp_idx, emp in enumerate(self.data.employees):
-            for day in self.data.all_days:
-                if not self.data.is_workable_day(day):
-                    continue
-                if self.data.is_employee_absent(emp.id, day):
-                    continue
-                
-                var_name = f"w_{emp_idx}_{day}"
-                self.works_day[(emp_idx, day)] = self.model.NewBoolVar(var_name)
-                
-                shift_vars_for_day = [
-                    self.shifts[(emp_idx, day, t)]
-                    for t in range(len(self.data.templates))
-                    if (emp_idx, day, t) in self.shifts
-                ]
-                
-                if shift_vars_for_day:
-                    self.model.AddMaxEquality(self.works_day[(emp_idx, day)], shift_vars_for_day)
-                else:
-                    # Brak możliwych zmian - works_day = 0
-                    self.model.Add(self.works_day[(emp_idx, day)] == 0)
-        
-        print(f"   ✅ Utworzono {self.stats['total_variables']} zmiennych shift")
-        print(f"   ✅ Utworzono {len(self.works_day)} zmiennych works_day")
+    def save(self, org_key: str, year: int, month: int, shifts: List[Dict]):
+        """Zapisuje przypisania (employee_id, date, template_id) rozwiązania."""
+        assignments = [
+            {
+                'employee_id': s['employee_id'],
+                'date': s['date'],
+                'template_id': s['template_id'],
+            }
+            for s in shifts
+        ]
+        key = (org_key, year, month)
+        with self._lock:
+            self._entries[key] = assignments
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+SOLUTION_STORE = SolutionStore()
+
+
+# =============================================================================
+# ZARZĄDCA CPU - Procesowy budżet wątków wyszukiwania CP-SAT
+# =============================================================================
+
+def detect_cpu_limit() -> int:
+    """
+    Liczba rdzeni dostępnych dla procesu.
     
-    # =========================================================================
-    # KROK 2: ZASADY TWARDE (Bezwzględne)
-    # =========================================================================
+    Kolejność: zmienna SOLVER_CPU_LIMIT, kwota cgroup v2 (cpu.max), cgroup v1
+    (cfs_quota_us / cfs_period_us), maska CPU procesu, os.cpu_count().
+    Cloud Run: 2 vCPU = kwota 200000/100000, mimo że os.cpu_count() widzi hosta.
+    """
+    override = os.getenv('SOLVER_CPU_LIMIT')
+    if override:
+        return max(1, int(float(override)))
     
-    def add_hard_constraints(self):
-        """
-        Dodaje TYLKO absolutnie twarde ograniczenia:
-        1. Max 1 zmiana dziennie na pracownika
-        2. Zakaz pracy w urlop (już obsłużone przez brak zmiennych)
-        3. Max employees per shift
-        4. Zakaz nakładania się zmian (dla zmian nocnych przechodzących przez północ)
-        5. Min 1 kierownik na każdej zmianie (jeśli są kierownicy)
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    quota_files = [
+        ('/sys/fs/cgroup/cpu.max', None),
+        ('/sys/fs/cgroup/cpu/cpu.cfs_quota_us', '/sys/fs/cgroup/cpu/cpu.cfs_period_us'),
+    ]
+    for quota_path, period_path in quota_files:
+        try:
+            with open(quota_path) as f:
+                fields = f.read().split()
+            if period_path is not None:
+                with open(period_path) as f:
+                    fields.append(f.read().strip())
+        except (OSError, ValueError):
+            continue
+        if len(fields) < 2 or fields[0] in ('max', '-1'):
+            break
+        quota, period = int(fields[0]), int(fields[1])
+        if quota > 0 and period > 0:
+            # Kwota ułamkowa (np. 1.5 CPU) - zaokrąglenie w górę
+            return max(1, min(cpus, -(-quota // period)))
+        break
+    return max(1, cpus)
+
+
+class SolverGovernor:
+    """
+    Procesowy budżet wątków CP-SAT współdzielony przez równoległe żądania.
+    
+    gunicorn --threads 4 na 2 vCPU: bez zarządcy cztery żądania po 16 wątków
+    dają 64 wątki wyszukiwania na 2 rdzeniach. Zarządca przydziela każdemu
+    rozwiązaniu min(żądane, wolne, sprawiedliwy udział); gdy budżet jest
+    wyczerpany, żądanie czeka w kolejce (maks. queue_timeout, potem 1 wątek).
+    Bezpieczny wątkowo.
+    """
+    
+    def __init__(self, capacity: Optional[int] = None, queue_timeout: float = SOLVER_QUEUE_TIMEOUT_SECONDS):
+        self.capacity = capacity or detect_cpu_limit()
+        self.queue_timeout = queue_timeout
+        self._allocated = 0
+        self._waiting = 0
+        self._peak = 0
+        self._leases: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 0
+        self._condition = threading.Condition()
+    
+    def acquire(
+        self, requested: int, timeout: Optional[float] = None, job: Optional['SolveJob'] = None
+    ) -> Tuple[int, int, float]:
         """
-        print("\n🔒 Dodawanie ZASAD TWARDYCH (absolutne)...")
+        Przydziela wątki rozwiązaniu.
         
-        self._add_hc1_one_shift_per_day()
-        self._add_hc2_max_employees_per_shift()
-        self._add_hc3_no_overlapping_shifts()
-        self._add_hc4_supervisor_per_shift()
-        self._add_hc5_min_coverage()
+        Anulowanie zadania w kolejce kończy oczekiwanie wyjątkiem SolveCancelled.
         
-        print(f"   ✅ Dodano {self.stats['hard_constraints']} hard constraints")
-    
-    def _add_hc1_one_shift_per_day(self):
+        Returns:
+            (id przydziału, liczba wątków, czas oczekiwania w kolejce [s])
         """
-        TWARDE: Maksymalnie jedna zmiana dziennie na pracownika.
-        """
-        print("   → HC1: Max 1 zmiana/dzień/pracownik")
-        
-        for emp_idx in range(len(self.data.employees)):
-            for day in self.data.all_days:
-                shift_vars = [
-                    self.shifts[(emp_idx, day, t)]
-                    for t in range(len(self.data.templates))
-                    if (emp_idx, day, t) in self.shifts
+        requested = max(1, int(requested))
+        timeout = self.queue_timeout if timeout is None else timeout
+        started = time.time()
+        deadline = started + max(timeout, 0.0)
+        with self._condition:
+            self._waiting += 1
+            try:
+                while self._allocated >= self.capacity and time.time() < deadline:
+                    if job is not None:
+                        job.check()
+                    self._condition.wait(min(deadline - time.time(), EARLY_STOP_POLL_SECONDS))
+            finally:
+                self._waiting -= 1
+            
+            free = self.capacity - self._allocated
+            # Sprawiedliwy udział: zostaw miejsce dla żądań czekających w kolejce
+            fair_share = self.capacity // (len(self._leases) + self._waiting + 1)
+            workers = max(1, min(requested, free, fair_share))
+            
+            lease_id = self._next_id
+            self._next_id += 1
+            self._allocated += workers
+            self._peak = max(self._peak, self._allocated)
+            self._leases[lease_id] = {'workers': workers, 'requested': requested, 'since': time.time()}
+        return lease_id, workers, time.time() - started
+    
+    def release(self, lease_id: int):
+        """Zwraca wątki przydziału do budżetu i budzi czekające żądania."""
+        with self._condition:
+            lease = self._leases.pop(lease_id, None)
+            if lease is not None:
+                self._allocated -= lease['workers']
+                self._condition.notify_all()
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Bieżący przydział (endpoint /health)."""
+        now = time.time()
+        with self._condition:
+            return {
+                'cpu_limit': self.capacity,
+                'allocated_workers': self._allocated,
+                'free_workers': max(0, self.capacity - self._allocated),
+                'active_solves': [
+                    {
+                        'workers': lease['workers'],
+                        'requested_workers': lease['requested'],
+                        'running_seconds': round(now - lease['since'], 1),
+                    }
+                    for lease in self._leases.values()
+                ],
+                'queued_solves': self._waiting,
+                'peak_allocated_workers': self._peak,
+            }
+
+
+SOLVER_GOVERNOR = SolverGovernor()
+
+
+# =============================================================================
+# REJESTR ZADAŃ - Anulowanie trwających rozwiązań
+# =============================================================================
+
+class SolveCancelled(Exception):
+    """Rozwiązywanie anulowane (endpoint cancel lub rozłączenie klienta)."""
+
+
+class DeadlineExceeded(SolveCancelled):
+    """Deadline żądania minął przed rozwiązaniem (budowa modelu / kolejka)."""
+
+
+class JobIdConflict(Exception):
+    """Id zadania od klienta należy już do trwającego zadania."""
+
+
+class SolveJob:
+    """
+    Trwające generowanie grafiku: flaga anulowania i bieżący solver CP-SAT.
+    
+    cancel() woła StopSearch na podpiętym solverze (wynik wraca w ułamku
+    sekundy), a budowa modelu sprawdza flagę między rodzinami ograniczeń.
+    """
+    
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.created = time.time()
+        self.reason: Optional[str] = None
+        self._cancelled = threading.Event()
+        self._solver: Optional[cp_model.CpSolver] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+    
+    def cancel(self, reason: str = 'cancelled'):
+        """Oznacza zadanie jako anulowane i przerywa bieżące wyszukiwanie."""
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+            self._cancelled.set()
+            solver = self._solver
+        if solver is not None:
+            solver.StopSearch()
+    
+    def check(self):
+        """Punkt kontrolny: SolveCancelled, jeśli zadanie anulowano."""
+        if self._cancelled.is_set():
+            raise SolveCancelled(self.reason)
+    
+    @contextlib.contextmanager
+    def running(self, solver: cp_model.CpSolver):
+        """Podpina solver na czas Solve (cancel -> StopSearch); po Solve punkt kontrolny."""
+        self.check()
+        with self._lock:
+            self._solver = solver
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._solver = None
+        self.check()
+
+
+def job_guard(job: Optional[SolveJob], solver: cp_model.CpSolver):
+    """Kontekst solver.Solve dla opcjonalnego zadania."""
+    return job.running(solver) if job is not None else contextlib.nullcontext()
+
+
+class JobRegistry:
+    """Procesowy rejestr trwających zadań (id -> SolveJob), bezpieczny wątkowo."""
+    
+    def __init__(self):
+        self._jobs: Dict[str, SolveJob] = {}
+        self._lock = threading.Lock()
+    
+    def start(self, job_id: Optional[str] = None) -> SolveJob:
+        """
+        Rejestruje zadanie (id od klienta lub losowe).
+        
+        Id klienta zajęte przez trwające zadanie -> JobIdConflict: podmiana na
+        losowe sprawiłaby, że cancel po id klienta trafiłby w cudze zadanie.
+        """
+        with self._lock:
+            if not job_id:
+                job_id = uuid.uuid4().hex
+            elif job_id in self._jobs:
+                raise JobIdConflict(job_id)
+            job = SolveJob(job_id)
+            self._jobs[job_id] = job
+            return job
+    
+    def finish(self, job: SolveJob):
+        with self._lock:
+            if self._jobs.get(job.id) is job:
+                del self._jobs[job.id]
+    
+    def cancel(self, job_id: str, reason: str = 'cancelled') -> bool:
+        """Anuluje zadanie; False gdy nie ma takiego trwającego zadania."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel(reason)
+        return True
+    
+    def active_count(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+
+SOLVE_JOBS = JobRegistry()
+
+
+class SolutionProgressCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Callback rejestrujący przebieg wyszukiwania: czas do pierwszego
+    rozwiązania, czas do najlepszego rozwiązania i liczbę rozwiązań.
+    
+    on_improvement(callback) jest wołane przy każdym lepszym rozwiązaniu
+    (streaming do klienta); zwrócenie True przerywa wyszukiwanie.
+    
+    Reguły wczesnego zatrzymania sprawdzane przy rozwiązaniu:
+    - relative_gap: (cel - ograniczenie) / |cel| <= próg
+    - priorities_met(callback): True gdy kary poziomów 1 i 2 są zerowe
+    Regułę stagnacji sprawdza watchdog (CPSATScheduler._run_solver).
+    Pierwsza zadziałała reguła trafia do stop_reason.
+    """
+    
+    def __init__(
+        self,
+        start_time: Optional[float] = None,
+        on_improvement: Optional[Callable[['SolutionProgressCallback'], Any]] = None,
+        relative_gap: Optional[float] = None,
+        priorities_met: Optional[Callable[['SolutionProgressCallback'], bool]] = None,
+    ):
+        super().__init__()
+        self.start_time = start_time or time.time()
+        self.on_improvement = on_improvement
+        self.relative_gap = relative_gap
+        self.priorities_met = priorities_met
+        self.solutions = 0
+        self.first_solution_time: Optional[float] = None
+        self.best_solution_time: Optional[float] = None
+        self.best_objective: Optional[float] = None
+        self.stop_reason: Optional[str] = None
+    
+    def request_stop(self, reason: str):
+        """Przerywa wyszukiwanie (bieżące najlepsze rozwiązanie zostaje wynikiem)."""
+        if self.stop_reason is None:
+            self.stop_reason = reason
+        self.StopSearch()
+    
+    def on_solution_callback(self):
+        elapsed = time.time() - self.start_time
+        objective = self.ObjectiveValue()
+        self.solutions += 1
+        if self.first_solution_time is None:
+            self.first_solution_time = elapsed
+        if self.best_objective is None or objective < self.best_objective:
+            self.best_objective = objective
+            self.best_solution_time = elapsed
+            if self.on_improvement is not None and self.on_improvement(self):
+                self.request_stop('listener')
+                return
+            if self.priorities_met is not None and self.priorities_met(self):
+                self.request_stop('priorities_met')
+                return
+        if self.relative_gap is not None:
+            gap = (objective - self.BestObjectiveBound()) / max(abs(objective), 1.0)
+            if gap <= self.relative_gap:
+                self.request_stop('relative_gap')
+
+
+# =============================================================================
+# HEURYSTYKA ZACHŁANNA - Hint dla CP-SAT i awaryjne rozwiązanie
+# =============================================================================
+
+class GreedyScheduler:
+    """
+    Szybka konstrukcja grafiku bez solvera (czysty Python, bez CP-SAT).
+    
+    Faza 1 (obsada): dla każdego (dzień, szablon) dobiera do min_employees
+    dostępnych pracowników z największym niedoborem godzin.
+    Faza 2 (godziny): dokłada zmiany pracownikom poniżej normy, o ile
+    szablon ma jeszcze wolne miejsca (max_employees).
+    
+    Przestrzega: nieobecności, przypisań szablonów, 1 zmiany dziennie,
+    nakładania zmian nocnych, 11h odpoczynku i max dni z rzędu.
+    Wynik służy jako hint dla CP-SAT oraz jako gwarantowana odpowiedź,
+    gdy solver nie znajdzie rozwiązania w limicie czasu.
+    """
+    
+    def __init__(self, data: DataModel):
+        self.data = data
+        self.num_templates = len(data.templates)
+        self.durations = [r.duration for r in data.template_table]
+        self.targets = [data.get_target_minutes(e) for e in range(len(data.employees))]
+        self.rest_ok = [
+            [conflict == PAIR_OK for conflict in row] for row in data.template_pair_conflict
+        ]
+        
+        # Dozwolone szablony per pracownik
+        self.allowed_templates: List[Set[int]] = [
+            data.allowed_template_indices(e) for e in range(len(data.employees))
+        ]
+        
+        # Szablony dostępne w danym dniu
+        self.day_templates: Dict[int, List[int]] = {
+            day: (
+                np.flatnonzero(data.template_day_mask[:, day - 1]).tolist()
+                if data.workable_mask[day - 1] else []
+            )
+            for day in data.all_days
+        }
+        
+        # Stan konstrukcji
+        self.assigned: Dict[Tuple[int, int], int] = {}  # (emp_idx, day) -> tmpl_idx
+        self.minutes = [0] * len(data.employees)
+        self.headcount: Dict[Tuple[int, int], int] = defaultdict(int)
+        
+        # Zatwierdzone dni (rolling horizon) są stanem początkowym
+        for (emp_idx, day), tmpl_idx in data.fixed_assignments.items():
+            self._assign(emp_idx, day, tmpl_idx)
+        self.planning_days = [d for d in data.all_days if d not in data.fixed_days]
+    
+    def _run_length(self, emp_idx: int, day: int, step: int) -> int:
+        """Liczba kolejnych dni pracy pracownika od day (bez day) w kierunku step."""
+        length = 0
+        current = day + step
+        while (emp_idx, current) in self.assigned:
+            length += 1
+            current += step
+        return length
+    
+    def can_assign(self, emp_idx: int, day: int, tmpl_idx: int) -> bool:
+        """Sprawdza wszystkie reguły dla przypisania (emp, day, tmpl)."""
+        if (emp_idx, day) in self.assigned:
+            return False
+        if tmpl_idx not in self.allowed_templates[emp_idx]:
+            return False
+        if self.data.absence_mask[emp_idx, day - 1]:
+            return False
+        
+        tmpl = self.data.templates[tmpl_idx]
+        if tmpl.max_employees is not None and self.headcount[(day, tmpl_idx)] >= tmpl.max_employees:
+            return False
+        
+        prev_tmpl = self.assigned.get((emp_idx, day - 1))
+        if prev_tmpl is not None and not self.rest_ok[prev_tmpl][tmpl_idx]:
+            return False
+        next_tmpl = self.assigned.get((emp_idx, day + 1))
+        if next_tmpl is not None and not self.rest_ok[tmpl_idx][next_tmpl]:
+            return False
+        
+        run = self._run_length(emp_idx, day, -1) + 1 + self._run_length(emp_idx, day, 1)
+        return run <= self.data.max_consecutive_days
+    
+    def _assign(self, emp_idx: int, day: int, tmpl_idx: int):
+        self.assigned[(emp_idx, day)] = tmpl_idx
+        self.minutes[emp_idx] += self.durations[tmpl_idx]
+        self.headcount[(day, tmpl_idx)] += 1
+    
+    def build(self) -> Set[Tuple[int, int, int]]:
+        """Buduje grafik i zwraca zbiór przypisań (emp_idx, day, tmpl_idx)."""
+        num_employees = len(self.data.employees)
+        
+        # Faza 1: obsada min_employees, najpierw najbardziej niedociągnięci
+        for day in self.planning_days:
+            templates_today = sorted(
+                self.day_templates[day],
+                key=lambda t: self.data.template_table[t].start
+            )
+            for tmpl_idx in templates_today:
+                needed = self.data.templates[tmpl_idx].min_employees - self.headcount[(day, tmpl_idx)]
+                if needed <= 0:
+                    continue
+                duration = self.durations[tmpl_idx]
+                candidates = [
+                    e for e in range(num_employees)
+                    if self.can_assign(e, day, tmpl_idx)
                 ]
-                if shift_vars:
-                    self.model.Add(sum(shift_vars) <= 1)
-                    self.stats['hard_constraints'] += 1
+                # Norma tylko porządkuje kandydatów - obsada min_employees ma pierwszeństwo.
+                # Preferuj tych, którym zmiana mieści się w normie, potem największy niedobór
+                candidates.sort(key=lambda e: (
+                    self.targets[e] - self.minutes[e] < duration,
+                    self.minutes[e] - self.targets[e],
+                ))
+                for emp_idx in candidates[:needed]:
+                    self._assign(emp_idx, day, tmpl_idx)
+        
+        # Faza 2: dobicie godzin do normy (najmniej obsadzone zmiany najpierw)
+        for emp_idx in sorted(range(num_employees), key=lambda e: self.minutes[e] - self.targets[e]):
+            for day in self.planning_days:
+                deficit = self.targets[emp_idx] - self.minutes[emp_idx]
+                if deficit <= 0:
+                    break
+                options = [
+                    t for t in self.day_templates[day]
+                    if self.durations[t] <= deficit and self.can_assign(emp_idx, day, t)
+                ]
+                if not options:
+                    continue
+                best = min(options, key=lambda t: (self.headcount[(day, t)], -self.durations[t]))
+                self._assign(emp_idx, day, best)
+        
+        return {(e, day, t) for (e, day), t in self.assigned.items()}
+
+
+# =============================================================================
+# CP-SAT SCHEDULER v4.0 - HIERARCHICZNA OPTYMALIZACJA
+# =============================================================================
+
+class CPSATScheduler:
+    """
+    Główna klasa optymalizatora CP-SAT v4.0.
+    
+    Implementuje hierarchiczną funkcję celu z gwarancją FEASIBLE:
+    - TWARDE: max 1 zmiana/dzień, zakaz pracy w urlop
+    - P1: Godziny w oknie [Norma, Norma+8h]
+    - P2: Coverage ze slack
+    - P3: Kodeks Pracy jako soft
+    - P4: Preferencje
+    """
+    
+    def __init__(self, data: DataModel):
+        self.data = data
+        self.model = cp_model.CpModel()
+        
+        # Zmienne pomocnicze dla godzin
+        self.total_minutes_vars: Dict[int, cp_model.IntVar] = {}
+        # emp_idx -> (cel z normy, najbliższa osiągalna suma minut)
+        self.adjusted_targets: Dict[int, Tuple[int, int]] = {}
+        # Jednostka czasu modelu [min] i dzielnik wag celu (skalowanie NWD)
+        self.hours_targets: List[int] = []
+        self.max_weekly_minutes = 0
+        self.time_unit = 1
+        self.objective_scale = 1
+        
+        # Zmienne slack dla coverage
+        self.coverage_slack: Dict[Tuple[int, int], cp_model.IntVar] = {}
+        
+        # Warstwa agregatów (memoizacja): współdzielone sumy
+        self._headcounts: Dict[Tuple[int, int], cp_model.IntVar] = {}
+        self._period_minutes: Dict[Tuple[int, Tuple[int, ...]], Optional[LinearRow]] = {}
+        self._work_windows: Dict[Tuple[int, int, int], Optional[LinearRow]] = {}
+        # Zmienne decyzyjne: gęsty indeks E × D × T (zmiany) / E × D (works_day)
+        # -> indeks zmiennej w proto (-1 = brak zmiennej)
+        self.shift_index = np.empty((0, 0, 0), dtype=np.int64)
+        self.works_index = np.empty((0, 0), dtype=np.int64)
+        
+        # Funkcja celu - różne poziomy
+        self.objective_level1: List[Tuple[cp_model.IntVar, int, str]] = []  # Godziny
+        self.objective_level2: List[Tuple[cp_model.IntVar, int, str]] = []  # Coverage
+        self.objective_level2_5: List[Tuple[cp_model.IntVar, int, str]] = []  # Balance obsady
+        self.objective_level3: List[Tuple[cp_model.IntVar, int, str]] = []  # Kodeks Pracy
+        self.objective_level4: List[Tuple[cp_model.IntVar, int, str]] = []  # Preferencje
+        
+        # Klasy wymiennych pracowników z porządkiem total_min (łamanie symetrii)
+        self.symmetry_classes: List[List[int]] = []
+        
+        self.stats = {
+            'total_variables': 0,
+            'hard_constraints': 0,
+            'soft_constraints': 0,
+            'symmetry_classes': 0,
+        }
+        # Zmienne/ograniczenia pomocnicze pominięte dzięki kompakcji modelu
+        self._compaction_saved = {'variables': 0, 'constraints': 0}
+        
+        # Warm start (hinty) i przebieg wyszukiwania
+        self._warm_start_keys: Set[Tuple[int, int, int]] = set()
+        self._warm_start: Dict[str, Any] = {'source': None}
+        self._progress: Optional[SolutionProgressCallback] = None
+        self._greedy_assignments: Optional[Set[Tuple[int, int, int]]] = None
+        
+        # Czasy faz budowy modelu i rozwiązywania [s]
+        self.phase_times: Dict[str, float] = {}
+        
+        # Ekstrakcja: wartości rozwiązania i tablice (indeksy, wagi) poziomów celu
+        self._solution_cache: Optional[Tuple[cp_model.CpSolver, np.ndarray]] = None
+        self._term_array_cache: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    
+    def run_phase(self, name: str, step):
+        """Wykonuje fazę budowy modelu i zapisuje jej czas w phase_times."""
+        self._checkpoint()
+        phase_start = time.perf_counter()
+        step()
+        self.phase_times[name] = round(time.perf_counter() - phase_start, 4)
+    
+    def _checkpoint(self):
+        """Przerywa budowę modelu, jeśli zadanie anulowano lub minął deadline żądania."""
+        if self.data.job is not None:
+            self.data.job.check()
+        self.data.check_deadline()
+    
+    # =========================================================================
+    # KROK 1: Tworzenie zmiennych decyzyjnych
+    # =========================================================================
+    
+    def create_decision_variables(self):
+        """
+        Tworzy zmienne decyzyjne dla każdej możliwej kombinacji.
+        
+        Zmienne są dopisywane do proto hurtowo, a gęsty indeks shift_index
+        (E × D × T, -1 = brak zmiennej) pozwala emitować ograniczenia
+        bezpośrednio z wycinków tablicy zamiast sprawdzać klucze słownika.
+        """
+        print("\n🔧 Tworzenie zmiennych decyzyjnych...")
+        
+        data = self.data
+        named = data.variable_names
+        num_employees = len(data.employees)
+        num_templates = len(data.templates)
+        day_index = np.array(data.all_days) - 1
+        planning = np.array([day not in data.fixed_days for day in data.all_days], dtype=bool)
+        
+        self.shift_index = np.full((num_employees, data.days_in_month, num_templates), -1, dtype=np.int64)
+        self.works_index = np.full((num_employees, data.days_in_month), -1, dtype=np.int64)
+        
+        # Statystyki pominięć liczone na maskach (dni robocze poza zatwierdzonymi)
+        open_days = data.workable_mask[day_index] & planning
+        absent = data.absence_mask[:, day_index] & open_days[None, :]
+        present = ~data.absence_mask[:, day_index] & open_days[None, :]
+        assigned = data.employee_template_mask[:, None, :]
+        day_ok = data.template_day_mask[:, day_index].T[None, :, :]
+        skipped_absence = int(absent.sum())
+        skipped_no_assignment = int((present[:, :, None] & ~assigned).sum())
+        skipped_day_mismatch = int((present[:, :, None] & assigned & ~day_ok).sum())
+        
+        # Dni zatwierdzone (rolling horizon) - tylko stała dla przypisanej zmiany
+        for (emp_idx, day), fixed_tmpl in data.fixed_assignments.items():
+            if day in data.fixed_days and data.is_workable_day(day):
+                self.shift_index[emp_idx, day - 1, fixed_tmpl] = self.model.NewConstant(1).Index()
+        
+        # TWARDE: nieobecność, brak przypisania i zły dzień = brak zmiennej
+        # (tensor dostępności E×D×T)
+        window = data.availability[:, day_index, :] & planning[None, :, None]
+        cells = np.argwhere(window)
+        indices = self._new_bool_vars(
+            len(cells),
+            [f"s_{e}_{data.all_days[d]}_{t}" for e, d, t in cells.tolist()] if named else None,
+        )
+        self.shift_index[cells[:, 0], day_index[cells[:, 1]], cells[:, 2]] = indices
+        self.stats['total_variables'] += len(cells)
+        
+        print(f"   ⏩ Pominięto (nieobecność - TWARDE): {skipped_absence}")
+        print(f"   ⏩ Pominięto (brak przypisania): {skipped_no_assignment}")
+        print(f"   ⏩ Pominięto (zły dzień tygodnia): {skipped_day_mismatch}")
+        
+        # Utwórz zmienne works_day
+        available = data.available_mask[:, day_index]
+        fixed = ~planning[None, :] & available
+        for emp_idx, day_pos in np.argwhere(fixed).tolist():
+            day = data.all_days[day_pos]
+            fixed_work = 1 if (emp_idx, day) in data.fixed_assignments else 0
+            self.works_index[emp_idx, day - 1] = self.model.NewConstant(fixed_work).Index()
+        
+        free = np.argwhere(planning[None, :] & available)
+        indices = self._new_bool_vars(
+            len(free),
+            [f"w_{e}_{data.all_days[d]}" for e, d in free.tolist()] if named else None,
+        )
+        self.works_index[free[:, 0], day_index[free[:, 1]]] = indices
+        for (emp_idx, day_pos), index in zip(free.tolist(), indices.tolist()):
+            day = data.all_days[day_pos]
+            shift_row = self.shift_index[emp_idx, day - 1]
+            shift_row = shift_row[shift_row >= 0]
+            
+            if len(shift_row) and data.model_compaction:
+                # HC1 (max 1 zmiana/dzień) => works_day to po prostu suma zmian
+                self._emit_linear(
+                    np.concatenate(([index], shift_row)), [1] + [-1] * len(shift_row), 0, 0
+                )
+            elif len(shift_row):
+                self.model.AddMaxEquality(self.works_var(emp_idx, day), self.employee_day_vars(emp_idx, day))
+            else:
+                # Brak możliwych zmian - works_day = 0
+                self._emit_linear([index], [1], 0, 0)
+        
+        self._compute_capacity_bounds()
+        self._compute_time_unit()
+        
+        print(f"   ✅ Utworzono {self.stats['total_variables']} zmiennych shift")
+        print(f"   ✅ Utworzono {int((self.works_index >= 0).sum())} zmiennych works_day")
+    
+    def _compute_capacity_bounds(self):
+        """
+        Pre-pass zacieśniania dziedzin z gęstego indeksu zmiennych.
+        
+        - (E, D) minuty dnia: max = najdłuższy dostępny szablon (HC1: 1 zmiana/dzień),
+          min = czas zatwierdzonej zmiany (dni stałe rolling horizon)
+        - (D, T) obsada: max = liczba pracowników ze zmienną, ograniczona max_employees,
+          min = liczba zatwierdzonych przypisań
+        Sumy po dniach dają granice minut pracownika w tygodniu i w całym horyzoncie.
+        """
+        present = self.shift_index >= 0
+        durations = self.data.template_table.duration.astype(np.int64)
+        self.day_max_minutes = np.where(present, durations[None, None, :], 0).max(axis=2, initial=0)
+        self.day_min_minutes = np.zeros_like(self.day_max_minutes)
+        headcount_min = np.zeros(present.shape[1:], dtype=np.int64)
+        for (emp_idx, day), fixed_tmpl in self.data.fixed_assignments.items():
+            if present[emp_idx, day - 1, fixed_tmpl]:
+                self.day_min_minutes[emp_idx, day - 1] = durations[fixed_tmpl]
+                headcount_min[day - 1, fixed_tmpl] += 1
+        
+        max_employees = np.array(
+            [t.max_employees if t.max_employees is not None else len(self.data.employees)
+             for t in self.data.templates],
+            dtype=np.int64,
+        )
+        self.headcount_max = np.minimum(present.sum(axis=0), max_employees[None, :])
+        self.headcount_min = np.minimum(headcount_min, self.headcount_max)
+    
+    def _compute_time_unit(self):
+        """
+        Jednostka czasu modelu = NWD długości szablonów, celów godzinowych,
+        bufora i limitu 48h (np. 30 min przy siatce półgodzinnej).
+        
+        Minuty w wierszach liniowych, dziedzinach i celach są dzielone przez
+        jednostkę, a wagi kar za minutę mnożone - wartość celu i hierarchia
+        poziomów się nie zmieniają. Współczynniki celu zmniejsza tylko
+        dzielnik NWD wag (objective_scale).
+        """
+        self.hours_targets = [int(self.hours_target(e)) for e in range(len(self.data.employees))]
+        # Limit tygodniowy w pełnych minutach (max_weekly_work_hours może być ułamkowe)
+        self.max_weekly_minutes = int(self.data.max_weekly_hours * 60)
+        if not self.data.time_scaling:
+            return
+        
+        quantities = np.concatenate((
+            self.data.template_table.duration.astype(np.int64),
+            np.asarray(self.hours_targets, dtype=np.int64),
+            np.asarray([HOURS_BUFFER_MINUTES, self.max_weekly_minutes], dtype=np.int64),
+        ))
+        self.time_unit = max(int(np.gcd.reduce(quantities)), 1)
+        if self.time_unit > 1:
+            print(f"   ⏱️ Jednostka czasu modelu: {self.time_unit} min")
+    
+    def minutes_bounds(self, emp_idx: int, days: List[int]) -> Tuple[int, int]:
+        """(min, max) osiągalnych minut pracownika w podanych dniach (w jednostkach time_unit)."""
+        day_index = np.asarray(days, dtype=np.int64) - 1
+        return (
+            int(self.day_min_minutes[emp_idx, day_index].sum()) // self.time_unit,
+            int(self.day_max_minutes[emp_idx, day_index].sum()) // self.time_unit,
+        )
+    
+    def hours_target(self, emp_idx: int) -> int:
+        """
+        Cel minut pracownika przesunięty do najbliższej osiągalnej sumy.
+        
+        Osiągalność liczona z dostępnych szablonów per dzień (dni zatwierdzone:
+        tylko ich zmiana) - nadzbiór rzeczywistych rozwiązań, bo pomija odpoczynek
+        i serie dni. Gdy cel leży między osiągalnymi sumami, solver nie traci czasu
+        na dowodzenie, że under_target = 0 jest nieosiągalne.
+        """
+        target = self.data.get_target_minutes(emp_idx)
+        if not self.data.reachable_hours:
+            return target
+        
+        durations = self.data.template_table.duration.astype(np.int64)
+        day_options = []
+        for day in self.data.all_days:
+            present = self.shift_index[emp_idx, day - 1] >= 0
+            options = durations[present]
+            if (emp_idx, day) not in self.data.fixed_assignments:
+                options = np.append(options, 0)
+            day_options.append(options)
+        
+        reachable, step = reachable_minute_totals(day_options)
+        adjusted = nearest_reachable_target(reachable, step, target, HOURS_BUFFER_MINUTES)
+        if adjusted != target:
+            self.adjusted_targets[emp_idx] = (target, adjusted)
+        return adjusted
+    
+    # =========================================================================
+    # GĘSTY INDEKS - hurtowe zmienne i ograniczenia zapisywane wprost do proto
+    # =========================================================================
+    
+    def _new_bool_vars(self, count: int, names: Optional[List[str]] = None) -> np.ndarray:
+        """Dopisuje `count` zmiennych 0-1 do proto i zwraca ich indeksy."""
+        variables = self.model.Proto().variables
+        first = len(variables)
+        for position in range(count):
+            var_proto = variables.add()
+            var_proto.domain.extend((0, 1))
+            if names is not None:
+                var_proto.name = names[position]
+        return np.arange(first, first + count, dtype=np.int64)
+    
+    def _var_name(self, name: str) -> str:
+        """Nazwa zmiennej pomocniczej (pusta gdy variable_names=False)."""
+        return name if self.data.variable_names else ''
+    
+    def _emit_linear(self, indices, coeffs, lower: int, upper: int):
+        """lower <= sum(coeffs · x[indices]) <= upper - bez budowania LinearExpr."""
+        linear = self.model.Proto().constraints.add().linear
+        linear.vars.extend(np.asarray(indices, dtype=np.int64).tolist())
+        linear.coeffs.extend(np.asarray(coeffs, dtype=np.int64).tolist())
+        linear.domain.extend((lower, upper))
+    
+    def _emit_at_most_one(self, indices):
+        """AtMostOne na literałach o podanych indeksach proto."""
+        self.model.Proto().constraints.add().at_most_one.literals.extend(
+            np.asarray(indices, dtype=np.int64).tolist()
+        )
+    
+    def _emit_bool_or(self, literals):
+        """BoolOr; literał zanegowany zmiennej i to -i - 1 (konwencja proto)."""
+        self.model.Proto().constraints.add().bool_or.literals.extend(
+            np.asarray(literals, dtype=np.int64).tolist()
+        )
+    
+    # =========================================================================
+    # AGREGATY - współdzielone sumy (tworzone raz, używane przez wszystkie rodziny)
+    # =========================================================================
+    
+    def _var(self, index: int) -> Optional[cp_model.IntVar]:
+        """Widok IntVar na zmienną proto o danym indeksie (None dla -1)."""
+        return cp_model.IntVar(self.model.Proto(), int(index), None) if index >= 0 else None
+    
+    def shift_var(self, emp_idx: int, day: int, tmpl_idx: int) -> Optional[cp_model.IntVar]:
+        """Zmienna zmiany (pracownik, dzień, szablon) z gęstego indeksu (None = brak)."""
+        return self._var(self.shift_index[emp_idx, day - 1, tmpl_idx])
+    
+    def works_var(self, emp_idx: int, day: int) -> Optional[cp_model.IntVar]:
+        """Zmienna works_day (pracownik, dzień) z gęstego indeksu (None = brak)."""
+        return self._var(self.works_index[emp_idx, day - 1])
+    
+    def has_shift(self, emp_idx: int, day: int, tmpl_idx: int) -> bool:
+        """Czy istnieje zmienna zmiany (pracownik, dzień, szablon)."""
+        return bool(self.shift_index[emp_idx, day - 1, tmpl_idx] >= 0)
+    
+    def has_works_day(self, emp_idx: int, day: int) -> bool:
+        """Czy istnieje zmienna works_day (pracownik, dzień)."""
+        return bool(self.works_index[emp_idx, day - 1] >= 0)
+    
+    def day_template_vars(self, day: int, tmpl_idx: int) -> List[cp_model.IntVar]:
+        """Zmienne wszystkich pracowników mogących obsadzić szablon w danym dniu."""
+        return [self._var(index) for index in self.day_template_indices(day, tmpl_idx).tolist()]
+    
+    def employee_day_vars(self, emp_idx: int, day: int) -> List[cp_model.IntVar]:
+        """Zmienne zmian pracownika w danym dniu (wszystkie szablony)."""
+        row = self.shift_index[emp_idx, day - 1]
+        return [self._var(index) for index in row[row >= 0].tolist()]
+    
+    def day_template_indices(self, day: int, tmpl_idx: int) -> np.ndarray:
+        """Indeksy proto zmiennych (·, dzień, szablon) z gęstego indeksu."""
+        column = self.shift_index[:, day - 1, tmpl_idx]
+        return column[column >= 0]
+    
+    def headcount(self, day: int, tmpl_idx: int) -> Optional[cp_model.IntVar]:
+        """Obsada (dzień, szablon) jako jedna zmienna - tworzona raz, współdzielona."""
+        key = (day, tmpl_idx)
+        if key not in self._headcounts:
+            column = self.day_template_indices(day, tmpl_idx)
+            if not len(column):
+                return None
+            count = self.model.NewIntVar(
+                int(self.headcount_min[day - 1, tmpl_idx]), int(self.headcount_max[day - 1, tmpl_idx]),
+                self._var_name(f"headcount_{day}_{tmpl_idx}"),
+            )
+            self._emit_linear(np.concatenate(([count.Index()], column)), [1] + [-1] * len(column), 0, 0)
+            self._headcounts[key] = count
+        return self._headcounts[key]
+    
+    def period_minutes(self, emp_idx: int, days: List[int]) -> Optional[LinearRow]:
+        """Minuty pracownika w okresie (w jednostkach time_unit) - memoizowane per okres."""
+        key = (emp_idx, tuple(days))
+        if key not in self._period_minutes:
+            block = self.shift_index[emp_idx, np.asarray(days) - 1]
+            present = block >= 0
+            durations = np.broadcast_to(self.data.template_table.duration // self.time_unit, block.shape)
+            self._period_minutes[key] = (
+                LinearRow(block[present], durations[present].astype(np.int64)) if present.any() else None
+            )
+        return self._period_minutes[key]
+    
+    def work_window(self, emp_idx: int, start_pos: int, length: int) -> Optional[LinearRow]:
+        """
+        Suma works_day w oknie all_days[start_pos:start_pos+length] (None gdy
+        któregoś dnia brak zmiennej - pracownik i tak nie może pracować).
+        Okna przesuwne (7 dni z rzędu, tygodnie) są wycinkami jednego wiersza works_index.
+        """
+        key = (emp_idx, start_pos, length)
+        if key not in self._work_windows:
+            window_days = self.data.all_days[start_pos:start_pos + length]
+            row = self.works_index[emp_idx, np.asarray(window_days, dtype=np.int64) - 1]
+            complete = len(window_days) == length and bool((row >= 0).all())
+            self._work_windows[key] = LinearRow(row, np.ones(length, dtype=np.int64)) if complete else None
+        return self._work_windows[key]
+    
+    # =========================================================================
+    # KROK 2: ZASADY TWARDE (Bezwzględne)
+    # =========================================================================
+    
+    def add_hard_constraints(self):
+        """
+        Dodaje TYLKO absolutnie twarde ograniczenia:
+        1. Max 1 zmiana dziennie na pracownika
+        2. Zakaz pracy w urlop (już obsłużone przez brak zmiennych)
+        3. Max employees per shift
+        4. Zakaz nakładania się zmian (dla zmian nocnych przechodzących przez północ)
+        5. Min 1 kierownik na każdej zmianie (jeśli są kierownicy)
+        """
+        print("\n🔒 Dodawanie ZASAD TWARDYCH (absolutne)...")
+        
+        for add_family in (
+            self._add_hc1_one_shift_per_day,
+            self._add_hc2_max_employees_per_shift,
+            self._add_hc3_no_overlapping_shifts,
+            self._add_hc4_supervisor_per_shift,
+            self._add_hc5_min_coverage,
+        ):
+            self._checkpoint()
+            add_family()
+        
+        print(f"   ✅ Dodano {self.stats['hard_constraints']} hard constraints")
+    
+    def _add_hc1_one_shift_per_day(self):
+        """
+        TWARDE: Maksymalnie jedna zmiana dziennie na pracownika.
+        """
+        print("   → HC1: Max 1 zmiana/dzień/pracownik")
+        
+        # Wiersze (pracownik, dzień) gęstego indeksu z co najmniej dwiema zmiennymi
+        # (pojedyncza zmienna 0-1 spełnia ograniczenie trywialnie)
+        day_index = np.asarray(self.data.all_days, dtype=np.int64) - 1
+        block = self.shift_index[:, day_index, :]
+        for emp_idx, day_pos in np.argwhere((block >= 0).sum(axis=2) >= 2).tolist():
+            row = block[emp_idx, day_pos]
+            self._emit_at_most_one(row[row >= 0])
+            self.stats['hard_constraints'] += 1
     
     def _add_hc2_max_employees_per_shift(self):
         """
@@ -823,21 +2203,16 @@ class CPSATScheduler:
                 continue
             
             for tmpl_idx, tmpl in enumerate(self.data.templates):
-                if not self.data.can_template_be_used_on_day(tmpl, day):
+                if not self.data.template_day_mask[tmpl_idx, day - 1]:
                     continue
                 
                 max_allowed = tmpl.max_employees
                 if max_allowed is None:
                     continue
                 
-                assigned_vars = [
-                    self.shifts[(e, day, tmpl_idx)]
-                    for e in range(len(self.data.employees))
-                    if (e, day, tmpl_idx) in self.shifts
-                ]
-                
-                if assigned_vars and max_allowed is not None:
-                    self.model.Add(sum(assigned_vars) <= max_allowed)
+                headcount = self.headcount(day, tmpl_idx)
+                if headcount is not None:
+                    self.model.Add(headcount <= max_allowed)
                     self.stats['hard_constraints'] += 1
     
     def _add_hc3_no_overlapping_shifts(self):
@@ -858,39 +2233,46 @@ class CPSATScheduler:
         print("   → HC3: Zakaz nakładania się zmian (nocne)")
         
         overlaps_blocked = 0
+        overlap_successors = self.data.overlap_successors
+        
+        if self.data.conflict_encoding == 'clause':
+            # Bikliki A × B: jedno AtMostOne na granicę dni zamiast par,
+            # emitowane hurtowo dla wszystkich pracowników z wycinków indeksu
+            for day in self.data.all_days[:-1]:
+                for firsts, seconds in self.data.overlap_bicliques:
+                    first_block = self.shift_index[:, day - 1, list(firsts)]
+                    second_block = self.shift_index[:, day, list(seconds)]
+                    first_count = (first_block >= 0).sum(axis=1)
+                    second_count = (second_block >= 0).sum(axis=1)
+                    for emp_idx in np.flatnonzero((first_count > 0) & (second_count > 0)).tolist():
+                        literals = np.concatenate((first_block[emp_idx], second_block[emp_idx]))
+                        self._emit_at_most_one(literals[literals >= 0])
+                        self.stats['hard_constraints'] += 1
+                        overlaps_blocked += int(first_count[emp_idx] * second_count[emp_idx])
+            
+            print(f"      • Zablokowano {overlaps_blocked} par nakładających się zmian (kliki)")
+            return
         
         for emp_idx in range(len(self.data.employees)):
             for day in self.data.all_days[:-1]:
                 next_day = day + 1
                 
-                for tmpl_idx, tmpl in enumerate(self.data.templates):
-                    if (emp_idx, day, tmpl_idx) not in self.shifts:
+                # Tylko pary z macierzy zgodności, które się nakładają (rest < 0)
+                for tmpl_idx, next_templates in overlap_successors.items():
+                    if not self.has_shift(emp_idx, day, tmpl_idx):
                         continue
                     
-                    # Sprawdź tylko zmiany nocne (kończą się następnego dnia)
-                    if not tmpl.is_night_shift():
-                        continue
-                    
-                    # Czas zakończenia zmiany nocnej (minuty od północy następnego dnia)
-                    # np. 07:00 = 420 minut
-                    night_shift_end_next_day = tmpl._parse_time(tmpl.end_time)
-                    
-                    for next_tmpl_idx, next_tmpl in enumerate(self.data.templates):
-                        if (emp_idx, next_day, next_tmpl_idx) not in self.shifts:
+                    for next_tmpl_idx in next_templates:
+                        if not self.has_shift(emp_idx, next_day, next_tmpl_idx):
                             continue
                         
-                        next_shift_start = next_tmpl.get_start_minutes()
-                        
-                        # Jeśli następna zmiana zaczyna się PRZED zakończeniem nocnej
-                        # = nakładanie się = ZABRONIONE
-                        if next_shift_start < night_shift_end_next_day:
-                            # Nie można przypisać obu zmian jednocześnie
-                            self.model.Add(
-                                self.shifts[(emp_idx, day, tmpl_idx)] +
-                                self.shifts[(emp_idx, next_day, next_tmpl_idx)] <= 1
-                            )
-                            self.stats['hard_constraints'] += 1
-                            overlaps_blocked += 1
+                        # Nie można przypisać obu zmian jednocześnie
+                        self.model.Add(
+                            self.shift_var(emp_idx, day, tmpl_idx) +
+                            self.shift_var(emp_idx, next_day, next_tmpl_idx) <= 1
+                        )
+                        self.stats['hard_constraints'] += 1
+                        overlaps_blocked += 1
         
         print(f"      • Zablokowano {overlaps_blocked} par nakładających się zmian")
     
@@ -942,18 +2324,14 @@ class CPSATScheduler:
             # pracę (np. max godzin, brak dostępnych szablonów).
             supervisor_work_vars = []
             for emp_idx in supervisor_indices:
-                if (emp_idx, day) in self.works_day:
+                if self.has_works_day(emp_idx, day):
                     # Sprawdź czy kierownik ma faktyczne opcje zmianowe
-                    has_shifts = any(
-                        (emp_idx, day, t) in self.shifts
-                        for t in range(len(self.data.templates))
-                    )
-                    if has_shifts:
-                        supervisor_work_vars.append(self.works_day[(emp_idx, day)])
+                    if (self.shift_index[emp_idx, day - 1] >= 0).any():
+                        supervisor_work_vars.append(self.works_var(emp_idx, day))
             
             if supervisor_work_vars:
                 # SOFT constraint: kara za brak kierownika w danym dniu
-                no_supervisor_today = self.model.NewBoolVar(f"no_sup_day_{day}")
+                no_supervisor_today = self.model.NewBoolVar(self._var_name(f"no_sup_day_{day}"))
                 # no_supervisor_today = 1 jeśli żaden kierownik nie pracuje
                 # sum(supervisor_work_vars) >= 1 - no_supervisor_today * 1
                 # Jeśli no_supervisor_today=0 → sum >= 1 (musi być kierownik)
@@ -972,7 +2350,7 @@ class CPSATScheduler:
             # Zbierz aktywne szablony na ten dzień
             active_templates_today = []
             for tmpl_idx, tmpl in enumerate(self.data.templates):
-                if not self.data.can_template_be_used_on_day(tmpl, day):
+                if not self.data.template_day_mask[tmpl_idx, day - 1]:
                     continue
                 active_templates_today.append(tmpl_idx)
             
@@ -982,33 +2360,29 @@ class CPSATScheduler:
                 # Zbierz zmiany kierowników dla tego szablonu
                 supervisor_shifts_for_template = []
                 for emp_idx in supervisor_indices:
-                    if (emp_idx, day, tmpl_idx) in self.shifts:
-                        supervisor_shifts_for_template.append(self.shifts[(emp_idx, day, tmpl_idx)])
+                    if self.has_shift(emp_idx, day, tmpl_idx):
+                        supervisor_shifts_for_template.append(self.shift_var(emp_idx, day, tmpl_idx))
                 
                 if not supervisor_shifts_for_template:
                     continue
                 
                 # Zbierz WSZYSTKIE zmiany (wszyscy pracownicy) dla tego szablonu
-                all_shifts_for_template = [
-                    self.shifts[(e, day, tmpl_idx)]
-                    for e in range(len(self.data.employees))
-                    if (e, day, tmpl_idx) in self.shifts
-                ]
+                all_shifts_for_template = self.day_template_vars(day, tmpl_idx)
                 
                 if not all_shifts_for_template:
                     continue
                 
                 # Zmienna: czy zmiana jest aktywna (ma jakichkolwiek pracowników)
-                shift_is_active = self.model.NewBoolVar(f"shift_active_{day}_{tmpl_idx}")
+                shift_is_active = self.model.NewBoolVar(self._var_name(f"shift_active_{day}_{tmpl_idx}"))
                 self.model.AddMaxEquality(shift_is_active, all_shifts_for_template)
                 
                 # Zmienna: czy kierownik jest na tej zmianie
-                sup_on_shift = self.model.NewBoolVar(f"sup_on_shift_{day}_{tmpl_idx}")
+                sup_on_shift = self.model.NewBoolVar(self._var_name(f"sup_on_shift_{day}_{tmpl_idx}"))
                 self.model.AddMaxEquality(sup_on_shift, supervisor_shifts_for_template)
                 
                 # Kara za: zmiana jest aktywna ALE nie ma na niej kierownika
                 # missing_sup = shift_is_active AND NOT sup_on_shift
-                missing_sup = self.model.NewBoolVar(f"missing_sup_{day}_{tmpl_idx}")
+                missing_sup = self.model.NewBoolVar(self._var_name(f"missing_sup_{day}_{tmpl_idx}"))
                 # missing_sup >= shift_is_active - sup_on_shift
                 self.model.Add(missing_sup >= shift_is_active - sup_on_shift)
                 # missing_sup <= shift_is_active (only penalize if shift is active)
@@ -1043,68 +2417,112 @@ class CPSATScheduler:
         - Slot 11:00-11:30: pokrywają obie zmiany
         - Slot 16:30-17:00: pokrywa zmiana 11-17
         - Slot 17:30-18:00: ŻADNA zmiana nie pokrywa! (błąd konfiguracji)
+        
+        Zbiory pokrywających szablonów zmieniają się tylko na początkach/końcach
+        zmian, więc sloty o identycznym lub zdominowanym (nadzbiór) zbiorze
+        nie generują osobnych ograniczeń - semantyka pozostaje bez zmian.
         """
         print("   → HC5: Min 1 pracownik w każdym slocie godzin otwarcia")
         
-        SLOT_DURATION = 30  # minuty
+        slots_total = 0
         slots_covered = 0
         
-        day_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        
         for day in self.data.all_days:
             if not self.data.is_workable_day(day):
                 continue
-            
-            weekday = self.data.day_to_weekday[day]
-            day_name = day_names[weekday]
+            # Dni zatwierdzone zostały już rozliczone w poprzednim oknie
+            if day in self.data.fixed_days:
+                continue
             
             # Pobierz godziny otwarcia dla tego dnia
-            day_hours = self.data.opening_hours.get(day_name, {})
-            open_time = day_hours.get('open')
-            close_time = day_hours.get('close')
-            
-            if not open_time or not close_time:
+            opening = self.data.get_opening_minutes(day)
+            if opening is None:
                 continue
+            slot_starts, cover = self.data.coverage_matrix(*opening)
             
-            # Parsuj godziny otwarcia
-            open_minutes = parse_time_to_minutes(open_time)
-            close_minutes = parse_time_to_minutes(close_time, is_end_time=True)
+            # Sloty pilnowane przez inną pulę pracowników (dekompozycja)
+            if self.data.delegated_coverage_slots:
+                own = np.array(
+                    [(day, int(s)) not in self.data.delegated_coverage_slots for s in slot_starts],
+                    dtype=bool,
+                )
+                cover = cover[:, own]
+            slots_total += cover.shape[1]
             
-            # Generuj sloty czasowe
-            current = open_minutes
-            while current < close_minutes:
-                slot_start = current
-                slot_end = min(current + SLOT_DURATION, close_minutes)
-                
-                # Znajdź wszystkie zmiany pokrywające ten slot
-                covering_shifts = []
-                
-                for tmpl_idx, tmpl in enumerate(self.data.templates):
-                    if not self.data.can_template_be_used_on_day(tmpl, day):
-                        continue
-                    
-                    tmpl_start = tmpl.get_start_minutes()
-                    tmpl_end = tmpl.get_end_minutes()
-                    
-                    # Zmiana pokrywa slot jeśli zaczyna się przed lub w momencie startu slotu
-                    # i kończy się po lub w momencie końca slotu
-                    if tmpl_start <= slot_start and tmpl_end >= slot_end:
-                        # Zbierz wszystkich pracowników mogących obsadzić tę zmianę
-                        for e in range(len(self.data.employees)):
-                            if (e, day, tmpl_idx) in self.shifts:
-                                covering_shifts.append(self.shifts[(e, day, tmpl_idx)])
-                
-                if covering_shifts:
-                    # ZAWSZE minimum 1 pracownik pokrywający ten slot
-                    self.model.Add(sum(covering_shifts) >= 1)
-                    self.stats['hard_constraints'] += 1
-                    slots_covered += 1
-                
-                current += SLOT_DURATION
-        
-        print(f"      • Wymuszono min 1 pracownika na {slots_covered} slotów czasowych")
+            # Zmienne pracowników mogących obsadzić każdy szablon w tym dniu
+            day_block = self.shift_index[:, day - 1, :]
+            usable = (day_block >= 0).any(axis=0)
+            
+            # Jedno ograniczenie na minimalny zbiór pokrywających szablonów
+            for tmpl_set in minimal_covering_sets(cover & usable[:, None]):
+                covering = day_block[:, list(tmpl_set)].ravel()
+                covering = covering[covering >= 0]
+                # ZAWSZE minimum 1 pracownik pokrywający ten slot
+                self._emit_linear(covering, np.ones(len(covering), dtype=np.int64), 1, cp_model.INT_MAX)
+                self.stats['hard_constraints'] += 1
+                slots_covered += 1
+        
+        print(f"      • Wymuszono min 1 pracownika: {slots_covered} ograniczeń "
+              f"dla {slots_total} slotów czasowych (po usunięciu duplikatów/zdominowanych)")
     
-    # =========================================================================
+    def positive_part(self, expr, lower: int, upper: int, name: str) -> cp_model.IntVar:
+        """
+        Zmienna kary = max(0, expr) dla minimalizowanych składników celu.
+        
+        Z kompakcją: jednostronny slack (var >= expr, var >= 0) - minimalizacja
+        celu dociąga go do max(0, expr) bez zmiennej różnicy i AddMaxEquality.
+        Bez kompakcji: diff == expr, AddMaxEquality(var, [diff, 0]) - o jedną
+        zmienną i jedno ograniczenie więcej (licznik _compaction_saved).
+        """
+        if self.data.model_compaction:
+            var = self.model.NewIntVar(max(lower, 0), max(upper, 0), self._var_name(name))
+            if isinstance(expr, LinearRow):
+                # var - sum(coeffs · x) >= offset
+                self._emit_linear(
+                    np.concatenate(([var.Index()], expr.indices)),
+                    np.concatenate(([1], -expr.coeffs)),
+                    expr.offset, cp_model.INT_MAX,
+                )
+            else:
+                self.model.Add(var >= expr)
+            self._compaction_saved['variables'] += 1
+            self._compaction_saved['constraints'] += 1
+            return var
+        
+        var = self.model.NewIntVar(max(lower, 0), max(upper, 0), self._var_name(name))
+        diff = self.model.NewIntVar(lower, upper, self._var_name(f"{name}_diff"))
+        if isinstance(expr, LinearRow):
+            self._emit_linear(
+                np.concatenate(([diff.Index()], expr.indices)),
+                np.concatenate(([1], -expr.coeffs)),
+                expr.offset, expr.offset,
+            )
+        else:
+            self.model.Add(diff == expr)
+        self.model.AddMaxEquality(var, [diff, 0])
+        return var
+    
+    def model_size(self) -> Dict[str, Any]:
+        """
+        Rozmiar modelu CP-SAT (proto) i rozmiar wariantu model_compaction=false.
+        
+        variables/constraints są zmierzone z protobufu. Wartości *_without_compaction
+        nie są budowane - to zmierzony rozmiar plus liczniki pominiętych zmiennych
+        i ograniczeń positive_part (test/test_model_compaction.py porównuje je
+        z modelem zbudowanym z model_compaction=false).
+        """
+        proto = self.model.Proto()
+        variables = len(proto.variables)
+        constraints = len(proto.constraints)
+        return {
+            'enabled': self.data.model_compaction,
+            'variables': variables,
+            'constraints': constraints,
+            'variables_without_compaction': variables + self._compaction_saved['variables'],
+            'constraints_without_compaction': constraints + self._compaction_saved['constraints'],
+        }
+    
+    # =========================================================================
     # KROK 3: PRIORYTET NR 1 - Godziny (Funkcja Celu)
     # =========================================================================
     
@@ -1115,68 +2533,63 @@ class CPSATScheduler:
         - Under-target (poniżej Normy): 10,000,000 pkt/min
         - W buforze [Norma, Norma+480]: 0 pkt
         - Over-buffer (powyżej Norma+480): 10,000,000 pkt/min
+        
+        Przy skalowaniu czasu (time_unit > 1) waga jednostki modelu = waga minuty × time_unit.
         """
         print("\n📊 Dodawanie PRIORYTETU NR 1 - Godziny...")
         
-        work_days_count = len(self.data.weekdays)
-        
+        unit = self.time_unit
         for emp_idx, emp in enumerate(self.data.employees):
-            target_minutes = emp.get_target_minutes(self.data.monthly_norm_minutes, work_days_count)
+            target_minutes = self.hours_targets[emp_idx]
             buffer_max = target_minutes + HOURS_BUFFER_MINUTES
+            # Cel i bufor w jednostkach modelu
+            target_units = target_minutes // unit
+            buffer_units = buffer_max // unit
             
-            # Oblicz sumę minut przypisanych pracownikowi
-            total_minutes_terms = []
+            # Suma minut przypisanych pracownikowi (warstwa agregatów)
+            total_minutes_expr = self.period_minutes(emp_idx, self.data.all_days)
             
-            for day in self.data.all_days:
-                for tmpl_idx, tmpl in enumerate(self.data.templates):
-                    if (emp_idx, day, tmpl_idx) in self.shifts:
-                        duration = tmpl.get_duration_minutes()
-                        total_minutes_terms.append(
-                            self.shifts[(emp_idx, day, tmpl_idx)] * duration
-                        )
-            
-            if not total_minutes_terms:
+            if total_minutes_expr is None:
                 # Brak możliwych zmian - pracownik całkowicie niedostępny
                 print(f"      ⚠️ {emp.full_name}: brak możliwych zmian (pełna niedostępność)")
                 continue
             
-            # Maksymalna możliwa liczba minut
-            max_possible = sum(
-                tmpl.get_duration_minutes() 
-                for tmpl in self.data.templates
-            ) * self.data.days_in_month
+            # Osiągalne minuty (dostępność + max 1 zmiana dziennie)
+            min_possible, max_possible = self.minutes_bounds(emp_idx, self.data.all_days)
             
             # Zmienna: całkowite minuty pracownika
-            total_minutes = self.model.NewIntVar(0, max_possible, f"total_min_{emp_idx}")
-            self.model.Add(total_minutes == sum(total_minutes_terms))
+            total_minutes = self.model.NewIntVar(min_possible, max_possible, self._var_name(f"total_min_{emp_idx}"))
+            self._emit_linear(
+                np.concatenate(([total_minutes.Index()], total_minutes_expr.indices)),
+                np.concatenate(([1], -total_minutes_expr.coeffs)), 0, 0,
+            )
             self.total_minutes_vars[emp_idx] = total_minutes
             
             # ===== UNDER-TARGET (poniżej normy) =====
             # under = max(0, target - total)
-            under_target = self.model.NewIntVar(0, target_minutes, f"under_{emp_idx}")
-            # Pomocnicza zmienna dla różnicy
-            diff_under = self.model.NewIntVar(-max_possible, max_possible, f"diff_under_{emp_idx}")
-            self.model.Add(diff_under == target_minutes - total_minutes)
-            self.model.AddMaxEquality(under_target, [diff_under, 0])
+            under_target = self.positive_part(
+                target_units - total_minutes, target_units - max_possible, target_units - min_possible,
+                f"under_{emp_idx}"
+            )
             
             # Kara za każdą minutę poniżej normy
             self.objective_level1.append((
                 under_target,
-                WEIGHT_HIERARCHY['HOURS_UNDER_TARGET_PER_MINUTE'],
+                WEIGHT_HIERARCHY['HOURS_UNDER_TARGET_PER_MINUTE'] * unit,
                 f"under_target_{emp.full_name}"
             ))
             
             # ===== OVER-BUFFER (powyżej normy + 8h) =====
             # over = max(0, total - buffer_max)
-            over_buffer = self.model.NewIntVar(0, max_possible, f"over_{emp_idx}")
-            diff_over = self.model.NewIntVar(-max_possible, max_possible, f"diff_over_{emp_idx}")
-            self.model.Add(diff_over == total_minutes - buffer_max)
-            self.model.AddMaxEquality(over_buffer, [diff_over, 0])
+            over_buffer = self.positive_part(
+                total_minutes - buffer_units, min_possible - buffer_units, max_possible - buffer_units,
+                f"over_{emp_idx}"
+            )
             
             # Kara za każdą minutę powyżej bufora
             self.objective_level1.append((
                 over_buffer,
-                WEIGHT_HIERARCHY['HOURS_OVER_BUFFER_PER_MINUTE'],
+                WEIGHT_HIERARCHY['HOURS_OVER_BUFFER_PER_MINUTE'] * unit,
                 f"over_buffer_{emp.full_name}"
             ))
             
@@ -1184,6 +2597,33 @@ class CPSATScheduler:
             
             print(f"      • {emp.full_name}: target={target_minutes}min ({target_minutes//60}h), "
                   f"bufor=[{target_minutes}, {buffer_max}] min")
+            if emp_idx in self.adjusted_targets:
+                print(f"        ↪ cel {self.adjusted_targets[emp_idx][0]}min nieosiągalny "
+                      f"- najbliższa osiągalna suma {target_minutes}min")
+    
+    def add_symmetry_breaking(self):
+        """
+        Łamanie symetrii: w klasie wymiennych pracowników minuty są nierosnące.
+        
+        Permutacja identycznych pracowników daje rozwiązanie o tym samym koszcie,
+        więc narzucenie porządku total_min[a] >= total_min[b] nie odcina
+        optimum, a solver nie przegląda symetrycznych wariantów.
+        """
+        if not self.data.symmetry_breaking:
+            return
+        
+        classes = self.data.employee_equivalence_classes()
+        ordered = 0
+        for members in classes:
+            ordered_members = [e for e in members if e in self.total_minutes_vars]
+            self.symmetry_classes.append(ordered_members)
+            for first, second in zip(ordered_members, ordered_members[1:]):
+                self.model.Add(self.total_minutes_vars[first] >= self.total_minutes_vars[second])
+                ordered += 1
+        
+        self.stats['symmetry_classes'] = len(classes)
+        self.stats['hard_constraints'] += ordered
+        print(f"   → Łamanie symetrii: {len(classes)} klas wymiennych pracowników, {ordered} ograniczeń porządku")
     
     # =========================================================================
     # KROK 4: PRIORYTET NR 2 - Coverage ze Slack
@@ -1211,7 +2651,7 @@ class CPSATScheduler:
                 continue
             
             for tmpl_idx, tmpl in enumerate(self.data.templates):
-                if not self.data.can_template_be_used_on_day(tmpl, day):
+                if not self.data.template_day_mask[tmpl_idx, day - 1]:
                     continue
                 
                 min_required = tmpl.min_employees
@@ -1223,11 +2663,7 @@ class CPSATScheduler:
                     continue
                 
                 # Zbierz wszystkie zmienne dla tego szablonu w tym dniu
-                assigned_vars = [
-                    self.shifts[(e, day, tmpl_idx)]
-                    for e in range(len(self.data.employees))
-                    if (e, day, tmpl_idx) in self.shifts
-                ]
+                assigned_vars = self.day_template_vars(day, tmpl_idx)
                 
                 if not assigned_vars:
                     # Brak pracowników mogących obsadzić tę zmianę
@@ -1243,16 +2679,17 @@ class CPSATScheduler:
                     coverage_count += 1
                     continue
                 
-                # Zmienna: ilu przypisanych
-                assigned_count = self.model.NewIntVar(0, len(assigned_vars), f"cov_{day}_{tmpl_idx}")
-                self.model.Add(assigned_count == sum(assigned_vars))
+                # Zmienna: ilu przypisanych (współdzielona obsada dzień × szablon)
+                assigned_count = self.headcount(day, tmpl_idx)
                 
                 # Slack: ile brakuje do minimum
                 # slack = max(0, min_required - assigned_count)
-                slack = self.model.NewIntVar(0, min_required, f"slack_{day}_{tmpl_idx}")
-                diff = self.model.NewIntVar(-len(assigned_vars), min_required, f"slack_diff_{day}_{tmpl_idx}")
-                self.model.Add(diff == min_required - assigned_count)
-                self.model.AddMaxEquality(slack, [diff, 0])
+                slack = self.positive_part(
+                    min_required - assigned_count,
+                    min_required - int(self.headcount_max[day - 1, tmpl_idx]),
+                    min_required - int(self.headcount_min[day - 1, tmpl_idx]),
+                    f"slack_{day}_{tmpl_idx}"
+                )
                 
                 self.coverage_slack[(day, tmpl_idx)] = slack
                 
@@ -1284,11 +2721,15 @@ class CPSATScheduler:
         print("\n📊 Dodawanie PRIORYTETU NR 3 - Kodeks Pracy (soft)...")
         
         self._add_sc_daily_rest_11h()
-        self._add_sc_consecutive_days()
+        if self.data.sequence_encoding == 'automaton':
+            self._add_sc_work_pattern_automaton()
+        else:
+            self._add_sc_consecutive_days()
         self._add_sc_weekly_hours_48h()
-        self._add_sc_weekly_rest_35h()
+        if self.data.sequence_encoding == 'window':
+            self._add_sc_weekly_rest_35h()
         
-        print(f"   ✅ Dodano ograniczenia Kodeksu Pracy jako soft constraints")
+        print("   ✅ Dodano ograniczenia Kodeksu Pracy jako soft constraints")
     
     def _add_sc_daily_rest_11h(self):
         """
@@ -1300,66 +2741,74 @@ class CPSATScheduler:
         
         OBSŁUGA ZMIAN NOCNYCH:
         Zmiana nocna (np. 19:00-07:00) kończy się następnego dnia.
-        get_end_minutes() zwraca wartość > 1440 dla takich zmian.
+        template_table[t].end ma wartość > 1440 dla takich zmian.
         
         Przykład kalkulacji odpoczynku:
         - Zmiana 1: 19:00-07:00 (shift_end = 1860, czyli 07:00 następnego dnia)
         - Zmiana 2 następnego dnia: 08:00-16:00 (next_start = 480)
         - rest = 480 - (1860 - 1440) = 480 - 420 = 60 min = 1h (naruszenie 11h!)
         """
-        min_rest_minutes = self.data.min_daily_rest_hours * 60
         violations = 0
+        short_rest_successors = self.data.short_rest_successors
+        
+        if self.data.conflict_encoding == 'clause':
+            # Jedna zmienna naruszenia na biklikę: shift1 ∧ shift2 ⇒ violation
+            # (HC1: max 1 zmiana dziennie, więc naruszona może być co najwyżej jedna para)
+            for day in self.data.all_days[:-1]:
+                for group_idx, (firsts, seconds) in enumerate(self.data.short_rest_bicliques):
+                    first_block = self.shift_index[:, day - 1, list(firsts)]
+                    second_block = self.shift_index[:, day, list(seconds)]
+                    candidates = (first_block >= 0).any(axis=1) & (second_block >= 0).any(axis=1)
+                    for emp_idx in np.flatnonzero(candidates).tolist():
+                        first_row = first_block[emp_idx][first_block[emp_idx] >= 0]
+                        second_row = second_block[emp_idx][second_block[emp_idx] >= 0]
+                        
+                        violation = self.model.NewBoolVar(self._var_name(f"rest_viol_{emp_idx}_{day}_{group_idx}"))
+                        for shift1 in first_row.tolist():
+                            for shift2 in second_row.tolist():
+                                self._emit_bool_or((-shift1 - 1, -shift2 - 1, violation.Index()))
+                        
+                        self.objective_level3.append((
+                            violation,
+                            WEIGHT_HIERARCHY['DAILY_REST_VIOLATION'],
+                            f"rest_11h_{emp_idx}_{day}"
+                        ))
+                        violations += 1
+            
+            self.stats['soft_constraints'] += violations
+            print(f"   → Odpoczynek 11h: {violations} potencjalnych naruszeń (klauzule)")
+            return
         
         for emp_idx in range(len(self.data.employees)):
             for day in self.data.all_days[:-1]:
                 next_day = day + 1
                 
-                for tmpl_idx, tmpl in enumerate(self.data.templates):
-                    if (emp_idx, day, tmpl_idx) not in self.shifts:
+                # Tylko pary z macierzy zgodności z odpoczynkiem 0 <= rest < 11h
+                for tmpl_idx, next_templates in short_rest_successors.items():
+                    if not self.has_shift(emp_idx, day, tmpl_idx):
                         continue
                     
-                    # get_end_minutes() zwraca wartość > 1440 dla zmian nocnych
-                    shift_end = tmpl.get_end_minutes()
-                    
-                    for next_tmpl_idx, next_tmpl in enumerate(self.data.templates):
-                        if (emp_idx, next_day, next_tmpl_idx) not in self.shifts:
+                    for next_tmpl_idx in next_templates:
+                        if not self.has_shift(emp_idx, next_day, next_tmpl_idx):
                             continue
                         
-                        next_shift_start = next_tmpl.get_start_minutes()
+                        # Zmienna binarna: czy oba przypisane (naruszenie)
+                        violation = self.model.NewBoolVar(self._var_name(f"rest_viol_{emp_idx}_{day}_{tmpl_idx}_{next_tmpl_idx}"))
+                        
+                        shift1 = self.shift_var(emp_idx, day, tmpl_idx)
+                        shift2 = self.shift_var(emp_idx, next_day, next_tmpl_idx)
                         
-                        # Oblicz przerwę między zmianami
-                        # shift_end może być > 1440 dla zmian nocnych (kończy się następnego dnia)
-                        if shift_end <= 1440:
-                            # Zmiana dzienna: kończy się tego samego dnia
-                            # rest = czas do północy + czas od północy do startu następnej
-                            rest = (24 * 60 - shift_end) + next_shift_start
-                        else:
-                            # Zmiana nocna: kończy się następnego dnia
-                            # shift_end - 1440 = ile minut po północy kończy się zmiana
-                            # rest = start następnej - koniec poprzedniej (oba w tym samym dniu)
-                            rest = next_shift_start - (shift_end - 24 * 60)
+                        # violation >= shift1 + shift2 - 1
+                        # Jeśli obie = 1, to violation >= 1, czyli violation = 1
+                        # Solver minimalizuje, więc w pozostałych przypadkach wybierze 0
+                        self.model.Add(violation >= shift1 + shift2 - 1)
                         
-                        # Nakładanie (rest < 0) jest HARD constraint, tu tylko soft dla rest >= 0
-                        if rest >= 0 and rest < min_rest_minutes:
-                            # Zmienna binarna: czy oba przypisane (naruszenie)
-                            # violation = 1 jeśli obie zmiany są przypisane
-                            violation = self.model.NewBoolVar(f"rest_viol_{emp_idx}_{day}_{tmpl_idx}_{next_tmpl_idx}")
-                            
-                            shift1 = self.shifts[(emp_idx, day, tmpl_idx)]
-                            shift2 = self.shifts[(emp_idx, next_day, next_tmpl_idx)]
-                            
-                            # violation >= shift1 + shift2 - 1
-                            # Jeśli obie = 1, to violation >= 1, czyli violation = 1
-                            # Jeśli co najwyżej jedna = 1, to violation >= 0, może być 0 lub 1
-                            # Solver będzie chciał minimalizować, więc wybierze 0
-                            self.model.Add(violation >= shift1 + shift2 - 1)
-                            
-                            self.objective_level3.append((
-                                violation,
-                                WEIGHT_HIERARCHY['DAILY_REST_VIOLATION'],
-                                f"rest_11h_{emp_idx}_{day}"
-                            ))
-                            violations += 1
+                        self.objective_level3.append((
+                            violation,
+                            WEIGHT_HIERARCHY['DAILY_REST_VIOLATION'],
+                            f"rest_11h_{emp_idx}_{day}"
+                        ))
+                        violations += 1
         
         self.stats['soft_constraints'] += violations
         print(f"   → Odpoczynek 11h: {violations} potencjalnych naruszeń")
@@ -1373,23 +2822,20 @@ class CPSATScheduler:
         window_size = max_consecutive + 1  # 7 dni
         violations = 0
         
+        days = self.data.all_days
+        
         for emp_idx in range(len(self.data.employees)):
-            for start_day in range(1, self.data.days_in_month - window_size + 2):
-                window_days = list(range(start_day, start_day + window_size))
-                
-                work_vars = []
-                for day in window_days:
-                    if day <= self.data.days_in_month and (emp_idx, day) in self.works_day:
-                        work_vars.append(self.works_day[(emp_idx, day)])
+            for start_pos in range(len(days) - window_size + 1):
+                start_day = days[start_pos]
+                worked = self.work_window(emp_idx, start_pos, window_size)
                 
-                if len(work_vars) == window_size:
+                if worked is not None:
                     # Zmienna pomocnicza dla przekroczenia
                     # excess = 1 jeśli suma >= 7 (pracuje wszystkie dni w oknie)
-                    excess = self.model.NewIntVar(0, 1, f"consec_excess_{emp_idx}_{start_day}")
                     # excess >= sum - 6, czyli jeśli sum >= 7, excess >= 1
-                    diff = self.model.NewIntVar(-window_size, 1, f"consec_diff_{emp_idx}_{start_day}")
-                    self.model.Add(diff == sum(work_vars) - (window_size - 1))
-                    self.model.AddMaxEquality(excess, [diff, 0])
+                    excess = self.positive_part(
+                        worked - (window_size - 1), -window_size, 1, f"consec_excess_{emp_idx}_{start_day}"
+                    )
                     
                     self.objective_level3.append((
                         excess,
@@ -1401,19 +2847,74 @@ class CPSATScheduler:
         self.stats['soft_constraints'] += violations
         print(f"   → Max 6 dni z rzędu: {violations} potencjalnych naruszeń")
     
+    def _add_sc_work_pattern_automaton(self):
+        """
+        SOFT: Max 6 dni z rzędu i 1 dzień wolny/tydzień jako automat (AddAutomaton).
+        
+        Etykieta dnia = works_day + 2·consec + 4·no_rest, gdzie consec/no_rest
+        to Boole naruszeń. Stan automatu: (pozycja w tygodniu, długość serii,
+        czy cały bieżący tydzień przepracowany). Automat jest deterministyczny,
+        więc naruszenia są wyznaczone przez sekwencję dni - kary są identyczne
+        z kodowaniem okienkowym (seria L > 6 dni = L - 6 naruszeń), przy jednym
+        ograniczeniu globalnym per pracownik zamiast O(D) zmiennych okien.
+        """
+        days = self.data.all_days
+        if not days:
+            return
+        max_consecutive = self.data.max_consecutive_days
+        transitions, state_id, num_states = build_work_pattern_automaton(max_consecutive)
+        # Okno może zaczynać się w środku tygodnia - ten tydzień nie jest pełny
+        starting_state = state_id((days[0] - 1) % 7, 0, False)
+        
+        consecutive_vars = 0
+        weekly_vars = 0
+        for emp_idx in range(len(self.data.employees)):
+            labels = []
+            for pos, day in enumerate(days):
+                works = self.works_var(emp_idx, day) if self.has_works_day(emp_idx, day) else 0
+                
+                # Naruszenie serii możliwe dopiero od (max_consecutive + 1)-go dnia okna
+                consec = 0
+                if pos >= max_consecutive and self.has_works_day(emp_idx, day):
+                    consec = self.model.NewBoolVar(self._var_name(f"consec_excess_{emp_idx}_{day}"))
+                    self.objective_level3.append((
+                        consec,
+                        WEIGHT_HIERARCHY['CONSECUTIVE_DAYS_VIOLATION'],
+                        f"consecutive_{emp_idx}_{day}"
+                    ))
+                    consecutive_vars += 1
+                
+                # Brak dnia wolnego rozliczany w ostatnim dniu pełnego tygodnia
+                no_rest = 0
+                if (day - 1) % 7 == 6 and pos >= 6 and self.has_works_day(emp_idx, day):
+                    no_rest = self.model.NewBoolVar(self._var_name(f"no_rest_{emp_idx}_{self.data.get_week_number(day)}"))
+                    self.objective_level3.append((
+                        no_rest,
+                        WEIGHT_HIERARCHY['WEEKLY_REST_VIOLATION'],
+                        f"weekly_rest_{emp_idx}_{self.data.get_week_number(day)}"
+                    ))
+                    weekly_vars += 1
+                
+                label = self.model.NewIntVar(0, 7, self._var_name(f"pattern_{emp_idx}_{day}"))
+                self.model.Add(label == works + 2 * consec + 4 * no_rest)
+                labels.append(label)
+            
+            self.model.AddAutomaton(labels, starting_state, list(range(num_states)), transitions)
+            self.stats['soft_constraints'] += 1
+        
+        print(f"   → Automat sekwencji dni: {len(self.data.employees)} automatów, "
+              f"{consecutive_vars} zmiennych serii, {weekly_vars} zmiennych tygodniowych")
+    
     def _add_sc_weekly_hours_48h(self):
         """
         SOFT: Max 48h pracy tygodniowo.
         Za każdą godzinę >48: 10,000 pkt.
-        
-        Używamy AddMaxEquality z zerem
         """
-        max_weekly_minutes = self.data.max_weekly_hours * 60
+        max_weekly_minutes = self.max_weekly_minutes // self.time_unit
+        # Waga za minutę przeliczona na jednostkę modelu
+        overtime_weight = WEIGHT_HIERARCHY['MAX_WEEKLY_HOURS_VIOLATION'] // 60 * self.time_unit
         weeks_checked = 0
         
-        # Tworzymy zero raz
-        zero_var = self.model.NewIntVar(0, 0, "zero")
-        
         for emp_idx in range(len(self.data.employees)):
             weeks: Dict[int, List[int]] = defaultdict(list)
             for day in self.data.all_days:
@@ -1421,33 +2922,23 @@ class CPSATScheduler:
                 weeks[week_num].append(day)
             
             for week_num, week_days in weeks.items():
-                week_minutes_terms = []
-                
-                for day in week_days:
-                    for tmpl_idx, tmpl in enumerate(self.data.templates):
-                        if (emp_idx, day, tmpl_idx) in self.shifts:
-                            duration = tmpl.get_duration_minutes()
-                            week_minutes_terms.append(
-                                self.shifts[(emp_idx, day, tmpl_idx)] * duration
-                            )
-                
-                if not week_minutes_terms:
+                week_minutes = self.period_minutes(emp_idx, week_days)
+                if week_minutes is None:
                     continue
                 
-                max_possible_week = len(week_days) * max(t.get_duration_minutes() for t in self.data.templates)
+                min_possible_week, max_possible_week = self.minutes_bounds(emp_idx, week_days)
                 
-                week_minutes = self.model.NewIntVar(0, max_possible_week, f"week_min_{emp_idx}_{week_num}")
-                self.model.Add(week_minutes == sum(week_minutes_terms))
-                
-                # Przekroczenie: overtime >= week_minutes - max_weekly_minutes oraz overtime >= 0
-                overtime = self.model.NewIntVar(0, max_possible_week, f"overtime_{emp_idx}_{week_num}")
-                self.model.Add(overtime >= week_minutes - max_weekly_minutes)
-                self.model.Add(overtime >= 0)
+                # Przekroczenie: overtime = max(0, minuty tygodnia - max_weekly_minutes)
+                overtime = self.positive_part(
+                    week_minutes - max_weekly_minutes,
+                    min_possible_week - max_weekly_minutes, max_possible_week - max_weekly_minutes,
+                    f"overtime_{emp_idx}_{week_num}"
+                )
                 
                 # Karamy za minuty przekroczenia (nie godziny - prostsze)
                 self.objective_level3.append((
                     overtime,
-                    WEIGHT_HIERARCHY['MAX_WEEKLY_HOURS_VIOLATION'] // 60,  # Przeliczone na minuty
+                    overtime_weight,
                     f"weekly_48h_{emp_idx}_{week_num}"
                 ))
                 weeks_checked += 1
@@ -1472,18 +2963,13 @@ class CPSATScheduler:
                 if len(week_days) < 7:
                     continue
                 
-                work_vars = []
-                for day in week_days:
-                    if (emp_idx, day) in self.works_day:
-                        work_vars.append(self.works_day[(emp_idx, day)])
+                # Tydzień to okno 7 kolejnych dni - ten sam wektor works_day co okna przesuwne
+                worked = self.work_window(emp_idx, self.data.all_days.index(week_days[0]), 7)
                 
-                if len(work_vars) == 7:
+                if worked is not None:
                     # all_7_days = 1 jeśli pracuje wszystkie 7 dni (brak dnia wolnego)
                     # Używamy: excess >= sum - 6
-                    excess = self.model.NewIntVar(0, 1, f"no_rest_{emp_idx}_{week_num}")
-                    diff = self.model.NewIntVar(-7, 1, f"rest_diff_{emp_idx}_{week_num}")
-                    self.model.Add(diff == sum(work_vars) - 6)
-                    self.model.AddMaxEquality(excess, [diff, 0])
+                    excess = self.positive_part(worked - 6, -7, 1, f"no_rest_{emp_idx}_{week_num}")
                     
                     self.objective_level3.append((
                         excess,
@@ -1512,7 +2998,7 @@ class CPSATScheduler:
         self._add_shift_distribution_fairness()
         self._add_daily_coverage_balance()
         
-        print(f"   ✅ Dodano preferencje i sprawiedliwość")
+        print("   ✅ Dodano preferencje i sprawiedliwość")
     
     def _add_preference_bonuses(self):
         """Bonus/kara za preferencje pracowników."""
@@ -1529,9 +3015,9 @@ class CPSATScheduler:
                 
                 if is_avoided:
                     # Kara za pracę w niechciany dzień
-                    if (emp_idx, day) in self.works_day:
+                    if self.has_works_day(emp_idx, day):
                         self.objective_level4.append((
-                            self.works_day[(emp_idx, day)],
+                            self.works_var(emp_idx, day),
                             WEIGHT_HIERARCHY['AVOIDED_DAY_PENALTY'],
                             f"avoided_day_{emp_idx}_{day}"
                         ))
@@ -1546,9 +3032,9 @@ class CPSATScheduler:
         
         for emp_idx in range(len(self.data.employees)):
             for day in self.data.trading_sundays:
-                if (emp_idx, day) in self.works_day:
+                if self.has_works_day(emp_idx, day):
                     self.objective_level4.append((
-                        self.works_day[(emp_idx, day)],
+                        self.works_var(emp_idx, day),
                         WEIGHT_HIERARCHY['SUNDAY_WORK_PENALTY'],
                         f"sunday_work_{emp_idx}_{day}"
                     ))
@@ -1570,12 +3056,12 @@ class CPSATScheduler:
         weekend_counts = []
         
         for emp_idx in range(len(self.data.employees)):
-            count_var = self.model.NewIntVar(0, len(weekend_days), f"weekend_cnt_{emp_idx}")
+            count_var = self.model.NewIntVar(0, len(weekend_days), self._var_name(f"weekend_cnt_{emp_idx}"))
             
             weekend_work_vars = []
             for day in weekend_days:
-                if (emp_idx, day) in self.works_day:
-                    weekend_work_vars.append(self.works_day[(emp_idx, day)])
+                if self.has_works_day(emp_idx, day):
+                    weekend_work_vars.append(self.works_var(emp_idx, day))
             
             if weekend_work_vars:
                 self.model.Add(count_var == sum(weekend_work_vars))
@@ -1585,13 +3071,13 @@ class CPSATScheduler:
             weekend_counts.append(count_var)
         
         if len(weekend_counts) >= 2:
-            max_weekends = self.model.NewIntVar(0, len(weekend_days), "max_wknd")
-            min_weekends = self.model.NewIntVar(0, len(weekend_days), "min_wknd")
+            max_weekends = self.model.NewIntVar(0, len(weekend_days), self._var_name("max_wknd"))
+            min_weekends = self.model.NewIntVar(0, len(weekend_days), self._var_name("min_wknd"))
             
             self.model.AddMaxEquality(max_weekends, weekend_counts)
             self.model.AddMinEquality(min_weekends, weekend_counts)
             
-            weekend_diff = self.model.NewIntVar(0, len(weekend_days), "wknd_diff")
+            weekend_diff = self.model.NewIntVar(0, len(weekend_days), self._var_name("wknd_diff"))
             self.model.Add(weekend_diff == max_weekends - min_weekends)
             
             self.objective_level4.append((
@@ -1601,7 +3087,7 @@ class CPSATScheduler:
             ))
             self.stats['soft_constraints'] += 1
         
-        print(f"   → Sprawiedliwość weekendowa: aktywne")
+        print("   → Sprawiedliwość weekendowa: aktywne")
         
         # ===== Dodatkowa sprawiedliwość dla kierowników =====
         supervisor_indices = [
@@ -1613,12 +3099,12 @@ class CPSATScheduler:
             supervisor_weekend_counts = []
             
             for emp_idx in supervisor_indices:
-                count_var = self.model.NewIntVar(0, len(weekend_days), f"sup_wknd_cnt_{emp_idx}")
+                count_var = self.model.NewIntVar(0, len(weekend_days), self._var_name(f"sup_wknd_cnt_{emp_idx}"))
                 
                 weekend_work_vars = []
                 for day in weekend_days:
-                    if (emp_idx, day) in self.works_day:
-                        weekend_work_vars.append(self.works_day[(emp_idx, day)])
+                    if self.has_works_day(emp_idx, day):
+                        weekend_work_vars.append(self.works_var(emp_idx, day))
                 
                 if weekend_work_vars:
                     self.model.Add(count_var == sum(weekend_work_vars))
@@ -1628,13 +3114,13 @@ class CPSATScheduler:
                 supervisor_weekend_counts.append(count_var)
             
             # Różnica między kierownikami w liczbie weekendów powinna być max 1
-            max_sup_wknd = self.model.NewIntVar(0, len(weekend_days), "max_sup_wknd")
-            min_sup_wknd = self.model.NewIntVar(0, len(weekend_days), "min_sup_wknd")
+            max_sup_wknd = self.model.NewIntVar(0, len(weekend_days), self._var_name("max_sup_wknd"))
+            min_sup_wknd = self.model.NewIntVar(0, len(weekend_days), self._var_name("min_sup_wknd"))
             
             self.model.AddMaxEquality(max_sup_wknd, supervisor_weekend_counts)
             self.model.AddMinEquality(min_sup_wknd, supervisor_weekend_counts)
             
-            sup_wknd_diff = self.model.NewIntVar(0, len(weekend_days), "sup_wknd_diff")
+            sup_wknd_diff = self.model.NewIntVar(0, len(weekend_days), self._var_name("sup_wknd_diff"))
             self.model.Add(sup_wknd_diff == max_sup_wknd - min_sup_wknd)
             
             # Wyższa kara dla kierowników - sprawiedliwość weekendowa jest ważniejsza
@@ -1653,37 +3139,37 @@ class CPSATScheduler:
             return
         
         fairness_count = 0
+        day_index = np.asarray(self.data.all_days, dtype=np.int64) - 1
         
         for tmpl_idx, tmpl in enumerate(self.data.templates):
             employee_counts = []
+            template_block = self.shift_index[:, day_index, tmpl_idx]
             
-            for emp_idx in range(len(self.data.employees)):
-                emp_shifts = [
-                    self.shifts[(emp_idx, day, tmpl_idx)]
-                    for day in self.data.all_days
-                    if (emp_idx, day, tmpl_idx) in self.shifts
-                ]
-                
-                if emp_shifts:
-                    count_var = self.model.NewIntVar(0, len(self.data.all_days), f"shft_cnt_{emp_idx}_{tmpl_idx}")
-                    self.model.Add(count_var == sum(emp_shifts))
-                    employee_counts.append(count_var)
+            for emp_idx in np.flatnonzero((template_block >= 0).any(axis=1)).tolist():
+                emp_shifts = template_block[emp_idx][template_block[emp_idx] >= 0]
+                count_var = self.model.NewIntVar(
+                    0, len(emp_shifts), self._var_name(f"shft_cnt_{emp_idx}_{tmpl_idx}")
+                )
+                self._emit_linear(
+                    np.concatenate(([count_var.Index()], emp_shifts)), [1] + [-1] * len(emp_shifts), 0, 0
+                )
+                employee_counts.append(count_var)
             
             if len(employee_counts) < 2:
                 continue
             
-            min_count = self.model.NewIntVar(0, len(self.data.all_days), f"min_shft_{tmpl_idx}")
-            max_count = self.model.NewIntVar(0, len(self.data.all_days), f"max_shft_{tmpl_idx}")
+            most_days = max(var.Proto().domain[-1] for var in employee_counts)
+            min_count = self.model.NewIntVar(0, most_days, self._var_name(f"min_shft_{tmpl_idx}"))
+            max_count = self.model.NewIntVar(0, most_days, self._var_name(f"max_shft_{tmpl_idx}"))
             
             self.model.AddMinEquality(min_count, employee_counts)
             self.model.AddMaxEquality(max_count, employee_counts)
             
-            diff = self.model.NewIntVar(0, len(self.data.all_days), f"shft_diff_{tmpl_idx}")
+            diff = self.model.NewIntVar(0, most_days, self._var_name(f"shft_diff_{tmpl_idx}"))
             self.model.Add(diff == max_count - min_count)
             
             # Tolerujemy różnicę 1
-            excess = self.model.NewIntVar(0, len(self.data.all_days), f"shft_excess_{tmpl_idx}")
-            self.model.AddMaxEquality(excess, [diff - 1, 0])
+            excess = self.positive_part(diff - 1, -1, most_days - 1, f"shft_excess_{tmpl_idx}")
             
             self.objective_level4.append((
                 excess,
@@ -1714,32 +3200,26 @@ class CPSATScheduler:
             shift_coverage_vars = []
             
             for tmpl_idx, tmpl in enumerate(self.data.templates):
-                if not self.data.can_template_be_used_on_day(tmpl, day):
+                if not self.data.template_day_mask[tmpl_idx, day - 1]:
                     continue
                 
-                # Zbierz wszystkich pracowników na tej zmianie
-                assigned_vars = [
-                    self.shifts[(e, day, tmpl_idx)]
-                    for e in range(len(self.data.employees))
-                    if (e, day, tmpl_idx) in self.shifts
-                ]
-                
-                if assigned_vars:
-                    # Zmienna: liczba pracowników na tej zmianie
-                    coverage_var = self.model.NewIntVar(0, len(assigned_vars), f"day_cov_{day}_{tmpl_idx}")
-                    self.model.Add(coverage_var == sum(assigned_vars))
+                # Zmienna: liczba pracowników na tej zmianie (współdzielona obsada)
+                coverage_var = self.headcount(day, tmpl_idx)
+                if coverage_var is not None:
                     shift_coverage_vars.append(coverage_var)
             
             # Jeśli są co najmniej 2 zmiany w tym dniu, minimalizuj różnicę
             if len(shift_coverage_vars) >= 2:
-                max_coverage = self.model.NewIntVar(0, len(self.data.employees), f"max_cov_day_{day}")
-                min_coverage = self.model.NewIntVar(0, len(self.data.employees), f"min_cov_day_{day}")
+                lowest = min(var.Proto().domain[0] for var in shift_coverage_vars)
+                highest = max(var.Proto().domain[-1] for var in shift_coverage_vars)
+                max_coverage = self.model.NewIntVar(lowest, highest, self._var_name(f"max_cov_day_{day}"))
+                min_coverage = self.model.NewIntVar(lowest, highest, self._var_name(f"min_cov_day_{day}"))
                 
                 self.model.AddMaxEquality(max_coverage, shift_coverage_vars)
                 self.model.AddMinEquality(min_coverage, shift_coverage_vars)
                 
                 # Różnica między max a min obsadą
-                coverage_diff = self.model.NewIntVar(0, len(self.data.employees), f"cov_diff_day_{day}")
+                coverage_diff = self.model.NewIntVar(0, highest - lowest, self._var_name(f"cov_diff_day_{day}"))
                 self.model.Add(coverage_diff == max_coverage - min_coverage)
                 
                 # Karamy za każdą jednostkę różnicy (chcemy aby było jak najbardziej równomiernie)
@@ -1755,9 +3235,152 @@ class CPSATScheduler:
         print(f"   → Równomierna obsada dzienna: {balance_count} dni")
     
     # =========================================================================
-    # KROK 7: Budowanie funkcji celu i rozwiązywanie
+    # KROK 7: Warm start - hinty z poprzedniego rozwiązania
     # =========================================================================
     
+    def add_warm_start_hints(self):
+        """
+        Podaje solverowi hinty z wcześniejszego grafiku tego samego miesiąca.
+        
+        Źródła (w kolejności priorytetu):
+        1. draft_schedule z payloadu (szkic od klienta)
+        2. ostatni zaakceptowany grafik z SOLUTION_STORE (org, rok, miesiąc)
+        3. grafik z heurystyki zachłannej (GreedyScheduler)
+        
+        Przypisania, które nie pasują już do modelu (nowa nieobecność, usunięty
+        szablon, zmienione przypisania), są pomijane - hint jest tylko wskazówką.
+        """
+        self._warm_start_keys: Set[Tuple[int, int, int]] = set()
+        self._warm_start = {
+            'source': None,
+            'hinted_assignments': 0,
+            'applied_assignments': 0,
+        }
+        
+        if not self.data.warm_start_enabled:
+            return
+        
+        assignments: Optional[List[Dict]] = None
+        if self.data.draft_schedule:
+            assignments = self.data.draft_schedule
+            self._warm_start['source'] = 'draft'
+        else:
+            assignments = SOLUTION_STORE.get(
+                self.data.organization_key, self.data.year, self.data.month
+            )
+            if assignments:
+                self._warm_start['source'] = 'store'
+        
+        if not assignments:
+            if self.data.greedy_hint:
+                self._add_greedy_hints()
+            return
+        
+        print(f"\n🔥 Warm start: {len(assignments)} przypisań (źródło: {self._warm_start['source']})")
+        
+        for assignment in assignments:
+            emp_idx = self.data.emp_idx.get(assignment.get('employee_id'))
+            tmpl_idx = self.data.tmpl_idx.get(assignment.get('template_id'))
+            day = self._day_from_date_string(assignment.get('date', ''))
+            if emp_idx is None or tmpl_idx is None or day is None:
+                continue
+            if self.has_shift(emp_idx, day, tmpl_idx):
+                self._warm_start_keys.add((emp_idx, day, tmpl_idx))
+        
+        self._warm_start_keys = self._hint_shifts(self._warm_start_keys)
+        
+        self._warm_start['hinted_assignments'] = len(assignments)
+        self._warm_start['applied_assignments'] = len(self._warm_start_keys)
+        print(f"   ✅ Zastosowano {len(self._warm_start_keys)}/{len(assignments)} przypisań jako hint")
+    
+    def _add_greedy_hints(self):
+        """Hint z heurystyki zachłannej, gdy nie ma wcześniejszego grafiku."""
+        greedy = self._greedy_solution()
+        self._warm_start_keys = self._hint_shifts({key for key in greedy if self.has_shift(*key)})
+        
+        self._warm_start['source'] = 'greedy'
+        self._warm_start['hinted_assignments'] = len(greedy)
+        self._warm_start['applied_assignments'] = len(self._warm_start_keys)
+        print(f"\n🔥 Warm start: {len(self._warm_start_keys)} przypisań z heurystyki zachłannej")
+    
+    def _hint_shifts(self, keys: Set[Tuple[int, int, int]]) -> Set[Tuple[int, int, int]]:
+        """
+        Hint 1/0 dla zmiennych zmian (dni zatwierdzone są stałymi - bez hintu).
+        
+        Returns:
+            Przypisania faktycznie podane solverowi (po permutacji klas symetrii)
+        """
+        hinted = np.zeros(self.shift_index.shape, dtype=bool)
+        for emp_idx, day, tmpl_idx in keys:
+            hinted[emp_idx, day - 1, tmpl_idx] = True
+        hinted = self._order_hint_by_symmetry(hinted)
+        planning = np.ones(self.data.days_in_month, dtype=bool)
+        planning[[day - 1 for day in self.data.fixed_days]] = False
+        cells = (self.shift_index >= 0) & planning[None, :, None]
+        
+        solution_hint = self.model.Proto().solution_hint
+        solution_hint.vars.extend(self.shift_index[cells].tolist())
+        solution_hint.values.extend(hinted[cells].astype(np.int64).tolist())
+        return {
+            (emp_idx, day_pos + 1, tmpl_idx)
+            for emp_idx, day_pos, tmpl_idx in np.argwhere(hinted & (self.shift_index >= 0)).tolist()
+        }
+    
+    def _order_hint_by_symmetry(self, hinted: np.ndarray) -> np.ndarray:
+        """
+        Permutuje wiersze hintu w klasach wymiennych pracowników tak, by minuty
+        były nierosnące jak w add_symmetry_breaking.
+        
+        Członkowie klasy są dla modelu identyczni, więc zamiana ich przypisań
+        daje rozwiązanie o tym samym koszcie - a hint nie przeczy porządkowi
+        i solver nie odrzuca go na starcie.
+        """
+        if not self.symmetry_classes:
+            return hinted
+        
+        minutes = (hinted * self.data.template_table.duration[None, None, :]).sum(axis=(1, 2))
+        ordered = hinted.copy()
+        for members in self.symmetry_classes:
+            # Stabilne sortowanie malejąco - remisy zostają na swoich miejscach
+            ranked = sorted(members, key=lambda emp_idx: -int(minutes[emp_idx]))
+            ordered[members] = hinted[ranked]
+        return ordered
+    
+    def _greedy_solution(self) -> Set[Tuple[int, int, int]]:
+        """Zwraca (i zapamiętuje) grafik z heurystyki zachłannej."""
+        if self._greedy_assignments is None:
+            greedy_start = time.time()
+            self._greedy_assignments = GreedyScheduler(self.data).build()
+            self._greedy_time = time.time() - greedy_start
+            print(f"   ⚡ Heurystyka zachłanna: {len(self._greedy_assignments)} zmian "
+                  f"w {self._greedy_time * 1000:.0f} ms")
+        return self._greedy_assignments
+    
+    def _day_from_date_string(self, date_str: str) -> Optional[int]:
+        """Zamienia YYYY-MM-DD na dzień miesiąca (None jeśli spoza miesiąca)."""
+        try:
+            d = datetime.strptime(date_str[:10], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return None
+        if d.year != self.data.year or d.month != self.data.month:
+            return None
+        return d.day
+    
+    # =========================================================================
+    # KROK 8: Budowanie funkcji celu i rozwiązywanie
+    # =========================================================================
+    
+    def _objective_levels(self) -> List[Tuple[str, str, List[Tuple[cp_model.IntVar, int, str]]]]:
+        """Zwraca poziomy funkcji celu jako (klucz, nazwa, lista składników)."""
+        terms_by_key = {
+            'level1': self.objective_level1,
+            'level2': self.objective_level2,
+            'level2_5': self.objective_level2_5,
+            'level3': self.objective_level3,
+            'level4': self.objective_level4,
+        }
+        return [(key, name, terms_by_key[key]) for key, name, _ in LEXICOGRAPHIC_STAGES]
+    
     def build_objective(self):
         """
         Buduje hierarchiczną funkcję celu.
@@ -1770,30 +3393,12 @@ class CPSATScheduler:
         """
         print("\n🎯 Budowanie hierarchicznej funkcji celu...")
         
-        objective_terms = []
-        
-        # Level 1: Godziny (KRYTYCZNE)
-        for var, weight, name in self.objective_level1:
-            objective_terms.append(var * weight)
+        all_terms = [term for _, _, terms in self._objective_levels() for term in terms]
+        self.objective_scale = self._weight_scale(all_terms)
         
-        # Level 2: Coverage
-        for var, weight, name in self.objective_level2:
-            objective_terms.append(var * weight)
-        
-        # Level 2.5: Balance obsady dziennej
-        for var, weight, name in self.objective_level2_5:
-            objective_terms.append(var * weight)
-        
-        # Level 3: Kodeks Pracy
-        for var, weight, name in self.objective_level3:
-            objective_terms.append(var * weight)
-        
-        # Level 4: Preferencje (bonusy jako negatywne kary)
-        for var, weight, name in self.objective_level4:
-            objective_terms.append(var * weight)
-        
-        if objective_terms:
-            self.model.Minimize(sum(objective_terms))
+        # Level 1 → Level 4 (bonusy jako negatywne kary)
+        if all_terms:
+            self.model.Minimize(sum(var * (weight // self.objective_scale) for var, weight, _ in all_terms))
         
         print(f"   Level 1 (Godziny): {len(self.objective_level1)} terms, waga={WEIGHT_HIERARCHY['HOURS_UNDER_TARGET_PER_MINUTE']:,}")
         print(f"   Level 2 (Coverage): {len(self.objective_level2)} terms, waga={WEIGHT_HIERARCHY['COVERAGE_SLACK_PER_PERSON']:,}")
@@ -1801,27 +3406,60 @@ class CPSATScheduler:
         print(f"   Level 3 (Kodeks Pracy): {len(self.objective_level3)} terms, waga={WEIGHT_HIERARCHY['DAILY_REST_VIOLATION']:,}")
         print(f"   Level 4 (Preferencje): {len(self.objective_level4)} terms, waga={WEIGHT_HIERARCHY['PREFERENCE_MATCH_BONUS']}")
     
-    def solve(self, time_limit_seconds: Optional[int] = None) -> Dict:
-        """Uruchamia solver CP-SAT i zwraca wynik."""
-        start_time = time.time()
-        
-        self.build_objective()
-        
+    def _create_solver(self, timeout: float) -> cp_model.CpSolver:
+        """Tworzy solver CP-SAT ze wspólnymi parametrami wyszukiwania."""
         solver = cp_model.CpSolver()
-        
-        timeout = time_limit_seconds or self.data.solver_time_limit
         solver.parameters.max_time_in_seconds = timeout
-        solver.parameters.num_search_workers = 16
+        solver.parameters.num_search_workers = self.data.num_search_workers
         solver.parameters.log_search_progress = False
         solver.parameters.search_branching = cp_model.PORTFOLIO_SEARCH
         solver.parameters.random_seed = int(time.time()) % 10000
         solver.parameters.randomize_search = True
+        return solver
+    
+    def solve(
+        self,
+        time_limit_seconds: Optional[int] = None,
+        on_solution: Optional[Callable[[Dict], Any]] = None,
+        stream_shifts: bool = False,
+    ) -> Dict:
+        """
+        Uruchamia solver CP-SAT i zwraca wynik.
+        
+        Args:
+            time_limit_seconds: Limit czasu (domyślnie solver_time_limit)
+            on_solution: Wołane z każdym lepszym rozwiązaniem (słownik zdarzenia,
+                patrz _solution_event); zwrócenie True kończy wyszukiwanie
+                z bieżącym najlepszym rozwiązaniem
+            stream_shifts: Czy zdarzenia zawierają listę zmian
+        """
+        start_time = time.time()
         
-        print(f"\n🚀 Uruchamianie solvera (limit: {timeout}s, workers: 16)...")
+        self._checkpoint()
+        timeout = self.data.solve_budget(time_limit_seconds or self.data.solver_time_limit)
+        self._time_budget = timeout
+        self._lexicographic_stages: List[Dict] = []
+        self._stop_reason: Optional[str] = None
+        listener = None
+        if on_solution is not None:
+            listener = lambda callback: on_solution(self._solution_event(callback, stream_shifts))
+        self._progress = self._new_callback(start_time, listener)
+        
+        if self.data.objective_mode == 'lexicographic':
+            print(f"\n🚀 Uruchamianie solvera LEKSYKOGRAFICZNEGO (limit: {timeout}s, workers: {self.data.num_search_workers})...")
+            solver, status = self._solve_lexicographic(timeout)
+        else:
+            self.build_objective()
+            solver = self._create_solver(timeout)
+            
+            print(f"\n🚀 Uruchamianie solvera (limit: {timeout}s, workers: {self.data.num_search_workers})...")
+            
+            status = self._run_solver(solver, self._progress)
+            self._stop_reason = self._progress.stop_reason
         
-        status = solver.Solve(self.model)
         self._solver_status = status
         solve_time = time.time() - start_time
+        self.phase_times['solve'] = round(solve_time, 4)
         
         status_names = {
             cp_model.OPTIMAL: 'OPTIMAL',
@@ -1833,22 +3471,26 @@ class CPSATScheduler:
         status_name = status_names.get(status, 'UNKNOWN')
         
         print(f"\n{'='*60}")
-        print(f"📊 WYNIK SOLVERA:")
+        print("📊 WYNIK SOLVERA:")
         print(f"   Status: {status_name}")
         print(f"   Czas: {solve_time:.2f}s")
         
         if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-            objective = solver.ObjectiveValue()
+            extraction_start = time.perf_counter()
+            objective = self._total_objective_value(solver)
             print(f"   Wartość funkcji celu: {objective:,.0f}")
             
             # Analiza składowych celu
             self._analyze_objective(solver)
             
             shifts = self._extract_solution(solver)
+            self.phase_times['extraction'] = round(time.perf_counter() - extraction_start, 4)
             statistics = self._calculate_statistics(solver, shifts, solve_time)
             
             print(f"   Przypisane zmiany: {len(shifts)}")
             print(f"   Jakość: {statistics['quality_percent']:.1f}%")
+            print(f"   Pierwsze rozwiązanie po: {statistics['time_to_first_solution_seconds']}s "
+                  f"(najlepsze po: {statistics['time_to_best_solution_seconds']}s)")
             print(f"{'='*60}\n")
             
             self._print_hours_summary(shifts)
@@ -1861,9 +3503,15 @@ class CPSATScheduler:
             }
         
         else:
-            print(f"   ❌ Solver nie znalazł rozwiązania")
+            print("   ❌ Solver nie znalazł rozwiązania")
             print(f"{'='*60}\n")
             
+            # Tylko przekroczenie limitu czasu (UNKNOWN) - udowodniona sprzeczność
+            # (INFEASIBLE) lub błędny model nie są maskowane grafikiem zachłannym
+            if (self.data.greedy_fallback and status == cp_model.UNKNOWN
+                    and self.stats['total_variables'] > 0):
+                return self._greedy_fallback_result(solve_time, status_name)
+            
             return {
                 'status': 'INFEASIBLE',
                 'error': f'Solver status: {status_name}',
@@ -1875,18 +3523,266 @@ class CPSATScheduler:
                     'Zwiększ limit czasowy solvera',
                 ],
             }
+
+    def _solve_lexicographic(self, timeout: float) -> Tuple[cp_model.CpSolver, int]:
+        """
+        Rozwiązuje poziomy funkcji celu kolejno (optymalizacja leksykograficzna).
+
+        Każdy etap minimalizuje tylko jeden poziom, a jego najlepsza znaleziona
+        wartość staje się ograniczeniem (<=) dla kolejnych etapów. Rozwiązanie
+        etapu jest przekazywane jako hint do następnego. Dzięki temu solver nie
+        operuje na współczynnikach rzędu 20,000,000, a domknięcie luki na danym
+        poziomie jest znacznie szybsze.
+
+        Budżet czasu dzielony jest wg lexicographic_time_shares; czas
+        niewykorzystany przez etap (np. OPTIMAL wcześniej) przechodzi na kolejne.
+
+        Returns:
+            (solver z ostatnim znalezionym rozwiązaniem, status łączny)
+        """
+        stages = [
+            (key, name, terms, self.data.lexicographic_time_shares.get(key, 0.0))
+            for key, name, terms in self._objective_levels()
+            if terms
+        ]
+
+        deadline = time.time() + timeout
+        best_solver: Optional[cp_model.CpSolver] = None
+        all_optimal = True
+
+        for stage_idx, (key, name, terms, share) in enumerate(stages):
+            remaining_time = deadline - time.time()
+            remaining_shares = sum(max(s[3], 0.0) for s in stages[stage_idx:])
+            if remaining_time <= 0:
+                print(f"   ⏱️ Etap {name}: brak czasu - pomijam")
+                all_optimal = False
+                break
+
+            if remaining_shares > 0:
+                stage_budget = remaining_time * max(share, 0.0) / remaining_shares
+            else:
+                stage_budget = remaining_time / (len(stages) - stage_idx)
+            # Ostatni etap dostaje cały pozostały czas
+            if stage_idx == len(stages) - 1:
+                stage_budget = remaining_time
+            stage_budget = max(stage_budget, 0.1)
+
+            stage_scale = self._weight_scale(terms)
+            stage_expr = sum(var * (weight // stage_scale) for var, weight, _ in terms)
+            self.model.Minimize(stage_expr)
+
+            solver = self._create_solver(stage_budget)
+            stage_start = time.time()
+            # Czas do pierwszego rozwiązania liczony jest w pierwszym etapie,
+            # kolejne etapy: streaming i reguły wczesnego zatrzymania
+            if stage_idx == 0:
+                callback = self._progress
+            else:
+                callback = self._new_callback(self._progress.start_time, self._progress.on_improvement)
+            status = self._run_solver(solver, callback)
+            if callback.stop_reason is not None:
+                self._stop_reason = callback.stop_reason
+            stage_time = time.time() - stage_start
+
+            stage_info = {
+                'level': key,
+                'name': name,
+                'status': solver.StatusName(status),
+                'time_budget_seconds': round(stage_budget, 2),
+                'time_seconds': round(stage_time, 2),
+                'objective': None,
+                'stop_reason': callback.stop_reason,
+            }
+            self._lexicographic_stages.append(stage_info)
+
+            if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                print(f"   ❌ Etap {name}: brak rozwiązania ({stage_info['status']}, {stage_time:.2f}s)")
+                all_optimal = False
+                if best_solver is None:
+                    return solver, status
+                break
+
+            stage_value = int(round(solver.ObjectiveValue()))
+            stage_info['objective'] = stage_value * stage_scale
+            if status != cp_model.OPTIMAL:
+                all_optimal = False
+            print(f"   ✅ Etap {name}: {stage_info['objective']:,} pkt ({stage_info['status']}, "
+                  f"{stage_time:.2f}s / budżet {stage_budget:.2f}s)")
+
+            # Zamrożenie poziomu: kolejne etapy nie mogą go pogorszyć
+            self.model.Add(stage_expr <= stage_value)
+
+            # Rozwiązanie etapu jako hint dla kolejnego
+            self._hint_from_solver(solver)
+            best_solver = solver
+            
+            # Klient zaakceptował bieżące rozwiązanie lub priorytety L1/L2 spełnione
+            # - bez kolejnych etapów (stagnacja / luka kończą tylko bieżący etap)
+            if callback.stop_reason in ('listener', 'priorities_met'):
+                if stage_idx < len(stages) - 1:
+                    all_optimal = False
+                break
+
+        return best_solver, cp_model.OPTIMAL if all_optimal else cp_model.FEASIBLE
+
+    def _new_callback(
+        self, start_time: float, listener: Optional[Callable[[SolutionProgressCallback], Any]]
+    ) -> SolutionProgressCallback:
+        """Callback postępu z regułami wczesnego zatrzymania z solver_options."""
+        return SolutionProgressCallback(
+            start_time,
+            listener,
+            relative_gap=self.data.stop_relative_gap,
+            priorities_met=self._priorities_met if self.data.stop_when_priorities_met else None,
+        )
+    
+    def _priorities_met(self, callback: SolutionProgressCallback) -> bool:
+        """Czy rozwiązanie ma zerowe kary poziomu 1 (godziny) i 2 (obsada)."""
+        values = np.asarray(callback.Response().solution, dtype=np.int64)
+        return (
+            self._penalty_of(values, self.objective_level1) == 0
+            and self._penalty_of(values, self.objective_level2) == 0
+        )
     
+    def _run_solver(self, solver: cp_model.CpSolver, callback: SolutionProgressCallback) -> int:
+        """
+        solver.Solve z watchdogiem reguły stagnacji.
+        
+        Wątek co EARLY_STOP_POLL_SECONDS sprawdza czas od ostatniej poprawy
+        i woła StopSearch po stop_after_stagnation_seconds (callback rozwiązań
+        nie jest wywoływany, gdy solver nie znajduje nic lepszego).
+        """
+        limit = self.data.stop_stagnation_seconds
+        if limit is None:
+            with job_guard(self.data.job, solver):
+                return solver.Solve(self.model, callback)
+        
+        done = threading.Event()
+        
+        def watchdog():
+            while not done.wait(EARLY_STOP_POLL_SECONDS):
+                last = callback.best_solution_time
+                if last is not None and time.time() - callback.start_time - last >= limit:
+                    if callback.stop_reason is None:
+                        callback.stop_reason = 'stagnation'
+                    solver.StopSearch()
+                    return
+        
+        thread = threading.Thread(target=watchdog, daemon=True)
+        thread.start()
+        try:
+            with job_guard(self.data.job, solver):
+                return solver.Solve(self.model, callback)
+        finally:
+            done.set()
+            thread.join()
+    
+    def _hint_from_solver(self, solver: cp_model.CpSolver):
+        """Ustawia hinty wszystkich zmiennych modelu na wartości z rozwiązania."""
+        self.model.ClearHints()
+        solution = solver.ResponseProto().solution
+        hint = self.model.Proto().solution_hint
+        hint.vars.extend(range(len(solution)))
+        hint.values.extend(solution)
+
+    # =========================================================================
+    # EKSTRAKCJA - jeden hurtowy odczyt rozwiązania (NumPy)
+    # =========================================================================
+
+    def _solution_values(self, solver: cp_model.CpSolver) -> np.ndarray:
+        """Wartości wszystkich zmiennych z ResponseProto - jeden odczyt na solver."""
+        if self._solution_cache is None or self._solution_cache[0] is not solver:
+            values = np.asarray(solver.ResponseProto().solution, dtype=np.int64)
+            self._solution_cache = (solver, values)
+        return self._solution_cache[1]
+
+    def _term_arrays(self, terms: List[Tuple[cp_model.IntVar, int, str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Indeksy proto i wagi składników poziomu celu (liczone raz per poziom)."""
+        cached = self._term_array_cache.get(id(terms))
+        if cached is None or len(cached[0]) != len(terms):
+            indices = np.fromiter((var.Index() for var, _, _ in terms), dtype=np.int64, count=len(terms))
+            weights = np.fromiter((weight for _, weight, _ in terms), dtype=np.int64, count=len(terms))
+            cached = (indices, weights)
+            self._term_array_cache[id(terms)] = cached
+        return cached
+
+    def _term_values(
+        self, solver: cp_model.CpSolver, terms: List[Tuple[cp_model.IntVar, int, str]]
+    ) -> np.ndarray:
+        """Wartości zmiennych składników poziomu celu w rozwiązaniu."""
+        indices, _ = self._term_arrays(terms)
+        return self._solution_values(solver)[indices]
+
+    def _level_penalty(
+        self, solver: cp_model.CpSolver, terms: List[Tuple[cp_model.IntVar, int, str]]
+    ) -> int:
+        """Suma kar jednego poziomu funkcji celu w rozwiązaniu (iloczyn skalarny)."""
+        return self._penalty_of(self._solution_values(solver), terms)
+    
+    def _penalty_of(self, values: np.ndarray, terms: List[Tuple[cp_model.IntVar, int, str]]) -> int:
+        """Suma kar poziomu dla wektora wartości zmiennych proto."""
+        if not terms:
+            return 0
+        indices, weights = self._term_arrays(terms)
+        return int(values[indices] @ weights)
+    
+    def _solution_event(self, callback: SolutionProgressCallback, stream_shifts: bool) -> Dict:
+        """
+        Zdarzenie streamingu dla lepszego rozwiązania: pełna ważona wartość celu,
+        kary per poziom i (opcjonalnie) lista zmian.
+        """
+        values = np.asarray(callback.Response().solution, dtype=np.int64)
+        breakdown = {key: self._penalty_of(values, terms) for key, _, terms in self._objective_levels()}
+        event = {
+            'solution_index': callback.solutions,
+            'elapsed_seconds': round(time.time() - callback.start_time, 2),
+            'objective_value': sum(breakdown.values()),
+            'objective_breakdown': breakdown,
+            'shifts_assigned': int((values[self.shift_index[self.shift_index >= 0]] == 1).sum()),
+        }
+        if stream_shifts:
+            event['shifts'] = self._shifts_from_values(values)
+        return event
+
+    def _total_objective_value(self, solver: cp_model.CpSolver) -> int:
+        """
+        Wartość pełnej ważonej funkcji celu.
+
+        W trybie leksykograficznym solver.ObjectiveValue() zwraca tylko cel
+        ostatniego etapu, więc sumujemy kary wszystkich poziomów.
+        """
+        if self.data.objective_mode == 'lexicographic':
+            return sum(self._level_penalty(solver, terms) for _, _, terms in self._objective_levels())
+        return int(round(solver.ObjectiveValue())) * self.objective_scale
+    
+    def _weight_scale(self, terms: List[Tuple[cp_model.IntVar, int, str]]) -> int:
+        """NWD wag składników celu - dzielnik normalizujący współczynniki (1 bez skalowania)."""
+        if not self.data.time_scaling or not terms:
+            return 1
+        weights = np.fromiter((abs(weight) for _, weight, _ in terms), dtype=np.int64, count=len(terms))
+        return max(int(np.gcd.reduce(weights)), 1)
+    
+    def _time_scaling_statistics(self) -> Dict[str, Any]:
+        """Jednostka czasu, dzielnik wag i największy współczynnik celu w proto."""
+        coeffs = self.model.Proto().objective.coeffs
+        return {
+            'enabled': self.data.time_scaling,
+            'time_unit_minutes': self.time_unit,
+            'objective_scale': self.objective_scale,
+            'max_objective_coefficient': max((abs(c) for c in coeffs), default=0),
+        }
+
     def _analyze_objective(self, solver: cp_model.CpSolver):
         """Analizuje składowe funkcji celu."""
         print("\n   📈 Analiza składowych celu:")
         
         # Level 1: Godziny
-        hours_penalty = sum(solver.Value(var) * weight for var, weight, _ in self.objective_level1)
-        hours_details = []
-        for var, weight, name in self.objective_level1:
-            val = solver.Value(var)
-            if val > 0:
-                hours_details.append(f"{name}: {val}min")
+        hours_penalty = self._level_penalty(solver, self.objective_level1)
+        hours_values = self._term_values(solver, self.objective_level1)
+        hours_details = [
+            f"{self.objective_level1[pos][2]}: {hours_values[pos] * self.time_unit}min"
+            for pos in np.flatnonzero(hours_values > 0)[:5].tolist()
+        ]
         
         print(f"      L1 Godziny: {hours_penalty:,} pkt")
         if hours_details[:5]:
@@ -1894,61 +3790,101 @@ class CPSATScheduler:
                 print(f"         - {d}")
         
         # Level 2: Coverage
-        coverage_penalty = sum(solver.Value(var) * weight for var, weight, _ in self.objective_level2)
-        coverage_issues = sum(1 for var, _, _ in self.objective_level2 if solver.Value(var) > 0)
+        coverage_penalty = self._level_penalty(solver, self.objective_level2)
+        coverage_issues = int((self._term_values(solver, self.objective_level2) > 0).sum())
         print(f"      L2 Coverage: {coverage_penalty:,} pkt ({coverage_issues} braków)")
         
         # Level 2.5: Balance obsady
-        balance_penalty = sum(solver.Value(var) * weight for var, weight, _ in self.objective_level2_5)
-        balance_issues = sum(1 for var, _, _ in self.objective_level2_5 if solver.Value(var) > 0)
+        balance_penalty = self._level_penalty(solver, self.objective_level2_5)
+        balance_issues = int((self._term_values(solver, self.objective_level2_5) > 0).sum())
         print(f"      L2.5 Balance obsady: {balance_penalty:,} pkt ({balance_issues} dni z nierówną obsadą)")
         
         # Level 3: Kodeks Pracy
-        labor_penalty = sum(solver.Value(var) * weight for var, weight, _ in self.objective_level3)
-        labor_violations = sum(1 for var, _, _ in self.objective_level3 if solver.Value(var) > 0)
+        labor_penalty = self._level_penalty(solver, self.objective_level3)
+        labor_violations = int((self._term_values(solver, self.objective_level3) > 0).sum())
         print(f"      L3 Kodeks Pracy: {labor_penalty:,} pkt ({labor_violations} naruszeń)")
         
         # Level 4: Preferencje
-        pref_penalty = sum(solver.Value(var) * weight for var, weight, _ in self.objective_level4)
+        pref_penalty = self._level_penalty(solver, self.objective_level4)
         print(f"      L4 Preferencje: {pref_penalty:,} pkt")
     
     def _extract_solution(self, solver: cp_model.CpSolver) -> List[Dict]:
-        """Ekstrahuje przypisane zmiany z rozwiązania solvera."""
-        shifts = []
-        
-        for (emp_idx, day, tmpl_idx), var in self.shifts.items():
-            if solver.Value(var) == 1:
-                emp = self.data.employees[emp_idx]
-                tmpl = self.data.templates[tmpl_idx]
-                
-                shift = {
-                    'employee_id': emp.id,
-                    'employee_name': emp.full_name,
-                    'date': self.data.get_date_string(day),
-                    'day': day,
-                    'template_id': tmpl.id,
-                    'template_name': tmpl.name,
-                    'start_time': tmpl.start_time,
-                    'end_time': tmpl.end_time,
-                    'duration_minutes': tmpl.get_duration_minutes(),
-                    'color': tmpl.color or emp.color,
-                }
-                shifts.append(shift)
+        """Ekstrahuje przypisane zmiany z rozwiązania solvera (niezerowe komórki gęstego indeksu)."""
+        return self._shifts_from_values(self._solution_values(solver))
+    
+    def _shifts_from_values(self, values: np.ndarray) -> List[Dict]:
+        """Przypisane zmiany dla wektora wartości zmiennych proto."""
+        present = self.shift_index >= 0
+        assigned = np.zeros(self.shift_index.shape, dtype=bool)
+        assigned[present] = values[self.shift_index[present]] == 1
+        
+        shifts = [
+            self.data.build_shift(emp_idx, day_pos + 1, tmpl_idx)
+            for emp_idx, day_pos, tmpl_idx in np.argwhere(assigned).tolist()
+        ]
         
         shifts.sort(key=lambda x: (x['date'], x['employee_name']))
         
         return shifts
     
+    def _greedy_fallback_result(self, solve_time: float, solver_status_name: str) -> Dict:
+        """
+        Awaryjna odpowiedź z heurystyki zachłannej, gdy CP-SAT nie znalazł
+        rozwiązania w limicie czasu (status UNKNOWN) - użytkownik dostaje
+        grafik zamiast błędu. Wynik nie trafia do SOLUTION_STORE.
+        """
+        print("   🛟 Zwracam grafik z heurystyki zachłannej (fallback)")
+        
+        shifts = [
+            self.data.build_shift(emp_idx, day, tmpl_idx)
+            for emp_idx, day, tmpl_idx in self._greedy_solution()
+        ]
+        shifts.sort(key=lambda x: (x['date'], x['employee_name']))
+        
+        hours_by_employee: Dict[str, float] = defaultdict(float)
+        for shift in shifts:
+            hours_by_employee[shift['employee_id']] += shift['duration_minutes'] / 60
+        
+        quality_percent = hours_quality_percent(self.data, shifts)
+        
+        self._print_hours_summary(shifts)
+        
+        return {
+            'status': 'SUCCESS',
+            'shifts': shifts,
+            'statistics': {
+                'status': 'GREEDY_FALLBACK',
+                'solver_status': solver_status_name,
+                'solve_time_seconds': round(solve_time, 2),
+                'objective_value': 0,
+                'quality_percent': round(quality_percent, 1),
+                'total_shifts_assigned': len(shifts),
+                'total_variables': self.stats['total_variables'],
+                'hard_constraints': self.stats['hard_constraints'],
+                'soft_constraints': self.stats['soft_constraints'],
+                'hours_by_employee': dict(hours_by_employee),
+                'conflicts': 0,
+                'branches': 0,
+                'objective_mode': self.data.objective_mode,
+                'lexicographic_stages': self._lexicographic_stages,
+                'greedy_time_seconds': round(self._greedy_time, 3),
+                'phase_times_seconds': dict(self.phase_times),
+                'model_compaction': self.model_size(),
+                'adjusted_targets': self._adjusted_target_statistics(),
+                'time_scaling': self._time_scaling_statistics(),
+            },
+        }
+    
     def _calculate_statistics(
         self, solver: cp_model.CpSolver, shifts: List[Dict], solve_time: float
     ) -> Dict:
         """Oblicza statystyki rozwiązania."""
         
-        objective = solver.ObjectiveValue()
-        
+        objective = self._total_objective_value(solver)
+
         # Jakość bazowana na składowych funkcji celu
-        hours_penalty = sum(solver.Value(var) * weight for var, weight, _ in self.objective_level1)
-        coverage_penalty = sum(solver.Value(var) * weight for var, weight, _ in self.objective_level2)
+        hours_penalty = self._level_penalty(solver, self.objective_level1)
+        coverage_penalty = self._level_penalty(solver, self.objective_level2)
         
         # Jeśli brak kar L1 (godziny) - bardzo dobra jakość
         # Jeśli brak kar L2 (coverage) - dobra jakość
@@ -1981,8 +3917,57 @@ class CPSATScheduler:
             'hours_by_employee': dict(hours_by_employee),
             'conflicts': solver.NumConflicts(),
             'branches': solver.NumBranches(),
+            'objective_mode': self.data.objective_mode,
+            'lexicographic_stages': self._lexicographic_stages,
+            'time_to_first_solution_seconds': self._round_or_none(self._progress.first_solution_time),
+            'time_to_best_solution_seconds': self._round_or_none(self._progress.best_solution_time),
+            'solutions_found': self._progress.solutions,
+            'stop_reason': self._stop_reason,
+            'solver_time_budget_seconds': round(self._time_budget, 2),
+            'warm_start': self._warm_start_statistics(shifts),
+            'symmetry_classes': self.stats['symmetry_classes'],
+            'phase_times_seconds': dict(self.phase_times),
+            'model_compaction': self.model_size(),
+            'adjusted_targets': self._adjusted_target_statistics(),
+            'time_scaling': self._time_scaling_statistics(),
         }
     
+    def _adjusted_target_statistics(self) -> List[Dict]:
+        """Pracownicy, których cel minut przesunięto do najbliższej osiągalnej sumy."""
+        return [
+            {
+                'employee_id': self.data.employees[emp_idx].id,
+                'target_minutes': target,
+                'adjusted_target_minutes': adjusted,
+            }
+            for emp_idx, (target, adjusted) in sorted(self.adjusted_targets.items())
+        ]
+    
+    @staticmethod
+    def _round_or_none(value: Optional[float]) -> Optional[float]:
+        return round(value, 2) if value is not None else None
+    
+    def _warm_start_statistics(self, shifts: List[Dict]) -> Dict:
+        """
+        Statystyki warm startu: ile przypisań z hintu przetrwało w rozwiązaniu.
+        
+        hint_acceptance_ratio = zachowane przypisania z hintu / zastosowane przypisania
+        (porównanie z hintem po permutacji klas symetrii - tym, który widział solver).
+        """
+        stats = dict(self._warm_start)
+        if not self._warm_start_keys:
+            stats['hint_acceptance_ratio'] = None
+            return stats
+        
+        solution_keys = {
+            (self.data.emp_idx[s['employee_id']], s['day'], self.data.tmpl_idx[s['template_id']])
+            for s in shifts
+        }
+        kept = len(self._warm_start_keys & solution_keys)
+        stats['kept_assignments'] = kept
+        stats['hint_acceptance_ratio'] = round(kept / len(self._warm_start_keys), 3)
+        return stats
+    
     def _print_hours_summary(self, shifts: List[Dict]):
         """Wypisuje podsumowanie godzin dla każdego pracownika."""
         print("\n📊 PODSUMOWANIE GODZIN:")
@@ -1995,11 +3980,9 @@ class CPSATScheduler:
             hours_by_emp[shift['employee_name']] += shift['duration_minutes'] / 60
             shifts_by_emp[shift['employee_name']] += 1
         
-        work_days_count = len(self.data.weekdays)
-        
-        for emp in self.data.employees:
+        for emp_idx, emp in enumerate(self.data.employees):
             name = emp.full_name
-            target_min = emp.get_target_minutes(self.data.monthly_norm_minutes, work_days_count)
+            target_min = self.data.get_target_minutes(emp_idx)
             target_h = target_min / 60
             buffer_max_h = (target_min + HOURS_BUFFER_MINUTES) / 60
             actual_h = hours_by_emp.get(name, 0)
@@ -2062,20 +4045,845 @@ class CPSATScheduler:
         return reasons if reasons else ["Nieznana przyczyna - model powinien być zawsze FEASIBLE"]
 
 
+# =============================================================================
+# ROLLING HORIZON - Rozwiązywanie tydzień po tygodniu
+# =============================================================================
+
+def build_scheduler(data: DataModel) -> CPSATScheduler:
+    """Buduje kompletny model CP-SAT (zmienne, zasady twarde, priorytety 1-4, hinty)."""
+    scheduler = CPSATScheduler(data)
+    
+    # Tworzenie zmiennych decyzyjnych
+    scheduler.run_phase('variables', scheduler.create_decision_variables)
+    
+    # ZASADY TWARDE
+    scheduler.run_phase('hard_constraints', scheduler.add_hard_constraints)
+    
+    # PRIORYTET NR 1 - Godziny
+    scheduler.run_phase('hours', scheduler.add_hours_objective)
+    scheduler.run_phase('symmetry_breaking', scheduler.add_symmetry_breaking)
+    
+    # PRIORYTET NR 2 - Coverage ze Slack
+    scheduler.run_phase('coverage', scheduler.add_coverage_with_slack)
+    
+    # PRIORYTET NR 3 - Kodeks Pracy (soft)
+    scheduler.run_phase('labor_code', scheduler.add_labor_code_soft_constraints)
+    
+    # PRIORYTET NR 4 - Preferencje
+    scheduler.run_phase('preferences', scheduler.add_preferences_and_fairness)
+    
+    # Warm start (hinty z poprzedniego rozwiązania)
+    scheduler.run_phase('warm_start', scheduler.add_warm_start_hints)
+    
+    build_time = sum(scheduler.phase_times.values())
+    print(f"\n⏱️  Budowa modelu: {build_time:.2f}s " + ", ".join(
+        f"{name}={seconds:.2f}s" for name, seconds in scheduler.phase_times.items()
+    ))
+    
+    return scheduler
+
+
+def merge_partial_statistics(
+    data: DataModel, shifts: List[Dict], part_statistics: List[Dict], solve_time: float
+) -> Dict:
+    """
+    Łączy statystyki częściowych rozwiązań (okna / pule) w jedną odpowiedź.
+    
+    Jakość liczona jest od nowa z normy godzin całego miesiąca, bo kary
+    poszczególnych modeli nie są porównywalne.
+    """
+    shifts.sort(key=lambda x: (x['date'], x['employee_name']))
+    
+    hours_by_employee: Dict[str, float] = defaultdict(float)
+    for shift in shifts:
+        hours_by_employee[shift['employee_id']] += shift['duration_minutes'] / 60
+    
+    statuses = {stats['status'] for stats in part_statistics}
+    if statuses == {'OPTIMAL'}:
+        status = 'OPTIMAL'
+    elif 'GREEDY_FALLBACK' in statuses:
+        status = 'GREEDY_FALLBACK'
+    else:
+        status = 'FEASIBLE'
+    
+    totals: Dict[str, int] = defaultdict(int)
+    for stats in part_statistics:
+        for key in ('objective_value', 'total_variables', 'hard_constraints',
+                    'soft_constraints', 'conflicts', 'branches'):
+            totals[key] += stats.get(key, 0)
+    
+    return {
+        'status': status,
+        'solve_time_seconds': round(solve_time, 2),
+        'objective_value': totals['objective_value'],
+        'quality_percent': round(hours_quality_percent(data, shifts), 1),
+        'total_shifts_assigned': len(shifts),
+        'total_variables': totals['total_variables'],
+        'hard_constraints': totals['hard_constraints'],
+        'soft_constraints': totals['soft_constraints'],
+        'hours_by_employee': dict(hours_by_employee),
+        'conflicts': totals['conflicts'],
+        'branches': totals['branches'],
+        'objective_mode': data.objective_mode,
+    }
+
+
+class RollingHorizonScheduler:
+    """
+    Silnik tydzień po tygodniu dla bardzo dużych sklepów.
+    
+    Miesiąc dzielony jest na bloki tygodniowe (zgodne z get_week_number).
+    Każde okno to: dni look-back (zatwierdzone, jako stałe) + tydzień +
+    kilka dni podglądu. Podgląd pozwala solverowi "widzieć" początek
+    następnego tygodnia (odpoczynek dobowy, dni z rzędu), ale zatwierdzany
+    jest tylko bieżący tydzień. Look-back ma długość max_consecutive_days,
+    więc ograniczenia przechodzące przez granicę okien są zachowane.
+    
+    Cel godzinowy okna = pozostała norma × (dostępne dni okna / pozostałe
+    dostępne dni) + minuty już zatwierdzone w dniach look-back.
+    """
+    
+    def __init__(self, data: DataModel):
+        self.data = data
+        self.lookback_days = data.max_consecutive_days
+        self.overlap_days = max(0, data.rolling_overlap_days)
+    
+    def _week_blocks(self) -> List[List[int]]:
+        blocks: Dict[int, List[int]] = defaultdict(list)
+        for day in self.data.all_days:
+            blocks[self.data.get_week_number(day)].append(day)
+        return [blocks[week] for week in sorted(blocks)]
+    
+    def _window_targets(
+        self,
+        block: List[int],
+        window_days: List[int],
+        lookback: List[int],
+        committed: Dict[Tuple[int, int], int],
+        committed_minutes: List[int],
+    ) -> Dict[int, int]:
+        """Rozkłada pozostałą normę pracownika proporcjonalnie do dostępnych dni okna."""
+        targets: Dict[int, int] = {}
+        for emp_idx in range(len(self.data.employees)):
+            remaining_target = max(0, self.data.get_target_minutes(emp_idx) - committed_minutes[emp_idx])
+            remaining_days = [
+                d for d in self.data.all_days if d >= block[0] and self.data.is_available(emp_idx, d)
+            ]
+            window_available = [
+                d for d in window_days if d >= block[0] and self.data.is_available(emp_idx, d)
+            ]
+            share = len(window_available) / len(remaining_days) if remaining_days else 0.0
+            lookback_minutes = sum(
+                self.data.template_table[committed[(emp_idx, d)]].duration
+                for d in lookback if (emp_idx, d) in committed
+            )
+            targets[emp_idx] = int(round(remaining_target * share)) + lookback_minutes
+        return targets
+    
+    def solve(self) -> Dict:
+        start_time = time.time()
+        data = self.data
+        blocks = self._week_blocks()
+        
+        print(f"\n🗓️  ROLLING HORIZON: {len(blocks)} okien tygodniowych "
+              f"(look-back: {self.lookback_days} dni, podgląd: {self.overlap_days} dni)")
+        
+        committed: Dict[Tuple[int, int], int] = {}
+        committed_minutes = [0] * len(data.employees)
+        shifts: List[Dict] = []
+        windows: List[Dict] = []
+        window_statistics: List[Dict] = []
+        
+        for block in blocks:
+            lookback = [d for d in data.all_days if block[0] - self.lookback_days <= d < block[0]]
+            lookahead = [d for d in data.all_days if block[-1] < d <= block[-1] + self.overlap_days]
+            window_days = lookback + block + lookahead
+            
+            targets = self._window_targets(block, window_days, lookback, committed, committed_minutes)
+            window_data = data.restrict_to_days(window_days, committed, set(lookback), targets)
+            window_time = max(1.0, data.solver_time_limit * len(block) / data.days_in_month)
+            if data.deadline is not None:
+                # Pozostały czas żądania dzielony proporcjonalnie na pozostałe okna
+                remaining_days = sum(len(b) for b in blocks if b[0] >= block[0])
+                window_time = min(window_time, data.solve_budget(float('inf')) * len(block) / remaining_days)
+            
+            print(f"\n🪟 Okno dni {block[0]}-{block[-1]} "
+                  f"(model: {window_days[0]}-{window_days[-1]}, limit: {window_time:.1f}s)")
+            
+            scheduler = build_scheduler(window_data)
+            result = scheduler.solve(window_time)
+            
+            if result['status'] != 'SUCCESS':
+                result.setdefault('reasons', []).append(
+                    f"Rolling horizon: brak rozwiązania dla dni {block[0]}-{block[-1]}"
+                )
+                return result
+            
+            # Zatwierdzamy tylko dni bieżącego bloku - podgląd jest odrzucany
+            block_set = set(block)
+            for shift in result['shifts']:
+                if shift['day'] not in block_set:
+                    continue
+                emp_idx = data.emp_idx[shift['employee_id']]
+                committed[(emp_idx, shift['day'])] = data.tmpl_idx[shift['template_id']]
+                committed_minutes[emp_idx] += shift['duration_minutes']
+                shifts.append(shift)
+            
+            stats = result['statistics']
+            window_statistics.append(stats)
+            windows.append({
+                'days': [block[0], block[-1]],
+                'model_days': [window_days[0], window_days[-1]],
+                'status': stats['status'],
+                'solve_time_seconds': stats['solve_time_seconds'],
+                'objective_value': stats.get('objective_value', 0),
+                'total_variables': stats['total_variables'],
+            })
+        
+        solve_time = time.time() - start_time
+        statistics = merge_partial_statistics(data, shifts, window_statistics, solve_time)
+        statistics['engine'] = 'rolling_horizon'
+        statistics['rolling_horizon'] = {
+            'lookback_days': self.lookback_days,
+            'overlap_days': self.overlap_days,
+            'windows': windows,
+        }
+        
+        print(f"\n{'='*60}")
+        print("📊 ROLLING HORIZON - WYNIK:")
+        print(f"   Status: {statistics['status']}")
+        print(f"   Czas: {solve_time:.2f}s ({len(windows)} okien)")
+        print(f"   Przypisane zmiany: {len(shifts)}")
+        print(f"   Jakość (norma godzin): {statistics['quality_percent']:.1f}%")
+        print(f"{'='*60}\n")
+        
+        return {
+            'status': 'SUCCESS',
+            'shifts': shifts,
+            'statistics': statistics,
+        }
+
+
+# =============================================================================
+# DEKOMPOZYCJA - Niezależne pule pracowników i szablonów
+# =============================================================================
+
+def _solve_component(data: DataModel) -> Dict:
+    """Rozwiązuje jedną pulę (uruchamiane w osobnym procesie)."""
+    return build_scheduler(data).solve()
+
+
+class DecomposedScheduler:
+    """
+    Rozwiązuje rozłączne pule (np. zmiana nocna vs dzienna) jako osobne modele.
+    
+    Pule wyznacza find_components() z template_assignments - nie mają
+    wspólnych zmiennych zmian. Jedyne powiązania między pulami to:
+    - HC5 (slot pokrywany przez szablony z kilku pul) - slot pilnuje
+      tylko pierwsza pula, która może go pokryć (delegated_coverage_slots),
+    - globalne składniki sprawiedliwości/balansu - liczone per pula.
+    
+    Pule rozwiązywane są równolegle w procesach (CP-SAT trzyma GIL tylko
+    częściowo, a budowa modelu jest czysto pythonowa).
+    """
+    
+    def __init__(self, data: DataModel, components: List[Tuple[List[int], List[int]]]):
+        self.data = data
+        self.components = components
+    
+    def _delegated_slots(self) -> List[Set[Tuple[int, int]]]:
+        """Przydziela każdy slot HC5 pierwszej puli, która może go pokryć."""
+        data = self.data
+        delegated: List[Set[Tuple[int, int]]] = [set() for _ in self.components]
+        
+        for day in data.all_days:
+            if not data.is_workable_day(day):
+                continue
+            opening = data.get_opening_minutes(day)
+            if opening is None:
+                continue
+            slot_starts, cover = data.coverage_matrix(*opening)
+            
+            # (P, S): pula może pokryć slot szablonem obsadzalnym w tym dniu
+            pool_covers = np.array([
+                cover[[t for t in tmpl_indices if data.availability[emp_indices, day - 1, t].any()]].any(axis=0)
+                for emp_indices, tmpl_indices in self.components
+            ], dtype=bool).reshape(len(self.components), len(slot_starts))
+            
+            # Pierwsza pula pokrywająca slot jest jego właścicielem, pozostałe delegują
+            later_covers = pool_covers & (np.cumsum(pool_covers, axis=0) > 1)
+            for comp_idx, slot_idx in zip(*np.nonzero(later_covers)):
+                delegated[int(comp_idx)].add((day, int(slot_starts[slot_idx])))
+        
+        return delegated
+    
+    def solve(self) -> Dict:
+        start_time = time.time()
+        data = self.data
+        num_components = len(self.components)
+        search_workers = max(1, data.num_search_workers // num_components)
+        
+        print(f"\n🧩 DEKOMPOZYCJA: {num_components} niezależnych pul "
+              f"(workers CP-SAT na pulę: {search_workers})")
+        
+        # Magazyn rozwiązań jest procesowy - hinty przekazujemy jako szkic
+        draft = data.draft_schedule
+        if data.warm_start_enabled and not draft:
+            draft = SOLUTION_STORE.get(data.organization_key, data.year, data.month) or []
+        
+        views = []
+        for (emp_indices, tmpl_indices), delegated in zip(self.components, self._delegated_slots()):
+            view = data.restrict_to_component(emp_indices, tmpl_indices, delegated, search_workers)
+            view.draft_schedule = draft
+            views.append(view)
+            print(f"   • Pula: {len(emp_indices)} pracowników, {len(tmpl_indices)} szablonów, "
+                  f"{len(delegated)} slotów HC5 delegowanych")
+        
+        # Budżet czasu: pule w jednej "fali" procesów dzielą limit równolegle
+        # (procesów nie więcej niż wątków przydzielonych przez SOLVER_GOVERNOR)
+        max_workers = min(num_components, data.num_search_workers)
+        waves = -(-num_components // max_workers)
+        for view in views:
+            view.solver_time_limit = max(1.0, data.solve_budget(data.solver_time_limit) / waves)
+        
+        results = self._run_parallel(views, max_workers)
+        
+        shifts: List[Dict] = []
+        component_statistics: List[Dict] = []
+        components: List[Dict] = []
+        for view, result in zip(views, results):
+            if result['status'] != 'SUCCESS':
+                result.setdefault('reasons', []).append(
+                    f"Dekompozycja: brak rozwiązania dla puli {[e.id for e in view.employees]}"
+                )
+                return result
+            stats = result['statistics']
+            shifts.extend(result['shifts'])
+            component_statistics.append(stats)
+            components.append({
+                'employees': len(view.employees),
+                'templates': len(view.templates),
+                'status': stats['status'],
+                'solve_time_seconds': stats['solve_time_seconds'],
+                'total_variables': stats['total_variables'],
+            })
+        
+        solve_time = time.time() - start_time
+        statistics = merge_partial_statistics(data, shifts, component_statistics, solve_time)
+        statistics['engine'] = 'decomposed'
+        statistics['decomposition'] = {'components': components}
+        
+        print(f"\n{'='*60}")
+        print("📊 DEKOMPOZYCJA - WYNIK:")
+        print(f"   Status: {statistics['status']}")
+        print(f"   Czas: {solve_time:.2f}s ({num_components} pul)")
+        print(f"   Przypisane zmiany: {len(shifts)}")
+        print(f"   Jakość (norma godzin): {statistics['quality_percent']:.1f}%")
+        print(f"{'='*60}\n")
+        
+        return {
+            'status': 'SUCCESS',
+            'shifts': shifts,
+            'statistics': statistics,
+        }
+    
+    def _run_parallel(self, views: List[DataModel], max_workers: int) -> List[Dict]:
+        """
+        Rozwiązuje pule w procesach; przy jednym rdzeniu lub błędzie - sekwencyjnie.
+        
+        Zadanie (SolveJob) nie przechodzi do procesów potomnych: anulowanie
+        kończy (terminate) procesy puli, więc rozwiązywane pule od razu
+        zwalniają CPU, a oczekujące nie startują.
+        """
+        job = self.data.job
+        if max_workers > 1:
+            try:
+                context = multiprocessing.get_context('spawn')
+                detached = [copy.copy(view) for view in views]
+                for view in detached:
+                    view.job = None
+                # Wyjście z kontekstu (także przy anulowaniu) woła pool.terminate()
+                with context.Pool(processes=max_workers) as pool:
+                    pending = [pool.apply_async(_solve_component, (view,)) for view in detached]
+                    for result in pending:
+                        while not result.ready():
+                            if job is not None and job.cancelled:
+                                pool.terminate()
+                                job.check()
+                            result.wait(EARLY_STOP_POLL_SECONDS)
+                    return [result.get() for result in pending]
+            except (OSError, RuntimeError) as e:
+                print(f"   ⚠️ Równoległe rozwiązywanie niedostępne ({e}) - sekwencyjnie")
+        return [_solve_component(view) for view in views]
+
+
+# =============================================================================
+# MODEL ZAGREGOWANY - Liczności per klasa identycznych pracowników
+# =============================================================================
+
+class AggregatedScheduler:
+    """
+    Model CP-SAT na licznościach zamiast osób.
+    
+    Identyczni pracownicy (employee_equivalence_classes) reprezentowani są
+    jedną zmienną całkowitą x[klasa, dzień, szablon] ∈ [0, |klasa|].
+    Dla 30 identycznych pracowników to 30× mniej zmiennych zmian.
+    
+    Model zawiera warunki konieczne reguł per osoba:
+    - HC1: suma x klasy w dniu <= |klasa|
+    - HC2, HC5, coverage ze slack - jak w modelu pełnym (na sumach klas)
+    - HC3/11h: x[d, a] + Σ x[d+1, b] <= |klasa| dla par (a, b) w konflikcie
+      (nakładanie - twarde, krótki odpoczynek - miękkie)
+    - godziny: suma minut klasy vs suma norm członków
+    - dni z rzędu: w każdym oknie (max + 1) dni suma <= |klasa| × max_consecutive_days
+    
+    Osoby odtwarza dezagregacja: mały model CP-SAT per klasa z licznościami
+    x jako stałymi i twardym odpoczynkiem 11h oraz max dni z rzędu per osoba.
+    Warunki konieczne nie gwarantują, że taki podział istnieje - gdy go nie
+    ma (albo model zagregowany nie ma rozwiązania), rozwiązywany jest pełny
+    model monolityczny.
+    Preferencje i sprawiedliwość (priorytet 4) nie są modelowane.
+    """
+    
+    def __init__(self, data: DataModel):
+        self.data = data
+        self.model = cp_model.CpModel()
+        self.classes = data.employee_equivalence_classes(include_singletons=True)
+        self.durations = [r.duration for r in data.template_table]
+        self.counts: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
+        self.objective_terms: List[Any] = []
+        self.stats = {'total_variables': 0, 'hard_constraints': 0, 'soft_constraints': 0}
+        
+        # Pary szablonów (dzień d, dzień d+1) z macierzy zgodności DataModel
+        self.overlap_pairs = data.overlap_successors
+        self.short_rest_pairs = data.short_rest_successors
+    
+    def build(self):
+        """Buduje model zagregowany."""
+        data = self.data
+        print(f"\n🧮 MODEL ZAGREGOWANY: {len(self.classes)} klas dla {len(data.employees)} pracowników")
+        
+        # Zmienne: liczność klasy na (dzień, szablon)
+        for class_idx, members in enumerate(self.classes):
+            rep = members[0]
+            for day in data.all_days:
+                for tmpl_idx in np.flatnonzero(data.availability[rep, day - 1]).tolist():
+                    self.counts[(class_idx, day, tmpl_idx)] = self.model.NewIntVar(
+                        0, len(members), f"n_{class_idx}_{day}_{tmpl_idx}"
+                    )
+                    self.stats['total_variables'] += 1
+        
+        self._add_daily_capacity()
+        self._add_template_headcount()
+        self._add_shift_pair_limits()
+        self._add_consecutive_days()
+        self._add_hours()
+        self._add_supervisor_days()
+        
+        if self.objective_terms:
+            self.model.Minimize(sum(self.objective_terms))
+        
+        print(f"   Zmienne liczności: {self.stats['total_variables']} "
+              f"(model pełny: ~{self._individual_variable_count()})")
+    
+    def _individual_variable_count(self) -> int:
+        return sum(
+            len(self.classes[class_idx]) for class_idx, _, _ in self.counts
+        )
+    
+    def _class_day_vars(self, class_idx: int, day: int) -> List[cp_model.IntVar]:
+        return [
+            self.counts[(class_idx, day, t)]
+            for t in range(len(self.data.templates))
+            if (class_idx, day, t) in self.counts
+        ]
+    
+    def _add_daily_capacity(self):
+        """HC1: każdy członek klasy ma co najwyżej jedną zmianę dziennie."""
+        for class_idx, members in enumerate(self.classes):
+            for day in self.data.all_days:
+                day_vars = self._class_day_vars(class_idx, day)
+                if len(day_vars) > 1:
+                    self.model.Add(sum(day_vars) <= len(members))
+                    self.stats['hard_constraints'] += 1
+    
+    def _add_template_headcount(self):
+        """HC2 (max), HC5 (sloty godzin otwarcia) i coverage ze slack (min)."""
+        data = self.data
+        for day in data.all_days:
+            if not data.is_workable_day(day):
+                continue
+            
+            template_vars: Dict[int, List[cp_model.IntVar]] = defaultdict(list)
+            for (class_idx, d, tmpl_idx), var in self.counts.items():
+                if d == day:
+                    template_vars[tmpl_idx].append(var)
+            
+            for tmpl_idx, assigned in template_vars.items():
+                tmpl = data.templates[tmpl_idx]
+                if tmpl.max_employees is not None:
+                    self.model.Add(sum(assigned) <= tmpl.max_employees)
+                    self.stats['hard_constraints'] += 1
+                if tmpl.min_employees >= 1:
+                    slack = self.model.NewIntVar(0, tmpl.min_employees, f"slack_{day}_{tmpl_idx}")
+                    self.model.Add(slack >= tmpl.min_employees - sum(assigned))
+                    self.objective_terms.append(slack * WEIGHT_HIERARCHY['COVERAGE_SLACK_PER_PERSON'])
+                    self.stats['soft_constraints'] += 1
+            
+            opening = data.get_opening_minutes(day)
+            if opening is None:
+                continue
+            _, cover = data.coverage_matrix(*opening)
+            usable = np.zeros(len(data.templates), dtype=bool)
+            usable[[tmpl_idx for tmpl_idx, assigned in template_vars.items() if assigned]] = True
+            for tmpl_set in minimal_covering_sets(cover & usable[:, None]):
+                covering = [var for tmpl_idx in tmpl_set for var in template_vars[tmpl_idx]]
+                self.model.Add(sum(covering) >= 1)
+                self.stats['hard_constraints'] += 1
+    
+    def _add_shift_pair_limits(self):
+        """Nakładanie (twarde) i krótki odpoczynek (miękkie) między kolejnymi dniami."""
+        for class_idx, members in enumerate(self.classes):
+            size = len(members)
+            for day in self.data.all_days[:-1]:
+                for a in range(len(self.data.templates)):
+                    first = self.counts.get((class_idx, day, a))
+                    if first is None:
+                        continue
+                    
+                    overlapping = [
+                        self.counts[(class_idx, day + 1, b)]
+                        for b in self.overlap_pairs.get(a, [])
+                        if (class_idx, day + 1, b) in self.counts
+                    ]
+                    if overlapping:
+                        self.model.Add(first + sum(overlapping) <= size)
+                        self.stats['hard_constraints'] += 1
+                    
+                    short_rest = [
+                        self.counts[(class_idx, day + 1, b)]
+                        for b in self.short_rest_pairs.get(a, [])
+                        if (class_idx, day + 1, b) in self.counts
+                    ]
+                    if short_rest:
+                        excess = self.model.NewIntVar(0, size, f"rest_excess_{class_idx}_{day}_{a}")
+                        self.model.Add(excess >= first + sum(short_rest) + sum(overlapping) - size)
+                        self.objective_terms.append(excess * WEIGHT_HIERARCHY['DAILY_REST_VIOLATION'])
+                        self.stats['soft_constraints'] += 1
+    
+    def _add_consecutive_days(self):
+        """Warunek konieczny max dni z rzędu: okno (max+1) dni <= |klasa| × max."""
+        window_size = self.data.max_consecutive_days + 1
+        days = self.data.all_days
+        for class_idx, members in enumerate(self.classes):
+            limit = len(members) * self.data.max_consecutive_days
+            for start_pos in range(len(days) - window_size + 1):
+                window_day_vars = [
+                    self._class_day_vars(class_idx, day)
+                    for day in days[start_pos:start_pos + window_size]
+                ]
+                # Każda zmienna liczności sięga |klasa| - pomijamy okno tylko, gdy
+                # klasa nie może przekroczyć limitu nawet pracując każdego dnia
+                active_days = sum(1 for day_vars in window_day_vars if day_vars)
+                if len(members) * active_days <= limit:
+                    continue
+                window_vars = [var for day_vars in window_day_vars for var in day_vars]
+                excess = self.model.NewIntVar(0, len(members), f"consec_excess_{class_idx}_{start_pos}")
+                self.model.Add(excess >= sum(window_vars) - limit)
+                self.objective_terms.append(excess * WEIGHT_HIERARCHY['CONSECUTIVE_DAYS_VIOLATION'])
+                self.stats['soft_constraints'] += 1
+    
+    def _add_hours(self):
+        """PRIORYTET NR 1 na poziomie klasy: suma minut vs suma norm członków."""
+        for class_idx, members in enumerate(self.classes):
+            terms = [
+                var * self.durations[tmpl_idx]
+                for (c, _, tmpl_idx), var in self.counts.items() if c == class_idx
+            ]
+            if not terms:
+                continue
+            target = sum(self.data.get_target_minutes(e) for e in members)
+            buffer_max = target + HOURS_BUFFER_MINUTES * len(members)
+            
+            under = self.model.NewIntVar(0, target, f"under_{class_idx}")
+            self.model.Add(under >= target - sum(terms))
+            over = self.model.NewIntVar(0, sum(self.durations) * len(members) * self.data.days_in_month,
+                                        f"over_{class_idx}")
+            self.model.Add(over >= sum(terms) - buffer_max)
+            
+            self.objective_terms.append(under * WEIGHT_HIERARCHY['HOURS_UNDER_TARGET_PER_MINUTE'])
+            self.objective_terms.append(over * WEIGHT_HIERARCHY['HOURS_OVER_BUFFER_PER_MINUTE'])
+            self.stats['soft_constraints'] += 2
+    
+    def _add_supervisor_days(self):
+        """HC4 (miękkie): co najmniej jeden kierownik w każdym dniu pracy."""
+        supervisor_classes = [
+            class_idx for class_idx, members in enumerate(self.classes)
+            if self.data.employees[members[0]].is_supervisor
+        ]
+        if not supervisor_classes:
+            return
+        for day in self.data.all_days:
+            day_vars = [
+                var for class_idx in supervisor_classes
+                for var in self._class_day_vars(class_idx, day)
+            ]
+            if not day_vars:
+                continue
+            no_supervisor = self.model.NewBoolVar(f"no_sup_day_{day}")
+            self.model.Add(sum(day_vars) >= 1).OnlyEnforceIf(no_supervisor.Not())
+            self.objective_terms.append(no_supervisor * WEIGHT_HIERARCHY['COVERAGE_SLACK_PER_PERSON'] * 2)
+            self.stats['soft_constraints'] += 1
+    
+    def disaggregate(self, counts: Dict[Tuple[int, int, int], int]) -> Optional[Set[Tuple[int, int, int]]]:
+        """
+        Rozdziela liczności na osoby - mały model CP-SAT per klasa.
+        
+        Liczności z modelu zagregowanego są zadane (obsada i HC5 bez zmian),
+        a reguły per osoba są twarde: 1 zmiana/dzień, brak nakładania,
+        odpoczynek 11h i max dni z rzędu. Cel wyrównuje godziny członków
+        względem normy (i karze nadgodziny ponad limit tygodniowy).
+        
+        Returns:
+            Zbiór (emp_idx, day, tmpl_idx) lub None, gdy którejś klasy nie da
+            się rozdzielić bez naruszeń (albo zabrakło czasu)
+        """
+        assignments: Set[Tuple[int, int, int]] = set()
+        for class_idx, members in enumerate(self.classes):
+            class_counts = {
+                (day, tmpl_idx): count
+                for (c, day, tmpl_idx), count in counts.items() if c == class_idx and count > 0
+            }
+            if not class_counts:
+                continue
+            class_assignments = self._disaggregate_class(members, class_counts)
+            if class_assignments is None:
+                return None
+            assignments |= class_assignments
+        return assignments
+    
+    def _disaggregate_class(
+        self, members: List[int], class_counts: Dict[Tuple[int, int], int]
+    ) -> Optional[Set[Tuple[int, int, int]]]:
+        """Model przypisania członków klasy do liczności (dzień, szablon)."""
+        data = self.data
+        model = cp_model.CpModel()
+        x = {
+            (e, day, tmpl_idx): model.NewBoolVar(f"d_{e}_{day}_{tmpl_idx}")
+            for e in members for day, tmpl_idx in class_counts
+        }
+        
+        for (day, tmpl_idx), count in class_counts.items():
+            model.Add(sum(x[(e, day, tmpl_idx)] for e in members) == count)
+        
+        day_vars: Dict[Tuple[int, int], List[Any]] = defaultdict(list)
+        for (e, day, _), var in x.items():
+            day_vars[(e, day)].append(var)
+        works: Dict[Tuple[int, int], Any] = {}
+        for key, vars_ in day_vars.items():
+            model.AddAtMostOne(vars_)
+            works[key] = sum(vars_)
+        
+        window_size = data.max_consecutive_days + 1
+        for e in members:
+            # Nakładanie i odpoczynek < 11h między kolejnymi dniami - twarde
+            for (day, a) in class_counts:
+                for b in self.overlap_pairs.get(a, []) + self.short_rest_pairs.get(a, []):
+                    if (day + 1, b) in class_counts:
+                        model.AddBoolOr([x[(e, day, a)].Not(), x[(e, day + 1, b)].Not()])
+            
+            # Max dni z rzędu - twarde: każde okno (max + 1) dni ma dzień wolny
+            for start_pos in range(len(data.all_days) - window_size + 1):
+                window = [
+                    works[(e, day)] for day in data.all_days[start_pos:start_pos + window_size]
+                    if (e, day) in works
+                ]
+                if len(window) == window_size:
+                    model.Add(sum(window) <= data.max_consecutive_days)
+        
+        # Godziny per osoba (priorytet 1) i nadgodziny tygodniowe (jak w modelu pełnym)
+        objective_terms = []
+        member_minutes: Dict[int, List[Any]] = defaultdict(list)
+        week_minutes: Dict[Tuple[int, int], List[Any]] = defaultdict(list)
+        for (e, day, tmpl_idx), var in x.items():
+            member_minutes[e].append(var * self.durations[tmpl_idx])
+            week_minutes[(e, data.get_week_number(day))].append(var * self.durations[tmpl_idx])
+        minutes = {e: sum(member_minutes[e]) for e in members}
+        max_minutes = sum(self.durations) * data.days_in_month
+        max_weekly_minutes = int(data.max_weekly_hours * 60)
+        for e in members:
+            target = data.get_target_minutes(e)
+            under = model.NewIntVar(0, max(target, 0), f"d_under_{e}")
+            over = model.NewIntVar(0, max_minutes, f"d_over_{e}")
+            model.Add(under >= target - minutes[e])
+            model.Add(over >= minutes[e] - target - HOURS_BUFFER_MINUTES)
+            objective_terms.append(under * WEIGHT_HIERARCHY['HOURS_UNDER_TARGET_PER_MINUTE'])
+            objective_terms.append(over * WEIGHT_HIERARCHY['HOURS_OVER_BUFFER_PER_MINUTE'])
+        for (e, week_num), terms in week_minutes.items():
+            overtime = model.NewIntVar(0, max_minutes, f"d_overtime_{e}_{week_num}")
+            model.Add(overtime >= sum(terms) - max_weekly_minutes)
+            objective_terms.append(overtime * WEIGHT_HIERARCHY['MAX_WEEKLY_HOURS_VIOLATION'])
+        
+        # Członkowie są wymienni - porządek minut łamie symetrię
+        for first, second in zip(members, members[1:]):
+            model.Add(minutes[first] >= minutes[second])
+        model.Minimize(sum(objective_terms))
+        
+        data.check_deadline()
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = data.solve_budget(DISAGGREGATION_TIME_LIMIT_SECONDS)
+        solver.parameters.num_search_workers = data.num_search_workers
+        with job_guard(data.job, solver):
+            status = solver.Solve(model)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return None
+        return {key for key, var in x.items() if solver.Value(var)}
+    
+    def labor_code_violations(self, assignments: Set[Tuple[int, int, int]]) -> Dict[str, int]:
+        """
+        Kontrola reguł per osoba po dezagregacji: pary dni z odpoczynkiem
+        < 11h i dni ponad max_consecutive_days w serii (oczekiwane 0).
+        """
+        assigned = {(e, day): t for e, day, t in assignments}
+        short_rest = 0
+        consecutive = 0
+        for e in range(len(self.data.employees)):
+            run = 0
+            for day in self.data.all_days:
+                tmpl_idx = assigned.get((e, day))
+                if tmpl_idx is None:
+                    run = 0
+                    continue
+                run += 1
+                if run > self.data.max_consecutive_days:
+                    consecutive += 1
+                next_tmpl = assigned.get((e, day + 1))
+                if next_tmpl is not None and next_tmpl in self.short_rest_pairs.get(tmpl_idx, []):
+                    short_rest += 1
+        return {'daily_rest_violations': short_rest, 'consecutive_days_violations': consecutive}
+    
+    def solve(self) -> Dict:
+        start_time = time.time()
+        data = self.data
+        self.build()
+        build_time = time.time() - start_time
+        
+        data.check_deadline()
+        time_limit = data.solve_budget(data.solver_time_limit)
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = time_limit
+        solver.parameters.num_search_workers = data.num_search_workers
+        
+        print(f"\n🚀 Uruchamianie solvera ZAGREGOWANEGO (limit: {time_limit:.1f}s, "
+              f"workers: {data.num_search_workers})...")
+        with job_guard(data.job, solver):
+            status = solver.Solve(self.model)
+        status_name = solver.StatusName(status)
+        
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return self._monolithic_fallback(f'aggregate model {status_name}')
+        
+        counts = {key: solver.Value(var) for key, var in self.counts.items()}
+        disaggregation_start = time.time()
+        assignments = self.disaggregate(counts)
+        disaggregation_time = time.time() - disaggregation_start
+        if assignments is None:
+            return self._monolithic_fallback('disaggregation infeasible or timed out')
+        violations = self.labor_code_violations(assignments)
+        if any(violations.values()):
+            return self._monolithic_fallback('labor code violations after disaggregation')
+        status_label = 'OPTIMAL' if status == cp_model.OPTIMAL else 'FEASIBLE'
+        objective = int(solver.ObjectiveValue())
+        
+        shifts = [data.build_shift(e, day, t) for e, day, t in assignments]
+        solve_time = time.time() - start_time
+        statistics = merge_partial_statistics(data, shifts, [{
+            'status': status_label,
+            'objective_value': objective,
+            'total_variables': self.stats['total_variables'],
+            'hard_constraints': self.stats['hard_constraints'],
+            'soft_constraints': self.stats['soft_constraints'],
+            'conflicts': solver.NumConflicts(),
+            'branches': solver.NumBranches(),
+        }], solve_time)
+        statistics['engine'] = 'aggregated'
+        statistics['aggregation'] = {
+            'classes': len(self.classes),
+            'count_variables': self.stats['total_variables'],
+            'individual_variables': self._individual_variable_count(),
+            **violations,
+            'build_time_seconds': round(build_time, 3),
+            'disaggregation_time_seconds': round(disaggregation_time, 3),
+        }
+        
+        print(f"\n{'='*60}")
+        print("📊 MODEL ZAGREGOWANY - WYNIK:")
+        print(f"   Status: {status_label}")
+        print(f"   Czas: {solve_time:.2f}s")
+        print(f"   Przypisane zmiany: {len(shifts)} (dezagregacja: {disaggregation_time:.2f}s)")
+        print(f"   Jakość (norma godzin): {statistics['quality_percent']:.1f}%")
+        print(f"{'='*60}\n")
+        
+        return {
+            'status': 'SUCCESS',
+            'shifts': shifts,
+            'statistics': statistics,
+        }
+    
+    def _monolithic_fallback(self, reason: str) -> Dict:
+        """
+        Rozwiązuje pełny model, gdy liczności nie dają grafiku zgodnego z
+        regułami per osoba - wynik zagregowany nigdy nie jest SUCCESS z
+        nieobsadzonymi przypisaniami ani naruszeniami.
+        """
+        print(f"   ⚠️ Model zagregowany bez poprawnego grafiku ({reason}) - silnik monolityczny")
+        result = build_scheduler(self.data).solve()
+        if result['status'] == 'SUCCESS':
+            result['statistics']['engine'] = 'monolithic'
+            result['statistics']['aggregation_fallback'] = reason
+        return result
+
+
+def resolve_engine(data: DataModel) -> str:
+    """Wybiera silnik: 'auto' przełącza na rolling horizon dla dużych instancji (E×D×T)."""
+    if data.engine != 'auto':
+        return data.engine
+    cells = len(data.employees) * data.days_in_month * len(data.templates)
+    return 'rolling_horizon' if cells > ROLLING_HORIZON_AUTO_CELLS else 'monolithic'
+
+
 # =============================================================================
 # GŁÓWNA FUNKCJA API
 # =============================================================================
 
-def generate_schedule_optimized(input_data: Dict) -> Dict:
+def generate_schedule_optimized(
+    input_data: Dict,
+    on_solution: Optional[Callable[[Dict], Any]] = None,
+    stream_shifts: bool = False,
+    job_id: Optional[str] = None,
+    deadline: Optional[float] = None,
+    job: Optional[SolveJob] = None,
+) -> Dict:
     """
     Główna funkcja do generowania grafiku.
     
     Args:
         input_data: Słownik z danymi wejściowymi
+        on_solution: Callback kolejnych lepszych rozwiązań (streaming, silnik
+            monolityczny); zwrócenie True kończy wyszukiwanie
+        stream_shifts: Czy zdarzenia streamingu zawierają listę zmian
+        job_id: Id zadania w SOLVE_JOBS (anulowanie); domyślnie losowe,
+            zajęte przez trwające zadanie -> JobIdConflict
+        deadline: Bezwzględny deadline żądania (time.time()); parsowanie, kolejka
+            i budowa modelu są odliczane, CP-SAT dostaje resztę minus zapas
+        job: Zadanie zarejestrowane wcześniej przez SOLVE_JOBS.start (API podaje
+            jego id klientowi przed startem); zastępuje job_id
     
     Returns:
         Słownik z wynikami (status, shifts, statistics, error)
     """
+    if job is None:
+        job = SOLVE_JOBS.start(job_id)
     try:
         print("\n" + "="*80)
         print("🚀 CALENDA SCHEDULE - CP-SAT OPTIMIZER v4.0")
@@ -2084,36 +4892,60 @@ def generate_schedule_optimized(input_data: Dict) -> Dict:
         
         # KROK 1: Preprocessing danych
         data = DataModel(input_data)
-        
-        # KROK 2: Inicjalizacja schedulera
-        scheduler = CPSATScheduler(data)
-        
-        # KROK 3: Tworzenie zmiennych decyzyjnych
-        scheduler.create_decision_variables()
-        
-        # KROK 4: Dodawanie ZASAD TWARDYCH
-        scheduler.add_hard_constraints()
-        
-        # KROK 5: PRIORYTET NR 1 - Godziny
-        scheduler.add_hours_objective()
-        
-        # KROK 6: PRIORYTET NR 2 - Coverage ze Slack
-        scheduler.add_coverage_with_slack()
-        
-        # KROK 7: PRIORYTET NR 3 - Kodeks Pracy (soft)
-        scheduler.add_labor_code_soft_constraints()
-        
-        # KROK 8: PRIORYTET NR 4 - Preferencje
-        scheduler.add_preferences_and_fairness()
-        
-        # KROK 9: Rozwiązywanie
-        result = scheduler.solve()
+        data.job = job
+        data.deadline = deadline
+        print(f"🆔 Zadanie: {job.id}")
+        if deadline is not None:
+            print(f"⏳ Deadline żądania za {deadline - time.time():.1f}s "
+                  f"(zapas na ekstrakcję: {DEADLINE_SAFETY_MARGIN_SECONDS:.1f}s)")
+        
+        # Przydział wątków CP-SAT z procesowego budżetu (kolejka przy przeciążeniu,
+        # oczekiwanie nie dłużej niż pozwala deadline)
+        queue_timeout = max(0.0, min(SOLVER_GOVERNOR.queue_timeout, data.solve_budget(float('inf'))))
+        lease_id, granted_workers, queue_time = SOLVER_GOVERNOR.acquire(
+            data.num_search_workers, timeout=queue_timeout, job=job
+        )
+        allocation = {
+            'requested_workers': data.num_search_workers,
+            'granted_workers': granted_workers,
+            'queue_seconds': round(queue_time, 2),
+            'cpu_limit': SOLVER_GOVERNOR.capacity,
+        }
+        print(f"🧮 Wątki CP-SAT: {granted_workers}/{data.num_search_workers} "
+              f"(limit CPU: {SOLVER_GOVERNOR.capacity}, kolejka: {queue_time:.2f}s)")
+        data.num_search_workers = granted_workers
+        try:
+            result = _run_engine(data, on_solution, stream_shifts)
+        finally:
+            SOLVER_GOVERNOR.release(lease_id)
+        
+        # Zapamiętaj zaakceptowany grafik jako punkt startowy kolejnych generacji
+        # (grafik z heurystyki zachłannej nie jest rozwiązaniem solvera - nie zapisujemy)
+        if result['status'] == 'SUCCESS':
+            result['statistics']['solver_allocation'] = allocation
+            if is_solver_result(result):
+                SOLUTION_STORE.save(data.organization_key, data.year, data.month, result['shifts'])
+        result['job_id'] = job.id
         
         print("\n" + "="*80)
         print("✅ GENEROWANIE ZAKOŃCZONE")
         print("="*80 + "\n")
         
         return result
+    
+    except DeadlineExceeded:
+        print("\n⏳ Deadline żądania przekroczony przed rozwiązaniem - heurystyka zachłanna")
+        result = deadline_fallback_result(data)
+        result['job_id'] = job.id
+        return result
+    
+    except SolveCancelled as e:
+        print(f"\n🛑 Zadanie {job.id} anulowane ({e})")
+        return {
+            'status': 'CANCELLED',
+            'error': f'Solve cancelled: {e}',
+            'job_id': job.id,
+        }
         
     except Exception as e:
         error_trace = traceback.format_exc()
@@ -2125,6 +4957,72 @@ def generate_schedule_optimized(input_data: Dict) -> Dict:
             'error': str(e),
             'traceback': error_trace,
         }
+    
+    finally:
+        SOLVE_JOBS.finish(job)
+
+
+def is_solver_result(result: Dict) -> bool:
+    """Czy grafik pochodzi z CP-SAT (a nie z fallbacku zachłannego) - tylko taki trafia do SOLUTION_STORE."""
+    return result['statistics'].get('status') != 'GREEDY_FALLBACK'
+
+
+def deadline_fallback_result(data: DataModel) -> Dict:
+    """
+    Odpowiedź, gdy deadline żądania minął przed rozwiązaniem CP-SAT:
+    grafik z heurystyki zachłannej (milisekundy) zamiast zabicia żądania.
+    Nie jest zapisywana w SOLUTION_STORE (nie jest rozwiązaniem solvera).
+    """
+    if not data.greedy_fallback:
+        return {
+            'status': 'TIMEOUT',
+            'error': 'Request deadline exceeded before the solver could run',
+            'suggestions': ['Zwiększ limit czasu żądania lub zmniejsz rozmiar modelu'],
+        }
+    
+    start_time = time.time()
+    shifts = [data.build_shift(e, day, t) for e, day, t in GreedyScheduler(data).build()]
+    statistics = merge_partial_statistics(data, shifts, [{'status': 'GREEDY_FALLBACK'}], time.time() - start_time)
+    statistics['stop_reason'] = 'deadline'
+    return {
+        'status': 'SUCCESS',
+        'shifts': shifts,
+        'statistics': statistics,
+    }
+
+
+def _run_engine(
+    data: DataModel,
+    on_solution: Optional[Callable[[Dict], Any]] = None,
+    stream_shifts: bool = False,
+) -> Dict:
+    """Wybiera silnik i rozwiązuje model (wątki CP-SAT już przydzielone)."""
+    # KROK 2: Wybór silnika
+    engine = resolve_engine(data)
+    components = data.find_components() if data.decomposition else []
+    
+    if on_solution is not None and (engine != 'monolithic' or len(components) > 1):
+        # Okna / pule / liczności nie dają pełnego grafiku w trakcie - tylko wynik końcowy
+        print("   ⚠️ Streaming rozwiązań pośrednich dostępny tylko w silniku monolitycznym")
+    
+    if engine == 'rolling_horizon':
+        # KROK 3: Tydzień po tygodniu (okna ze stanem brzegowym)
+        return RollingHorizonScheduler(data).solve()
+    if engine == 'aggregated':
+        # KROK 3: Liczności per klasa identycznych pracowników + dezagregacja
+        return AggregatedScheduler(data).solve()
+    if len(components) > 1:
+        # KROK 3: Rozłączne pule pracowników - osobne modele równolegle
+        return DecomposedScheduler(data, components).solve()
+    
+    # KROK 3: Budowa pełnego modelu (zmienne, zasady, priorytety, hinty)
+    scheduler = build_scheduler(data)
+    
+    # KROK 4: Rozwiązywanie
+    result = scheduler.solve(on_solution=on_solution, stream_shifts=stream_shifts)
+    if result['status'] == 'SUCCESS':
+        result['statistics']['engine'] = 'monolithic'
+    return result
 
 
 # =============================================================================
@@ -0,0 +1,177 @@
+"""
+================================================================================
+BENCHMARK SOLVERA CP-SAT - Porównanie opcji przed/po
+================================================================================
+Uruchamia generate_schedule_optimized w procesie (bez API) na scenariuszach
+z test_advanced_scheduler.generate_scenario i porównuje dwie konfiguracje
+solver_options (bazową i wariant).
+
+Przykład:
+    python test/benchmark_scheduler.py --seeds 1-8 --time-limit 10 \\
+        --baseline '{"symmetry_breaking": false}' --variant '{"symmetry_breaking": true}'
+
+    # Skalowanie czasu przez NWD (jednostki modelu, normalizacja wag celu)
+    python test/benchmark_scheduler.py --seeds 1-8 --time-limit 30 \\
+        --baseline '{"time_scaling": false}' --variant '{"time_scaling": true}'
+
+    # Kompakcja modelu: zmierzony rozmiar obu kodowań (vars/cons w drugiej tabeli)
+    python test/benchmark_scheduler.py --seeds 1-8 --time-limit 5 \\
+        --baseline '{"model_compaction": false}' --variant '{"model_compaction": true}'
+
+    # Kodowanie serii dni pracy: okna przesuwne vs automat (AddAutomaton)
+    python test/benchmark_scheduler.py --seeds 1-6 --time-limit 5 \\
+        --baseline '{"sequence_encoding": "window"}' --variant '{"sequence_encoding": "automaton"}'
+================================================================================
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scheduler_optimizer import generate_schedule_optimized
+from test_advanced_scheduler import generate_scenario
+
+
+def parse_seeds(value: str) -> list:
+    """Parsuje listę seedów: '1-8' lub '1,4,7'."""
+    if '-' in value:
+        start, end = value.split('-', 1)
+        return list(range(int(start), int(end) + 1))
+    return [int(s) for s in value.split(',') if s]
+
+
+def longest_runs(shifts: list) -> dict:
+    """Najdłuższa seria kolejnych dni pracy per pracownik."""
+    days_by_employee = {}
+    for shift in shifts:
+        days_by_employee.setdefault(shift['employee_id'], set()).add(
+            datetime.strptime(shift['date'], '%Y-%m-%d').date()
+        )
+    runs = {}
+    for emp_id, days in days_by_employee.items():
+        longest = 0
+        for day in days:
+            if day - timedelta(days=1) in days:
+                continue
+            length = 1
+            while day + timedelta(days=length) in days:
+                length += 1
+            longest = max(longest, length)
+        runs[emp_id] = longest
+    return runs
+
+
+def run_case(scenario: dict, options: dict, time_limit: float) -> dict:
+    """Rozwiązuje jeden scenariusz z danymi opcjami i zwraca metryki."""
+    payload = copy.deepcopy(scenario)
+    payload['solver_time_limit'] = time_limit
+    payload['solver_options'] = options
+
+    started = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = generate_schedule_optimized(payload)
+    wall = time.time() - started
+
+    stats = result.get('statistics', {})
+    phase_times = stats.get('phase_times_seconds') or {}
+    model_size = stats.get('model_compaction') or {}
+    scaling = stats.get('time_scaling') or {}
+    runs = longest_runs(result.get('shifts', []))
+    max_consecutive = scenario.get('scheduling_rules', {}).get('max_consecutive_days', 6)
+    return {
+        'status': stats.get('status', result.get('status')),
+        'wall_seconds': wall,
+        'objective': stats.get('objective_value'),
+        'quality': stats.get('quality_percent'),
+        'time_to_best': stats.get('time_to_best_solution_seconds'),
+        'variables': stats.get('total_variables'),
+        'time_to_first': stats.get('time_to_first_solution_seconds'),
+        'build_seconds': sum(t for phase, t in phase_times.items() if phase != 'solve'),
+        'model_variables': model_size.get('variables'),
+        'model_constraints': model_size.get('constraints'),
+        'time_unit': scaling.get('time_unit_minutes'),
+        'objective_scale': scaling.get('objective_scale'),
+        'max_coefficient': scaling.get('max_objective_coefficient'),
+        'longest_run': max(runs.values(), default=0),
+        'runs_over_limit': sum(1 for length in runs.values() if length > max_consecutive),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark opcji solvera CP-SAT')
+    parser.add_argument('--seeds', default='1-8', help="Seedy scenariuszy, np. '1-8' lub '1,3,5'")
+    parser.add_argument('--time-limit', type=float, default=10.0, help='Limit czasu na scenariusz [s]')
+    parser.add_argument('--baseline', default='{}', help='solver_options konfiguracji bazowej (JSON)')
+    parser.add_argument('--variant', default='{}', help='solver_options wariantu (JSON)')
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline)
+    variant = json.loads(args.variant)
+    seeds = parse_seeds(args.seeds)
+
+    print("\n" + "=" * 100)
+    print(f"  BENCHMARK: baseline={baseline}  vs  variant={variant}  (limit {args.time_limit}s)")
+    print("=" * 100)
+    print(f"{'seed':>5} | {'status A':<10} {'obj A':>14} {'best A':>7} {'wall A':>7} | "
+          f"{'status B':<10} {'obj B':>14} {'best B':>7} {'wall B':>7}")
+    print("-" * 100)
+
+    speedups = []
+    model_rows = []
+    for seed in seeds:
+        with contextlib.redirect_stdout(io.StringIO()):
+            scenario = generate_scenario(seed)
+        a = run_case(scenario, baseline, args.time_limit)
+        b = run_case(scenario, variant, args.time_limit)
+
+        print(f"{seed:>5} | {a['status']:<10} {a['objective'] or 0:>14,} {a['time_to_best'] or 0:>7.2f} "
+              f"{a['wall_seconds']:>7.2f} | {b['status']:<10} {b['objective'] or 0:>14,} "
+              f"{b['time_to_best'] or 0:>7.2f} {b['wall_seconds']:>7.2f}")
+
+        if a['wall_seconds'] > 0:
+            speedups.append(a['wall_seconds'] / max(b['wall_seconds'], 1e-6))
+        model_rows.append((seed, a, b))
+
+    print("-" * 100)
+    if speedups:
+        print(f"Mediana przyspieszenia (wall A / wall B): {statistics.median(speedups):.2f}x")
+
+    # Rozmiar modelu, czas budowy i czas do pierwszego rozwiązania
+    print(f"\n{'seed':>5} | {'build A':>7} {'first A':>7} {'vars A':>7} {'cons A':>7} | "
+          f"{'build B':>7} {'first B':>7} {'vars B':>7} {'cons B':>7}")
+    print("-" * 100)
+    for seed, a, b in model_rows:
+        print(f"{seed:>5} | {a['build_seconds']:>7.2f} {a['time_to_first'] or 0:>7.2f} "
+              f"{a['model_variables'] or 0:>7} {a['model_constraints'] or 0:>7} | "
+              f"{b['build_seconds']:>7.2f} {b['time_to_first'] or 0:>7.2f} "
+              f"{b['model_variables'] or 0:>7} {b['model_constraints'] or 0:>7}")
+
+    # Skalowanie czasu (NWD): jednostka, dzielnik wag i największy współczynnik celu
+    print(f"\n{'seed':>5} | {'unit A':>6} {'scale A':>7} {'max coef A':>14} | "
+          f"{'unit B':>6} {'scale B':>7} {'max coef B':>14} | {'obj A == obj B':>14}")
+    print("-" * 100)
+    for seed, a, b in model_rows:
+        print(f"{seed:>5} | {a['time_unit'] or 1:>6} {a['objective_scale'] or 1:>7} {a['max_coefficient'] or 0:>14,} | "
+              f"{b['time_unit'] or 1:>6} {b['objective_scale'] or 1:>7} {b['max_coefficient'] or 0:>14,} | "
+              f"{str(a['objective'] == b['objective']):>14}")
+
+    # Serie dni pracy (sequence_encoding): najdłuższa seria i liczba pracowników ponad limit
+    print(f"\n{'seed':>5} | {'run A':>6} {'over A':>7} | {'run B':>6} {'over B':>7}")
+    print("-" * 100)
+    for seed, a, b in model_rows:
+        print(f"{seed:>5} | {a['longest_run']:>6} {a['runs_over_limit']:>7} | "
+              f"{b['longest_run']:>6} {b['runs_over_limit']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Silnik zagregowany: dezagregacja z twardymi regułami per osoba.
+
+    python -m pytest test/test_aggregated.py -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from ortools.sat.python import cp_model
+
+from scheduler_optimizer import AggregatedScheduler, DataModel, generate_schedule_optimized
+from test_advanced_scheduler import generate_scenario
+
+
+def aggregated_scenario(seed: int) -> dict:
+    scenario = generate_scenario(seed)
+    scenario['solver_time_limit'] = 2
+    scenario['solver_options'] = {'engine': 'aggregated'}
+    return scenario
+
+
+@pytest.mark.parametrize('seed', [3, 8])
+def test_disaggregation_keeps_counts_and_labor_rules(seed):
+    scheduler = AggregatedScheduler(DataModel(aggregated_scenario(seed)))
+    scheduler.build()
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = 2
+    assert solver.Solve(scheduler.model) in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    counts = {key: solver.Value(var) for key, var in scheduler.counts.items()}
+
+    assignments = scheduler.disaggregate(counts)
+
+    assert assignments is not None
+    placed = {key: 0 for key in counts}
+    class_of = {e: c for c, members in enumerate(scheduler.classes) for e in members}
+    for e, day, tmpl_idx in assignments:
+        placed[(class_of[e], day, tmpl_idx)] += 1
+    assert placed == counts
+    assert scheduler.labor_code_violations(assignments) == {
+        'daily_rest_violations': 0, 'consecutive_days_violations': 0,
+    }
+
+
+@pytest.mark.parametrize('seed', [3, 8])
+def test_aggregated_success_has_no_violations(seed):
+    result = generate_schedule_optimized(aggregated_scenario(seed))
+
+    assert result['status'] == 'SUCCESS'
+    aggregation = result['statistics']['aggregation']
+    assert aggregation['daily_rest_violations'] == 0
+    assert aggregation['consecutive_days_violations'] == 0
+
+
+def test_infeasible_disaggregation_falls_back_to_monolithic():
+    # Seed 1: liczności klasy 5 osób nie dają się rozdzielić bez naruszeń
+    result = generate_schedule_optimized(aggregated_scenario(1))
+
+    assert result['status'] == 'SUCCESS'
+    assert result['statistics']['engine'] == 'monolithic'
+    assert result['statistics']['aggregation_fallback'] == 'disaggregation infeasible or timed out'
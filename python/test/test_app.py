@@ -0,0 +1,70 @@
+"""
+Testy API Flask (klient testowy, bez uruchamiania serwera).
+
+    python -m pytest test/test_app.py -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app import API_KEY, app
+from scheduler_optimizer import SOLVE_JOBS
+from test_advanced_scheduler import generate_scenario
+
+HEADERS = {'X-API-Key': API_KEY}
+
+
+@pytest.fixture
+def client():
+    app.testing = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def running_job():
+    """Trwające zadanie o id podanym przez innego klienta."""
+    job = SOLVE_JOBS.start('shared-job-id')
+    yield job
+    SOLVE_JOBS.finish(job)
+
+
+@pytest.mark.parametrize('endpoint', ['/api/generate', '/api/generate/stream'])
+def test_duplicate_job_id_is_rejected(client, running_job, endpoint):
+    response = client.post(
+        endpoint,
+        json=generate_scenario(4),
+        headers={**HEADERS, 'X-Job-Id': running_job.id},
+    )
+
+    assert response.status_code == 409
+    assert response.get_json()['status'] == 'CONFLICT'
+    assert not running_job.cancelled
+
+
+@pytest.mark.parametrize('endpoint', ['/api/generate', '/api/generate/stream'])
+@pytest.mark.parametrize('timeout_ms', ['abc', '-5', '0', 'nan', 'inf'])
+def test_invalid_request_timeout_header_is_rejected(client, endpoint, timeout_ms):
+    response = client.post(
+        endpoint,
+        json=generate_scenario(4),
+        headers={**HEADERS, 'X-Request-Timeout-Ms': timeout_ms},
+    )
+
+    assert response.status_code == 400
+    assert 'Invalid request timeout' in response.get_json()['error']
+
+
+def test_invalid_request_timeout_field_is_rejected(client):
+    response = client.post(
+        '/api/generate',
+        json={**generate_scenario(4), 'request_timeout_ms': 'soon'},
+        headers=HEADERS,
+    )
+
+    assert response.status_code == 400
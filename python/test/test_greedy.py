@@ -0,0 +1,51 @@
+"""
+Heurystyka zachłanna: obsada minimalna i fallback (bez zapisu w SOLUTION_STORE).
+
+    python -m pytest test/test_greedy.py -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import scheduler_optimizer
+from scheduler_optimizer import DataModel, GreedyScheduler, SolutionStore, generate_schedule_optimized
+from test_advanced_scheduler import generate_scenario
+
+
+@pytest.mark.parametrize('seed', [1, 3, 4])
+def test_min_employees_filled_when_targets_reached(seed):
+    # Norma 8h - wszyscy osiągają ją po pierwszej zmianie
+    scenario = dict(generate_scenario(seed), monthly_hours_norm=8)
+    greedy = GreedyScheduler(DataModel(scenario))
+    greedy.build()
+
+    for day in greedy.planning_days:
+        for tmpl_idx in greedy.day_templates[day]:
+            if greedy.headcount[(day, tmpl_idx)] >= greedy.data.templates[tmpl_idx].min_employees:
+                continue
+            assert not any(
+                greedy.can_assign(e, day, tmpl_idx) for e in range(len(greedy.data.employees))
+            )
+
+
+def test_greedy_fallback_is_not_stored(monkeypatch):
+    scenario = generate_scenario(4)
+    data = DataModel(scenario)
+    fallback = {
+        'status': 'SUCCESS',
+        'shifts': [],
+        'statistics': {'status': 'GREEDY_FALLBACK'},
+    }
+    store = SolutionStore()
+    monkeypatch.setattr(scheduler_optimizer, 'SOLUTION_STORE', store)
+    monkeypatch.setattr(scheduler_optimizer, '_run_engine', lambda *args: fallback)
+
+    result = generate_schedule_optimized(scenario)
+
+    assert result['status'] == 'SUCCESS'
+    assert store.get(data.organization_key, data.year, data.month) is None
@@ -0,0 +1,32 @@
+"""
+Kompakcja modelu: rozmiar wariantu bez kompakcji zmierzony z protobufu.
+
+    python -m pytest test/test_model_compaction.py -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from scheduler_optimizer import DataModel, build_scheduler
+from test_advanced_scheduler import generate_scenario
+
+
+def model_size(seed: int, compaction: bool) -> dict:
+    scenario = dict(generate_scenario(seed), solver_options={'model_compaction': compaction})
+    return build_scheduler(DataModel(scenario)).model_size()
+
+
+@pytest.mark.parametrize('seed', [1, 3, 8])
+def test_size_without_compaction_matches_measured_model(seed):
+    compacted = model_size(seed, True)
+    plain = model_size(seed, False)
+
+    assert compacted['variables_without_compaction'] == plain['variables']
+    assert compacted['constraints_without_compaction'] == plain['constraints']
+    assert compacted['variables'] < plain['variables']
+    assert plain['variables_without_compaction'] == plain['variables']
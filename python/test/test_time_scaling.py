@@ -0,0 +1,59 @@
+"""
+Skalowanie czasu (NWD): jednostka modelu i współczynniki funkcji celu.
+
+    python -m pytest test/test_time_scaling.py -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from scheduler_optimizer import DataModel, build_scheduler, generate_schedule_optimized
+from test_advanced_scheduler import generate_scenario
+
+
+def build(scenario: dict, **options):
+    """Buduje model z funkcją celu dla scenariusza i solver_options."""
+    scenario = dict(scenario, solver_options=options)
+    scheduler = build_scheduler(DataModel(scenario))
+    scheduler.build_objective()
+    return scheduler
+
+
+@pytest.mark.parametrize('seed', [1, 3, 8])
+def test_time_scaling_keeps_weight_per_minute(seed):
+    scenario = generate_scenario(seed)
+    raw = build(scenario, time_scaling=False)._time_scaling_statistics()
+    scaled = build(scenario, time_scaling=True)._time_scaling_statistics()
+
+    # Największa waga (minuta pod normą) × jednostka, podzielona tylko przez NWD wag
+    assert scaled['time_unit_minutes'] > 1
+    assert (scaled['max_objective_coefficient'] * scaled['objective_scale']
+            == raw['max_objective_coefficient'] * scaled['time_unit_minutes'])
+
+
+@pytest.mark.parametrize('seed', [4, 7])
+def test_time_scaling_keeps_optimal_objective(seed):
+    objectives = []
+    for time_scaling in (False, True):
+        scenario = dict(generate_scenario(seed), solver_time_limit=10)
+        scenario['solver_options'] = {'time_scaling': time_scaling, 'warm_start': False}
+        result = generate_schedule_optimized(scenario)
+        assert result['statistics']['status'] == 'OPTIMAL'
+        objectives.append(result['statistics']['objective_value'])
+
+    assert objectives[0] == objectives[1]
+
+
+def test_fractional_weekly_hours_limit():
+    scenario = generate_scenario(3)
+    scenario['scheduling_rules']['max_weekly_work_hours'] = 47.5
+
+    scheduler = build(scenario, time_scaling=True)
+
+    assert scheduler.max_weekly_minutes == 2850
+    assert 2850 % scheduler.time_unit == 0
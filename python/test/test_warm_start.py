@@ -0,0 +1,41 @@
+"""
+Warm start: statystyki hintu liczone względem hintu, który widział solver.
+
+    python -m pytest test/test_warm_start.py -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+
+from scheduler_optimizer import DataModel, build_scheduler
+from test_advanced_scheduler import generate_scenario
+
+
+def hinted_keys(scheduler):
+    """Przypisania (emp_idx, day, tmpl_idx) z hintem 1 w protobufie modelu."""
+    hint = scheduler.model.Proto().solution_hint
+    ones = [var for var, value in zip(hint.vars, hint.values) if value]
+    return {
+        (emp_idx, day_pos + 1, tmpl_idx)
+        for emp_idx, day_pos, tmpl_idx in np.argwhere(np.isin(scheduler.shift_index, ones)).tolist()
+    }
+
+
+# Seedy, w których permutacja klas symetrii zmienia hint zachłanny
+@pytest.mark.parametrize('seed', [1, 8])
+def test_warm_start_keys_match_written_hint(seed):
+    scheduler = build_scheduler(DataModel(generate_scenario(seed)))
+    greedy = {key for key in scheduler._greedy_solution() if scheduler.has_shift(*key)}
+
+    assert scheduler.symmetry_classes
+    assert greedy != scheduler._warm_start_keys
+    assert scheduler._warm_start_keys == hinted_keys(scheduler)
+
+    shifts = [scheduler.data.build_shift(*key) for key in scheduler._warm_start_keys]
+    assert scheduler._warm_start_statistics(shifts)['hint_acceptance_ratio'] == 1.0